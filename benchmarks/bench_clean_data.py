@@ -0,0 +1,74 @@
+"""
+Benchmark da limpeza da base: versão antiga (.apply linha a linha) x versão vetorizada.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_clean_data                # 10k, 1M e 10M linhas
+    python -m benchmarks.bench_clean_data 10000 1000000  # tamanhos escolhidos
+
+As bases grandes são geradas reamostrando as linhas de data/raw_data/zomato.csv.
+São medidos dois tempos: somente o mapeamento das colunas (onde ficavam os .apply)
+e a limpeza completa (rename, dropna, mapeamento, drop e drop_duplicates).
+
+A igualdade entre as duas versões é conferida em tests/test_process_data.py.
+"""
+import sys
+import time
+
+import pandas as pd
+
+from utils.process_data import (clean_frame, color_name, country_name,
+                                create_price_type, map_columns, rename_columns)
+
+RAW_DATA_PATH = r'data/raw_data/zomato.csv'
+SIZES = [10_000, 1_000_000, 10_000_000]
+
+
+def legacy_map_columns(df1):
+    """ Mapeamento como era feito antes, com um .apply por linha em cada coluna. """
+    df1['cuisines'] = df1.loc[:, 'cuisines'].astype(str).apply(lambda x: x.split(',')[0])
+    df1['country'] = df1.loc[:, 'country_code'].apply(lambda x: country_name(x))
+    df1["price_type"] = df1.loc[:, "price_range"].apply(lambda x: create_price_type(x))
+    df1['color_name'] = df1.loc[:, 'rating_color'].apply(lambda x: color_name(x))
+    return df1
+
+
+def legacy_clean_frame(df1):
+    """ Limpeza completa como era feita antes. """
+    df1 = rename_columns(df1)
+    df1 = df1.dropna()
+    df1 = legacy_map_columns(df1)
+    df1 = df1.drop('switch_to_order_menu', axis = 1)
+    df1 = df1.drop_duplicates().reset_index(drop=True)
+    return df1
+
+
+def sample_raw(raw, n_rows):
+    return raw.sample(n_rows, replace=True, random_state=0).reset_index(drop=True)
+
+
+def timed(func, df):
+    start = time.perf_counter()
+    result = func(df)
+    return result, time.perf_counter() - start
+
+
+def main(sizes):
+    raw = pd.read_csv(RAW_DATA_PATH)
+
+    print(f"{'linhas':>12} {'etapa':>10} {'apply (s)':>12} {'vetorizado (s)':>16} {'speedup':>9}")
+    for n_rows in sizes:
+        df = sample_raw(raw, n_rows)
+        renamed = rename_columns(df).dropna()
+
+        _, old_map = timed(legacy_map_columns, renamed.copy())
+        _, new_map = timed(map_columns, renamed.copy())
+
+        _, old_total = timed(legacy_clean_frame, df)
+        _, new_total = timed(clean_frame, df)
+
+        print(f'{n_rows:>12,} {"mapeamento":>10} {old_map:>12.3f} {new_map:>16.3f} {old_map / new_map:>8.1f}x')
+        print(f'{n_rows:>12,} {"completa":>10} {old_total:>12.3f} {new_total:>16.3f} {old_total / new_total:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,73 @@
+"""
+Benchmark dos filtros da barra lateral: cadeia de isin/loc x máscara única x índice de bitmaps.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_filters                  # 1M e 10M linhas
+    python -m benchmarks.bench_filters 100000 1000000   # tamanhos escolhidos
+
+A base grande é gerada reamostrando a base limpa (tipos compactos). O tempo de montagem do
+índice é mostrado separado, porque ele é feito uma única vez por versão da base.
+"""
+import sys
+import time
+
+import numpy as np
+
+from utils.filters import FilterIndex, filter_mask
+from utils.process_data import clean_data, compact_frame
+
+RAW_DATA_PATH = r'data/raw_data/zomato.csv'
+SIZES = [1_000_000, 10_000_000]
+
+ALL_PRICES = ['cheap', 'normal', 'expensive', 'gourmet']
+
+# (países, tipos de preço, nota mínima)
+QUERIES = [
+    (['Brazil', 'England', 'Qatar', 'South Africa', 'Canada', 'Australia'], ALL_PRICES, 0.0),
+    (['India', 'United States of America'], ['cheap', 'normal'], 3.5),
+    (['Turkey'], ALL_PRICES, 4.5),
+]
+
+
+def isin_chain(df1, countries, prices, min_rating):
+    """ Filtro como é feito hoje nas páginas: três isin/comparações com uma cópia cada. """
+    df1 = df1.loc[df1['country'].isin(countries), :]
+    df1 = df1.loc[df1['price_type'].isin(prices), :]
+    df1 = df1.loc[df1['aggregate_rating'] >= min_rating, :]
+    return df1
+
+
+def best_of(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def main(sizes):
+    base = compact_frame(clean_data(RAW_DATA_PATH))
+
+    print(f"{'linhas':>12} {'consulta':>9} {'isin/loc (s)':>13} {'máscara (s)':>12} {'bitmaps (s)':>12}")
+    for n_rows in sizes:
+        df1 = base.sample(n_rows, replace=True, random_state=0).reset_index(drop=True)
+
+        start = time.perf_counter()
+        index = FilterIndex(df1)
+        print(f'{n_rows:>12,} montagem do índice: {time.perf_counter() - start:.3f}s')
+
+        for number, query in enumerate(QUERIES):
+            chain, chain_time = best_of(lambda: isin_chain(df1, *query))
+            mask, mask_time = best_of(lambda: filter_mask(df1, *query))
+            rows, index_time = best_of(lambda: index.rows(*query))
+
+            # os três caminhos precisam selecionar as mesmas linhas
+            assert np.array_equal(chain.index.to_numpy(), np.flatnonzero(mask))
+            assert np.array_equal(rows, np.flatnonzero(mask))
+
+            print(f'{n_rows:>12,} {number:>9} {chain_time:>13.4f} {mask_time:>12.4f} {index_time:>12.4f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
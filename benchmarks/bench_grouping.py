@@ -0,0 +1,75 @@
+"""
+Benchmark dos agrupamentos dos gráficos: groupby do pandas sobre chaves de texto (como era
+feito em utils.cube.rollup e nas páginas) x agregação pelos códigos inteiros das chaves
+(utils.grouping.group_aggregate, com as chaves em category).
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_grouping                      # 1M e 10M linhas
+    python -m benchmarks.bench_grouping 100000 1000000       # tamanhos escolhidos
+
+As linhas são geradas reamostrando as células do cubo de agregados da base limpa. A
+conversão das chaves para category é mostrada separada, porque ela é feita uma única vez
+por versão da base (ver utils.store.load_shared_aggregate).
+"""
+import sys
+import time
+
+import pandas as pd
+
+from utils.cube import CUBE_KEYS, SUMS
+from utils.grouping import encode_keys, group_aggregate
+from utils.process_data import clean_data
+from utils.store import summarize
+
+RAW_DATA_PATH = r'data/raw_data/zomato.csv'
+SIZES = [1_000_000, 10_000_000]
+
+# Agrupamentos dos gráficos: (nome, chaves, agregações)
+SUM_AGGREGATIONS = {'restaurants': ('restaurants', 'sum'), 'min_restaurant_id': ('min_restaurant_id', 'min'),
+                    **{sum_col: (sum_col, 'sum') for sum_col in SUMS.values()}}
+GROUPINGS = [
+    ('países', ['country'], SUM_AGGREGATIONS),
+    ('cidades', ['country', 'city'], SUM_AGGREGATIONS),
+    ('culinárias', ['cuisines'], SUM_AGGREGATIONS),
+    ('cidades/país', ['country'], {'city': ('city', 'nunique')}),
+    ('culinárias/cidade', ['country', 'city'], {'cuisines': ('cuisines', 'nunique')}),
+]
+
+
+def groupby_legacy(df1, keys, aggregations):
+    """ Agrupamento como era feito: groupby do pandas sobre as chaves de texto. """
+    return df1.groupby(keys).agg(**aggregations).reset_index()
+
+
+def best_of(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def main(sizes):
+    cube = summarize(clean_data(RAW_DATA_PATH), CUBE_KEYS)
+
+    print(f"{'linhas':>12} {'agrupamento':>18} {'grupos':>7} {'groupby (s)':>12} {'códigos (s)':>12}")
+    for n_rows in sizes:
+        df1 = cube.sample(n_rows, replace=True, random_state=0).reset_index(drop=True)
+
+        encoded, encode_time = best_of(lambda: encode_keys(df1), repeat=1)
+        print(f'{n_rows:>12,} conversão para category: {encode_time:.3f}s')
+
+        for name, keys, aggregations in GROUPINGS:
+            expected, legacy_time = best_of(lambda: groupby_legacy(df1, keys, aggregations))
+            result, codes_time = best_of(lambda: group_aggregate(encoded, keys, aggregations))
+
+            # os dois agrupamentos precisam ter os mesmos grupos, na mesma ordem, e os mesmos valores
+            pd.testing.assert_frame_equal(result.astype({key: object for key in keys}), expected,
+                                          check_exact=False, rtol=1e-9)
+
+            print(f'{n_rows:>12,} {name:>18} {len(result):>7,} {legacy_time:>12.4f} {codes_time:>12.4f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,114 @@
+"""
+Benchmark do mapa da página Geral: marcadores do folium criados com iterrows x camada única
+de clusters montada no navegador (utils.maps.create_map), com o HTML do popup em cada
+marcador e com o popup sob demanda.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_map                   # 7k, 100k e 1M restaurantes
+    python -m benchmarks.bench_map 7000 100000       # tamanhos escolhidos
+
+O tempo é medido em duas etapas: montagem do mapa e geração do HTML (o que o folium_static faz),
+e o tamanho do HTML é mostrado para a camada única e para o popup sob demanda.
+A versão com iterrows só é medida até LEGACY_MAX_ROWS restaurantes; acima disso ela leva
+dezenas de minutos e é mostrada como '-'.
+"""
+import sys
+import time
+
+import folium
+from folium.plugins import MarkerCluster
+
+from utils.maps import MAP_COLUMNS, create_map
+from utils.process_data import clean_data, compact_frame
+
+RAW_DATA_PATH = r'data/raw_data/zomato.csv'
+SIZES = [7_000, 100_000, 1_000_000]
+LEGACY_MAX_ROWS = 100_000
+
+
+def create_map_iterrows(df1):
+    """ Mapa como era feito na página: um folium.Marker com Popup/Html por restaurante. """
+    fig = folium.Figure(width=1920, height=1080)
+    map_ = folium.Map( max_bounds=True ).add_to(fig)
+    marker_cluster = MarkerCluster().add_to(map_)
+
+    data = df1.loc[:,MAP_COLUMNS]
+    for index, location_info in data.iterrows():
+        cost_and_currency = f"{location_info['average_cost_for_two']} - {location_info['currency']}"
+        rating_with_suffix = f"Nota: {location_info['aggregate_rating']:.1f}/5.0"
+        color = f'{location_info["color_name"]}'
+
+        popup_html = f"<b>Restaurante:</b> {location_info['restaurant_name']}<br>"
+        popup_html += f"<b>Cidade:</b> {location_info['city']}<br>"
+        popup_html += f"<b>Culinária:</b> {location_info['cuisines']}<br>"
+        popup_html += f"{rating_with_suffix}<br>"
+        popup_html += f"<b>Média do prato para 2 pessoas:</b> {cost_and_currency}<br>"
+        popup_html += f"<b>Endereço:</b> {location_info['address']}"
+
+        popup = folium.Popup(folium.Html(popup_html, script=True), max_width=500)
+        folium.Marker(
+            [location_info["latitude"], location_info["longitude"]],
+            popup=popup,
+            icon=folium.Icon(color=color, icon="home", prefix="fa"),
+        ).add_to(marker_cluster)
+
+    map_.fit_bounds(map_.get_bounds(), padding=(100, 100))
+    return map_
+
+
+def markers_of(map_):
+    """ [lat, lon, popup, cor] de cada marcador dos dois mapas, para conferir o resultado. """
+    for child in map_._children.values():
+        if hasattr(child, 'data'):
+            return [list(row) for row in child.data]
+
+    rows = []
+    cluster = next(c for c in map_._children.values() if isinstance(c, MarkerCluster))
+    for marker in cluster._children.values():
+        popup = next(c for c in marker._children.values() if isinstance(c, folium.Popup))
+        html = next(iter(popup.html._children.values())).data
+        rows.append([*marker.location, html, marker.icon.options['markerColor']])
+    return rows
+
+
+def bounds_of(map_):
+    return next(c for c in map_._children.values() if isinstance(c, folium.map.FitBounds)).bounds
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main(sizes):
+    base = compact_frame(clean_data(RAW_DATA_PATH))
+
+    print(f"{'restaurantes':>12} {'iterrows (s)':>13} {'html (s)':>9} {'camada única (s)':>17} {'html (s)':>9} {'html (MB)':>10}"
+          f" {'sob demanda (s)':>16} {'html (s)':>9} {'html (MB)':>10}")
+    for n_rows in sizes:
+        df1 = base.sample(n_rows, replace=True, random_state=0).reset_index(drop=True)
+
+        fast_map, fast_time = timed(lambda: create_map(df1, lazy_popups=False))
+        fast_html, fast_render = timed(lambda: fast_map.get_root().render())
+
+        lazy_map, lazy_time = timed(lambda: create_map(df1, lazy_popups=True))
+        lazy_html, lazy_render = timed(lambda: lazy_map.get_root().render())
+
+        if n_rows <= LEGACY_MAX_ROWS:
+            legacy_map, legacy_time = timed(lambda: create_map_iterrows(df1))
+            _, legacy_render = timed(lambda: legacy_map.get_root().render())
+
+            # os dois mapas precisam ter os mesmos marcadores, popups, cores e enquadramento
+            assert markers_of(legacy_map) == markers_of(fast_map)
+            assert bounds_of(legacy_map) == bounds_of(fast_map)
+            legacy = f'{legacy_time:>13.3f} {legacy_render:>9.3f}'
+        else:
+            legacy = f"{'-':>13} {'-':>9}"
+
+        print(f'{n_rows:>12,} {legacy} {fast_time:>17.3f} {fast_render:>9.3f} {len(fast_html) / 2**20:>10.1f}'
+              f' {lazy_time:>16.3f} {lazy_render:>9.3f} {len(lazy_html) / 2**20:>10.1f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
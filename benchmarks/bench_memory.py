@@ -0,0 +1,37 @@
+"""
+Relatório de memória por coluna da base limpa: tipos originais x tipos compactos.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_memory            # base de data/raw_data/zomato.csv
+    python -m benchmarks.bench_memory 1000000    # base reamostrada com N linhas
+"""
+import sys
+
+import pandas as pd
+
+from utils.process_data import (adjust_columns_order, clean_data, clean_frame,
+                                compact_frame, memory_report)
+
+RAW_DATA_PATH = r'data/raw_data/zomato.csv'
+
+
+def main(n_rows=None):
+    if n_rows is None:
+        df1 = clean_data(RAW_DATA_PATH)
+    else:
+        raw = pd.read_csv(RAW_DATA_PATH)
+        raw = raw.sample(n_rows, replace=True, random_state=0).reset_index(drop=True)
+        # ids diferentes para que o drop_duplicates não volte ao tamanho original
+        raw['Restaurant ID'] = range(len(raw))
+        df1 = clean_frame(raw)
+
+    df1 = adjust_columns_order(df1)
+    report = memory_report(df1, compact_frame(df1))
+
+    with pd.option_context('display.width', 200, 'display.max_columns', 10, 'display.max_rows', 100):
+        print(f'{len(df1):,} linhas')
+        print(report)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else None)
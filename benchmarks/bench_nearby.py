@@ -0,0 +1,80 @@
+"""
+Benchmark da busca de restaurantes próximos: distância haversine para a base inteira x
+índice espacial (grade + haversine somente nos candidatos, ver utils.spatial).
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_nearby                   # 1M restaurantes
+    python -m benchmarks.bench_nearby 100000 1000000    # tamanhos escolhidos
+
+A base grande é gerada reamostrando a base limpa, com as coordenadas deslocadas em até
+~1 km para que os restaurantes repetidos não caiam no mesmo ponto. O tempo de montagem do
+índice é mostrado separado, porque ele é feito uma única vez por versão da base.
+"""
+import sys
+import time
+
+import numpy as np
+from haversine import Unit, haversine_vector
+
+from utils.process_data import clean_data, compact_frame
+from utils.spatial import SpatialIndex
+
+RAW_DATA_PATH = r'data/raw_data/zomato.csv'
+SIZES = [1_000_000]
+
+# (ponto, raio em km, k)
+QUERIES = [
+    ((28.6139, 77.2090), 2, None),      # Nova Délhi, até 2 km
+    ((28.6139, 77.2090), 50, None),     # Nova Délhi, até 50 km
+    ((28.6139, 77.2090), None, 10),     # Nova Délhi, 10 mais próximos
+    ((-22.9068, -43.1729), None, 10),   # Rio de Janeiro, 10 mais próximos
+    ((0.0, -140.0), None, 10),          # Oceano Pacífico, 10 mais próximos
+]
+
+
+def scan_query(coordinates, point, radius_km, k):
+    """ Busca sem índice: distância de todos os restaurantes e ordenação. """
+    distances = haversine_vector(point, coordinates, Unit.KILOMETERS, comb=True).ravel()
+    positions = np.arange(len(distances))
+    if radius_km is not None:
+        positions = positions[distances <= radius_km]
+    order = np.argsort(distances[positions], kind='stable')[:k]
+    return positions[order], distances[positions][order]
+
+
+def best_of(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def main(sizes):
+    base = compact_frame(clean_data(RAW_DATA_PATH))
+    rng = np.random.default_rng(0)
+
+    print(f"{'linhas':>12} {'consulta':>9} {'restaurantes':>13} {'varredura (s)':>14} {'índice (s)':>11}")
+    for n_rows in sizes:
+        df1 = base.sample(n_rows, replace=True, random_state=0).reset_index(drop=True)
+        df1['latitude'] += rng.uniform(-0.01, 0.01, n_rows)
+        df1['longitude'] += rng.uniform(-0.01, 0.01, n_rows)
+        coordinates = df1[['latitude', 'longitude']].to_numpy(dtype='float64')
+
+        start = time.perf_counter()
+        index = SpatialIndex(df1)
+        print(f'{n_rows:>12,} montagem do índice: {time.perf_counter() - start:.3f}s')
+
+        for number, (point, radius_km, k) in enumerate(QUERIES):
+            (expected, _), scan_time = best_of(lambda: scan_query(coordinates, point, radius_km, k))
+            (positions, _), index_time = best_of(lambda: index.nearby(point, radius_km, k))
+
+            # os dois caminhos precisam retornar os mesmos restaurantes, na mesma ordem
+            assert np.array_equal(positions, expected)
+
+            print(f'{n_rows:>12,} {number:>9} {len(positions):>13,} {scan_time:>14.4f} {index_time:>11.4f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,74 @@
+"""
+Benchmark da pirâmide de clusters do mapa: montagem (feita na criação/ingestão da base) e
+consulta dos clusters de uma tela do mapa em cada zoom, com o tamanho enviado ao navegador.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_pyramid                 # 100k e 1M restaurantes
+    python -m benchmarks.bench_pyramid 7000 2000000    # tamanhos escolhidos
+
+A base grande é gerada reamostrando a base limpa, com as coordenadas deslocadas em até
+~1 km para que os restaurantes repetidos não caiam no mesmo ponto. A tela do mapa tem o
+tamanho usado na página Geral, centrada em Nova Délhi (a cidade com mais restaurantes).
+"""
+import sys
+import time
+
+import numpy as np
+from streamlit_folium import generate_leaflet_string
+
+from utils.maps import cluster_layer
+from utils.process_data import clean_data, compact_frame
+from utils.pyramid import MAX_ZOOM, PYRAMID_KEYS, TILE_PIXELS, clusters
+from utils.store import summarize
+
+RAW_DATA_PATH = r'data/raw_data/zomato.csv'
+SIZES = [100_000, 1_000_000]
+
+MAP_WIDTH = 1366
+MAP_HEIGHT = 768
+CENTER = (28.6139, 77.2090)
+
+
+def screen_bounds(center, zoom, width=MAP_WIDTH, height=MAP_HEIGHT):
+    """ Área visível de uma tela de <width> x <height> pixels centrada em <center>. """
+    world = TILE_PIXELS * 2 ** zoom
+    x = (center[1] + 180) / 360 * world
+    y = (1 - np.log(np.tan(np.radians(center[0])) + 1 / np.cos(np.radians(center[0]))) / np.pi) / 2 * world
+
+    def latitude(y):
+        return float(np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y / world)))))
+
+    def longitude(x):
+        return float(np.clip(x / world * 360 - 180, -180, 180))
+
+    return [[latitude(min(y + height / 2, world)), longitude(x - width / 2)],
+            [latitude(max(y - height / 2, 0)), longitude(x + width / 2)]]
+
+
+def main(sizes):
+    base = compact_frame(clean_data(RAW_DATA_PATH))
+    rng = np.random.default_rng(0)
+
+    for n_rows in sizes:
+        df1 = base.sample(n_rows, replace=True, random_state=0).reset_index(drop=True)
+        df1['restaurant_id'] = np.arange(n_rows, dtype='int32')
+        df1['latitude'] += rng.uniform(-0.01, 0.01, n_rows)
+        df1['longitude'] += rng.uniform(-0.01, 0.01, n_rows)
+
+        start = time.perf_counter()
+        pyramid = summarize(df1, PYRAMID_KEYS)
+        print(f'{n_rows:>12,} restaurantes: pirâmide com {len(pyramid):,} células em {time.perf_counter() - start:.2f}s')
+
+        print(f"{'zoom':>6} {'clusters':>9} {'restaurantes':>13} {'consulta (s)':>13} {'camada (KB)':>12}")
+        for zoom in range(0, MAX_ZOOM + 3, 2):
+            start = time.perf_counter()
+            df_aux = clusters(pyramid, zoom, screen_bounds(CENTER, zoom))
+            layer = cluster_layer(df_aux, df1)
+            elapsed = time.perf_counter() - start
+
+            payload = len(generate_leaflet_string(layer).encode())
+            print(f'{zoom:>6} {len(df_aux):>9,} {df_aux["restaurants"].sum():>13,} {elapsed:>13.4f} {payload / 1024:>12.1f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
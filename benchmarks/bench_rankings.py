@@ -0,0 +1,140 @@
+"""
+Benchmark dos rankings da página Cuisines:
+    - cards das 5 principais culinárias calculados como era feito na página (um agrupamento e
+      duas ordenações por card) x uma única passada (utils.rankings.top_cuisines);
+    - tabela dos N melhores restaurantes filtrados: ordenação completa dos restaurantes
+      filtrados x ranking global da base (utils.rankings.RankIndex).
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_rankings                   # 100k e 1M restaurantes
+    python -m benchmarks.bench_rankings 7000 1000000      # tamanhos escolhidos
+
+A base grande é gerada reamostrando a base limpa (tipos compactos), com restaurant_id únicos.
+O tempo de montagem do ranking global é mostrado separado, porque ele é feito uma única vez
+por versão da base.
+"""
+import sys
+import time
+
+import numpy as np
+
+from utils.filters import select_rows
+from utils.process_data import clean_data, compact_frame
+from utils.rankings import BEST_COLUMNS, TOP_COLUMNS, RankIndex, top_cuisines
+
+RAW_DATA_PATH = r'data/raw_data/zomato.csv'
+SIZES = [100_000, 1_000_000]
+CARDS = 5
+
+# Filtros da tabela: (países, tipos de preço, nota mínima); None = todos os valores
+ALL_PRICES = ['cheap', 'normal', 'expensive', 'gourmet']
+FILTERS = [
+    (None, ALL_PRICES, 0.0),                       # base inteira
+    (['India'], ALL_PRICES, 0.0),                  # país com mais restaurantes
+    (['Brazil', 'England'], ['gourmet'], 4.0),     # seleção pequena
+]
+TOP_N = [10, 500]
+
+
+def cuisine_counts(df1):
+    """ Quantidade de restaurantes por culinária, como era feito na página (ordenação completa). """
+    return (df1.loc[:,['cuisines','votes']]
+               .groupby('cuisines', observed=True)
+               .count()
+               .sort_values('votes', ascending = False)
+               .reset_index())
+
+
+def best_restaurant(df1, cuisine):
+    """ Melhor restaurante de uma culinária, como era feito na página (filtro e ordenação completa). """
+    df_aux = df1.loc[df1['cuisines'].isin([cuisine]),:]
+    df_aux = (df_aux.loc[:,BEST_COLUMNS]
+                    .sort_values(['aggregate_rating','restaurant_id'], ascending=[False, True])
+                    .reset_index(drop=True)
+                    .head(1))
+    return tuple(df_aux.iloc[0])
+
+
+def cards_legacy(df1):
+    """ Os 5 cards como eram feitos na página: contagem, filtro e ordenação refeitos em cada card. """
+    return [best_restaurant(df1, cuisine_counts(df1).iloc[placement,0]) for placement in range(CARDS)]
+
+
+def cards_single_pass(df1):
+    top = top_cuisines(df1, CARDS)
+    return [tuple(card) for card in top.loc[:, BEST_COLUMNS].itertuples(index=False)], top
+
+
+def check(df1, cards, top):
+    """
+    Confere o resultado de uma passada com o da página.
+
+    Culinárias com a mesma quantidade de restaurantes podem aparecer em outra ordem (a
+    ordenação da página não era estável), então são conferidas a quantidade de restaurantes
+    de cada posição e o melhor restaurante de cada culinária escolhida.
+    """
+    counts = cuisine_counts(df1)
+    assert top['restaurants'].tolist() == counts['votes'].head(CARDS).tolist()
+    assert top['restaurants'].tolist() == counts.set_index('cuisines').loc[top['cuisines'], 'votes'].tolist()
+    assert cards == [best_restaurant(df1, card[3]) for card in cards]
+
+
+def top_legacy(df1, n):
+    """ Tabela como era feita na página: ordenação completa dos restaurantes filtrados. """
+    return (df1.loc[:,TOP_COLUMNS]
+               .sort_values(['aggregate_rating','restaurant_id'], ascending=[False, True])
+               .reset_index(drop=True)
+               .head(n))
+
+
+def best_of(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def main(sizes):
+    base = compact_frame(clean_data(RAW_DATA_PATH))
+
+    print(f"{'linhas':>12} {'5 cards, página (s)':>20} {'uma passada (s)':>16}")
+    for n_rows in sizes:
+        df1 = base.sample(n_rows, replace=True, random_state=0).reset_index(drop=True)
+        df1['restaurant_id'] = np.arange(n_rows, dtype='int32')
+
+        _, legacy_time = best_of(lambda: cards_legacy(df1))
+        (cards, top), single_time = best_of(lambda: cards_single_pass(df1))
+
+        # os cards precisam mostrar as mesmas quantidades e os mesmos melhores restaurantes
+        check(df1, cards, top)
+
+        print(f'{n_rows:>12,} {legacy_time:>20.4f} {single_time:>16.4f}')
+
+    print()
+    print(f"{'linhas':>12} {'filtro':>7} {'filtrados':>10} {'N':>5} {'ordenação (s)':>14} {'ranking (s)':>12}")
+    for n_rows in sizes:
+        df1 = base.sample(n_rows, replace=True, random_state=0).reset_index(drop=True)
+        df1['restaurant_id'] = np.arange(n_rows, dtype='int32')
+
+        start = time.perf_counter()
+        index = RankIndex(df1)
+        print(f'{n_rows:>12,} montagem do ranking: {time.perf_counter() - start:.3f}s')
+
+        for number, (countries, prices, min_rating) in enumerate(FILTERS):
+            rows = select_rows(df1, countries or df1['country'].unique().tolist(), prices, min_rating)
+            df_filtered = df1.take(rows)
+
+            for n in TOP_N:
+                expected, legacy_time = best_of(lambda: top_legacy(df_filtered, n))
+                positions, index_time = best_of(lambda: index.top(rows, n))
+
+                # as duas tabelas precisam ter os mesmos restaurantes, na mesma ordem
+                assert df1.take(positions).loc[:, TOP_COLUMNS].reset_index(drop=True).equals(expected)
+
+                print(f'{n_rows:>12,} {number:>7} {len(rows):>10,} {n:>5} {legacy_time:>14.4f} {index_time:>12.4f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
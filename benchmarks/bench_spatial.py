@@ -0,0 +1,80 @@
+"""
+Benchmark das consultas do mapa por área visível: máscara sobre a base inteira x índice espacial.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_spatial                   # 1M e 10M linhas
+    python -m benchmarks.bench_spatial 100000 1000000    # tamanhos escolhidos
+
+A base grande é gerada reamostrando a base limpa (tipos compactos). O tempo de montagem do
+índice é mostrado separado, porque ele é feito uma única vez por versão da base.
+"""
+import sys
+import time
+
+import numpy as np
+
+from utils.filters import select_rows
+from utils.process_data import clean_data, compact_frame
+from utils.spatial import MAX_RESULTS, SpatialIndex
+
+RAW_DATA_PATH = r'data/raw_data/zomato.csv'
+SIZES = [1_000_000, 10_000_000]
+
+ALL_PRICES = ['cheap', 'normal', 'expensive', 'gourmet']
+
+# área visível [[lat mín, lon mín], [lat máx, lon máx]]
+BOUNDS = [
+    [[28.5, 77.0], [28.75, 77.4]],      # Nova Délhi
+    [[-23.8, -46.9], [-23.4, -46.4]],   # São Paulo
+    [[-60.0, -180.0], [80.0, 180.0]],   # mundo todo
+]
+
+
+def mask_query(df1, bounds, rows):
+    """ Consulta sem índice: máscara das coordenadas na base inteira e ordenação pela nota. """
+    (south, west), (north, east) = bounds
+    latitude = df1['latitude'].to_numpy()
+    longitude = df1['longitude'].to_numpy()
+
+    mask = np.zeros(len(df1), dtype=bool)
+    mask[rows] = True
+    mask &= (latitude >= south) & (latitude <= north) & (longitude >= west) & (longitude <= east)
+
+    positions = np.flatnonzero(mask)
+    ratings = df1['aggregate_rating'].to_numpy(dtype='float64')[positions]
+    return positions[np.argsort(-ratings, kind='stable')[:MAX_RESULTS]]
+
+
+def best_of(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def main(sizes):
+    base = compact_frame(clean_data(RAW_DATA_PATH))
+
+    print(f"{'linhas':>12} {'área':>5} {'restaurantes':>13} {'máscara (s)':>12} {'índice (s)':>11}")
+    for n_rows in sizes:
+        df1 = base.sample(n_rows, replace=True, random_state=0).reset_index(drop=True)
+        rows = select_rows(df1, df1['country'].unique().tolist(), ALL_PRICES, 0.0)
+
+        start = time.perf_counter()
+        index = SpatialIndex(df1)
+        print(f'{n_rows:>12,} montagem do índice: {time.perf_counter() - start:.3f}s')
+
+        for number, bounds in enumerate(BOUNDS):
+            expected, mask_time = best_of(lambda: mask_query(df1, bounds, rows))
+            positions, index_time = best_of(lambda: index.query(bounds, rows=rows))
+
+            # os dois caminhos precisam retornar os mesmos restaurantes, na mesma ordem
+            assert np.array_equal(positions, expected)
+
+            print(f'{n_rows:>12,} {number:>5} {len(positions):>13,} {mask_time:>12.4f} {index_time:>11.4f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -9,209 +9,74 @@ import pandas as pd
 import streamlit as st
 from PIL import Image
 from datetime import datetime
-from folium.plugins import MarkerCluster
 
-from streamlit_folium import folium_static
-import inflection
+from streamlit_folium import st_folium
 
-#from process_data import clean_data
+from utils.artifacts import processed_download_data
+from utils.cube import slice_cube
+from utils.density import density_cells, density_level
+from utils.filters import filter_key, select_rows
+from utils.maps import MAP_LAYER_CACHE, base_map, bounds, cached_layer, cluster_layer, density_layer, restaurant_layer, returned_view, webgl_map
+from utils.pyramid import clusters, fit_zoom, pyramid_level
+from utils.spatial import nearby_restaurants, spatial_index
+from utils.store import load_cube, load_density, load_pyramid, load_store, open_store, store_version
 
 
+#-------------------------------------FUNÇÕES DO DASHBOARD--------------------------------------
 
-#==========================================================================
-#FUNÇÕES
-#==========================================================================
-# FUNÇÕES UTILIZADAS PARA AJUSTE E LIMPEZA DO DF
-
-#=====================================
-# Preenchimento do nome dos países
-
-COUNTRIES = {
-    1: "India",
-    14: "Australia",
-    30: "Brazil",
-    37: "Canada",
-    94: "Indonesia",
-    148: "New Zeland",
-    162: "Philippines",
-    166: "Qatar",
-    184: "Singapure",
-    189: "South Africa",
-    191: "Sri Lanka",
-    208: "Turkey",
-    214: "United Arab Emirates",
-    215: "England",
-    216: "United States of America",
-}
-def country_name(country_id):
-    return COUNTRIES[country_id]
-
-#=====================================
-# Criação do Tipo de classe do preço
-
-def create_price_type(price_range):
-    if price_range == 1:
-        return "cheap"
-    elif price_range == 2:
-        return "normal"
-    elif price_range == 3:
-        return "expensive"
-    else:
-        return "gourmet"
-
-#=====================================
-#Criação do nome das Cores
-
-COLORS = {
-    "3F7E00": "darkgreen",
-    "5BA829": "green",
-    "9ACD32": "lightgreen",
-    "CDD614": "orange",
-    "FFBA00": "red",
-    "CBCBC8": "darkred",
-    "FF7800": "darkred",
-}
-def color_name(color_code):
-    return COLORS[color_code]
-
-#=====================================
-#Renomear as colunas do DataFrame
-
-def rename_columns(df1):
-    df1 = df1.copy()
-    title = lambda x: inflection.titleize(x)
-    snakecase = lambda x: inflection.underscore(x)
-    spaces = lambda x: x.replace(" ", "")
-    cols_old = list(df1.columns)
-    cols_old = list(map(title, cols_old))
-    cols_old = list(map(spaces, cols_old))
-    cols_new = list(map(snakecase, cols_old))
-    df1.columns = cols_new
-    return df1
-
-#=====================================
-#LIMPANDO DADOS 
-
-def clean_data(file_path): 
+#=============================
+# Camada do mapa: clusters da pirâmide ou, com poucos restaurantes na área visível, os próprios
+# restaurantes (ver utils.maps, utils.pyramid e utils.spatial)
 
-    """ Esta função realiza a limpeza da base
-    
+def map_layer(rows, view, countries, prices, rating):
     """
-    
-    df1 = pd.read_csv(file_path)
-
-    # Renomeando as colunas do DataFrame - ajustando os nomes.
-
-    df1 = rename_columns(df1)
-    
-    # Excluindo nan
-    df1 = df1.dropna()
-    
-    # categorizar todos os restaurantes somente por um tipo de culinária
-    df1['cuisines'] = df1.loc[:, 'cuisines'].astype(str).apply(lambda x: x.split(',')[0])
+    Monta a camada do mapa para a posição atual.
 
-    # Substituindo  os nomes dos países e renomeando a coluna
-    df1['country'] = df1.loc[:, 'country_code'].apply(lambda x: country_name(x))
+    Args:
+        rows (array): posições das linhas filtradas na base compartilhada
+        view (dict): zoom e área visível do mapa
+        countries, prices, rating: filtros da barra lateral
 
-    # Criação do Tipo de classe do preço
-    df1["price_type"] = df1.loc[:, "price_range"].apply(lambda x: create_price_type(x))
-    # Criação do nome das Cores
-    df1['color_name'] = df1.loc[:, 'rating_color'].apply(lambda x: color_name(x))
-
-    # Excluindo coluna com somente 1 dado 'switch_to_order_menu'
-
-    df1 = df1.drop('switch_to_order_menu', axis = 1)
+    Returns:
+        tuple: (camada, aviso para mostrar junto do mapa)
+    """
+    # Somente o nível do zoom atual da pirâmide compartilhada é filtrado, e somente os
+    # clusters dentro da área visível vão para o navegador
+    level = slice_cube(pyramid_level(load_pyramid(RAW_DATA_PATH), view['zoom']), countries, prices, min_rating=rating)
+    df_clusters = clusters(level, view['zoom'], view['bounds'])
+    in_view = int(df_clusters['restaurants'].sum())
 
-    #Excluindo entradas duplicadas
+    # Os popups dos clusters com um único restaurante e os restaurantes da área visível vêm
+    # da base compartilhada (os restaurantes dos clusters já atendem aos filtros)
+    restaurants = load_store(RAW_DATA_PATH)
 
-    df1 = df1.drop_duplicates().reset_index(drop=True)
+    if view['bounds'] is None or (view['zoom'] < DETAIL_ZOOM and in_view > MAX_MARKERS):
+        return cluster_layer(df_clusters, restaurants), ''
 
-    df1.to_csv("data\processed\data.csv", index=False)
+    # Restaurantes da área visível, consultados no índice espacial da base compartilhada
+    positions = spatial_index(restaurants).query(view['bounds'], limit=MAX_MARKERS, rows=rows)
 
+    note = ''
+    if len(positions) == MAX_MARKERS and in_view > MAX_MARKERS:
+        note = (f'Mostrando os {len(positions)} restaurantes de maior nota na área visível. '
+                'Aproxime o mapa para ver os demais.')
 
-    
-    return df1
-
-def adjust_columns_order(dataframe):
-    df1 = dataframe.copy()
-
-    new_cols_order = [
-        "restaurant_id",
-        "restaurant_name",
-        "country",
-        "city",
-        "address",
-        "locality",
-        "locality_verbose",
-        "longitude",
-        "latitude",
-        "cuisines",
-        "price_type",
-        "average_cost_for_two",
-        "currency",
-        "has_table_booking",
-        "has_online_delivery",
-        "is_delivering_now",
-        "aggregate_rating",
-        "rating_color",
-        "color_name",
-        "rating_text",
-        "votes",
-    ]
-
-    return df1.loc[:, new_cols_order]
-#-------------------------------------FUNÇÕES DO DASHBOARD--------------------------------------
+    return restaurant_layer(restaurants.take(positions)), note
 
-#=============================
-# Função para criar mapa
 
-def create_map (df1):
-    # Criando o mapa
-    fig = folium.Figure(width=1920, height=1080)
-    map_ = folium.Map( max_bounds=True ).add_to(fig)
-
-    # Criando um cluster de marcadores
-    marker_cluster = MarkerCluster().add_to(map_)
+def density_map_layer(density, view):
+    """
+    Monta a camada da grade de densidade para a posição atual (ver utils.density).
 
-    #Chamando colunas e DF auxiliar
-    columns = ['restaurant_name','city','longitude','latitude','aggregate_rating','address','cuisines','price_type', 'average_cost_for_two','currency','color_name']
+    Args:
+        density (dataframe): células da grade de densidade que atendem aos filtros
+        view (dict): zoom e área visível do mapa
 
-    data = df1.loc[:,columns]
-    
-    # Adicione marcadores para cada restaurante no DataFrame
-    for index, location_info in data.iterrows():
-        # Concatene 'average_cost_for_two' e 'currency' na mesma linha
-        cost_and_currency = f"{location_info['average_cost_for_two']} - {location_info['currency']}"
-        
-        # Concatene a classificação com "/5.0" ao valor da classificação
-        rating_with_suffix = f"Nota: {location_info['aggregate_rating']}/5.0"
-        
-        # dá cor aos ícones
-        color = f'{location_info["color_name"]}'
-        
-        #incluindo as informações no popup
-        popup_html = f"<b>Restaurante:</b> {location_info['restaurant_name']}<br>"
-        popup_html += f"<b>Cidade:</b> {location_info['city']}<br>"
-        popup_html += f"<b>Culinária:</b> {location_info['cuisines']}<br>"
-        popup_html += f"{rating_with_suffix}<br>"
-        popup_html += f"<b>Média do prato para 2 pessoas:</b> {cost_and_currency}<br>"
-        popup_html += f"<b>Endereço:</b> {location_info['address']}"
-        
-        popup = folium.Popup(
-                            folium.Html(popup_html, script=True),
-                            max_width=500,
-                             )
-
-        folium.Marker(
-            [location_info["latitude"], location_info["longitude"]],
-            popup=popup,
-            icon=folium.Icon(color=color, icon="home", prefix="fa"),
-        ).add_to(marker_cluster)
-    
-    #Ajustar o zoom e a posição do mapa para incluir os marcadores, mapa inicia com zoom próximo aos marcadores   
-    map_.fit_bounds(map_.get_bounds(), padding=(100, 100))
-
-    return map_
+    Returns:
+        tuple: (camada, aviso para mostrar junto do mapa)
+    """
+    level = density_level(view['zoom'])
+    return density_layer(density_cells(density, level, view['bounds'])), ''
 
 #*************************************************************************************************************
 #===================================== INICIO ESTRUTURA LÓGICA DO CÓDIGO =====================================
@@ -221,7 +86,27 @@ def create_map (df1):
 
 RAW_DATA_PATH = r'data/raw_data/zomato.csv'
 
-df1 = clean_data(RAW_DATA_PATH) # Limpando Dataset com função criada.
+# Tamanho do mapa na página (em pixels)
+MAP_WIDTH = 1366
+MAP_HEIGHT = 768
+
+# A partir deste zoom, ou com até MAX_MARKERS restaurantes na área visível, o mapa mostra os
+# restaurantes em vez dos clusters (no máximo MAX_MARKERS, os de maior nota)
+DETAIL_ZOOM = 13
+MAX_MARKERS = 500
+
+# Acima desta quantidade de restaurantes filtrados o mapa é desenhado com WebGL (todos os
+# restaurantes como pontos, ver utils.maps.webgl_map) em vez dos marcadores do Leaflet
+WEBGL_MIN_POINTS = 20_000
+
+# Colunas da tabela de restaurantes próximos
+NEARBY_COLUMNS = ['restaurant_name', 'city', 'cuisines', 'aggregate_rating', 'average_cost_for_two',
+                  'currency', 'distance_km']
+
+# Colunas dos restaurantes filtrados usadas no enquadramento do mapa e no mapa WebGL
+POINT_COLUMNS = ['latitude', 'longitude', 'aggregate_rating', 'color_name']
+
+df1 = load_store(RAW_DATA_PATH) # Base limpa (cache do CSV bruto + atualizações ingeridas).
 
 
 #=====================================
@@ -253,7 +138,7 @@ with st.sidebar:
     #Seleção para o filtro de países
     st.header('Filtros')
     #Variável
-    countries = df1['country'].unique()
+    countries = df1['country'].unique().tolist()
     #Criando filtro
     countries_filter = st.multiselect(
     'Escolha os países que deseja visualizar',
@@ -263,7 +148,7 @@ with st.sidebar:
 
     #Filtro por valor
     #Variável
-    price = df1['price_type'].unique()
+    price = df1['price_type'].unique().tolist()
     #Criando filtro
     price_filter = st.multiselect(
     'Escolha os restaurantes pelo preço',
@@ -285,12 +170,10 @@ with st.sidebar:
     st.divider()
 
 
-    processed_data = pd.read_csv("./data/processed/data.csv")
- 
     #BOTÃO PARA DOWNLOAD DA BASE SEM FILTROS
     st.download_button(
         label="Download Data",
-        data=processed_data.to_csv(index=False, sep=";"),
+        data=processed_download_data(), # CSV publicado, convertido uma vez por versão
         file_name="data.csv",
         mime="text/csv",
     )
@@ -298,15 +181,16 @@ with st.sidebar:
 
 
 
-#Filtro de paises - filtra o df inteiro conforme a slecção acima
-filtro = df1['country'].isin(countries_filter)
-df1 = df1.loc[filtro,:]
+#Filtros de países, preço e nota - uma única máscara sobre a base compartilhada,
+#e somente as colunas do mapa das linhas selecionadas são copiadas
+rows = select_rows(df1, countries_filter, price_filter, rating_filter)
+points = df1.loc[:, POINT_COLUMNS].take(rows)
 
-filtro = df1['price_type'].isin(price_filter)
-df1 = df1.loc[filtro,:]
+#Os indicadores somam somente as células do cubo de agregados que atendem aos filtros
+cube = slice_cube(load_cube(RAW_DATA_PATH), countries_filter, price_filter, min_rating=rating_filter)
 
-filtro = df1['aggregate_rating'] >= rating_filter
-df1 = df1.loc[filtro,:]
+#A camada de densidade soma as células da grade que atendem aos filtros
+density = slice_cube(load_density(RAW_DATA_PATH), countries_filter, price_filter, min_rating=rating_filter)
 
 
 #=====================================
@@ -321,7 +205,7 @@ with st.container():
     
     with restaurants:
         # Verificando quantidade de restaurantes cadastrados - Não considerei o nome, somente id
-        quant = len(df1["restaurant_id"].unique())
+        quant = int(cube['restaurants'].sum())
         
         #mostrando as quantidades
         restaurants.metric('Restaurantes Cadastrados',
@@ -329,35 +213,106 @@ with st.container():
 
     with countries:
         # Verificando quantidade de países
-        quant = len(df1['country'].unique())
+        quant = cube['country'].nunique()
                     
         countries.metric('Paises Cadastrados', quant)
     with cities:
         # Verificando quantidade de cidades
-        quant = len(df1["city"].unique())
+        quant = cube['city'].nunique()
             
         cities.metric('Cidades Cadastradas', quant)
     
     with ratings:
         # Verificando quantidade de cidades
-        quant = df1['votes'].sum()
+        quant = int(cube['votes_sum'].sum())
             
         ratings.metric('Avaliações feitas na plataforma', 
                        f'{quant:,}'.replace(',','.'))
     
     with cuisines:
         # Verificando quantidade de culinárias
-        quant = len(df1['cuisines'].unique())
+        quant = cube['cuisines'].nunique()
             
         cuisines.metric('Tipos de culinária oferecida', quant)        
    
 with st.container():
     st.title("Local dos restaurantes")
 
-    #Chamando função para criar mapa
-    map_ = create_map(df1)
+    # Enquadramento inicial: todos os restaurantes filtrados
+    data_bounds = bounds(points) if len(points) > 0 else None
 
-    # Exiba o mapa no Streamlit
-    folium_static(map_, width=1366, height=768)   
-    
+    # Restaurantes (clusters/marcadores) ou grade de densidade com a quantidade, a nota média
+    # e o custo médio por célula
+    layer_mode = st.radio('Camada do mapa', ['Restaurantes', 'Densidade'], horizontal=True)
+
+    if layer_mode == 'Restaurantes' and len(points) > WEBGL_MIN_POINTS:
+        # Muitos restaurantes: todos os pontos de uma vez, desenhados pelo navegador com WebGL
+        st.caption(f'{len(points):,} restaurantes no mapa (modo WebGL).'.replace(',','.'))
+        st.plotly_chart(webgl_map(points, data_bounds, MAP_WIDTH, MAP_HEIGHT),
+                        config={'scrollZoom': True})
+
+    else:
+        # Posição atual do mapa (zoom e área visível), guardada entre os reruns. Quando os
+        # filtros mudam o mapa volta para o enquadramento inicial.
+        filters = filter_key(countries_filter, price_filter, rating_filter)
+        view = st.session_state.get('map_view')
+        if view is None or view['filters'] != filters:
+            zoom = fit_zoom(data_bounds, MAP_WIDTH, MAP_HEIGHT) if data_bounds is not None else 0
+            view = {'filters': filters, 'zoom': zoom, 'bounds': data_bounds}
+        st.session_state['map_view'] = view
+
+        # Camada guardada no cache pela versão da base, tipo de camada, filtros e posição do mapa:
+        # reruns que não mudam o mapa (ex.: outro widget) não refazem a consulta nem o JS dos marcadores
+        version = store_version(open_store(RAW_DATA_PATH))
+        view_bounds = tuple(map(tuple, view['bounds'])) if view['bounds'] is not None else None
+        if layer_mode == 'Densidade':
+            build = lambda: density_map_layer(density, view)
+        else:
+            build = lambda: map_layer(rows, view, countries_filter, price_filter, rating_filter)
+        layer, note = cached_layer((version, layer_mode, filters, view['zoom'], view_bounds), build)
+        if note:
+            st.caption(note)
+
+        # Exiba o mapa no Streamlit
+        state = st_folium(base_map(data_bounds),
+                          width=MAP_WIDTH,
+                          height=MAP_HEIGHT,
+                          returned_objects=['zoom', 'bounds'],
+                          feature_group_to_add=layer)
+
+        cache_stats = MAP_LAYER_CACHE.stats()
+        st.caption(f"Cache do mapa: {cache_stats['hits']} acertos, {cache_stats['misses']} falhas, "
+                   f"{cache_stats['entries']} camadas ({cache_stats['bytes'] / 2**20:.1f} MB)")
+
+        # O usuário moveu o mapa ou mudou o zoom: a camada é refeita para a nova posição
+        current = returned_view(state)
+        if current is not None and (current['zoom'], current['bounds']) != (view['zoom'], view['bounds']):
+            st.session_state['map_view'] = {**view, **current}
+            st.rerun()
 
+
+with st.container():
+    st.title("Restaurantes perto de você")
+
+    # Ponto inicial: centro do enquadramento dos restaurantes filtrados
+    (south, west), (north, east) = data_bounds if data_bounds is not None else [[0.0, 0.0], [0.0, 0.0]]
+
+    latitude_col, longitude_col, mode_col, value_col = st.columns(4)
+    latitude = latitude_col.number_input('Latitude', -90.0, 90.0, round((south + north) / 2, 4), format='%.4f')
+    longitude = longitude_col.number_input('Longitude', -180.0, 180.0, round((west + east) / 2, 4), format='%.4f')
+    nearby_mode = mode_col.radio('Buscar', ['Mais próximos', 'Dentro de um raio'])
+
+    # Busca no índice espacial da base compartilhada, somente entre os restaurantes filtrados
+    restaurants = load_store(RAW_DATA_PATH)
+    if nearby_mode == 'Mais próximos':
+        k = value_col.number_input('Quantidade de restaurantes', 1, 1000, 10)
+        df_aux = nearby_restaurants(restaurants, (latitude, longitude), k=k, rows=rows)
+    else:
+        radius = value_col.number_input('Raio (km)', 0.1, 20000.0, 5.0)
+        df_aux = nearby_restaurants(restaurants, (latitude, longitude), radius_km=radius, k=MAX_MARKERS, rows=rows)
+        if len(df_aux) == MAX_MARKERS:
+            st.caption(f'Mostrando os {MAX_MARKERS} restaurantes mais próximos dentro do raio.')
+
+    st.dataframe(df_aux.loc[:, NEARBY_COLUMNS].round({'distance_km': 2}),
+                 use_container_width=True,
+                 hide_index=True)
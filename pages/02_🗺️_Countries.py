@@ -11,175 +11,34 @@ from PIL import Image
 from datetime import datetime
 
 from streamlit_folium import folium_static
-import inflection
 
-#from utils.process_data import clean_data
+from utils.artifacts import processed_download_data
+from utils.cube import rollup, slice_cube
+from utils.grouping import group_aggregate
+from utils.store import load_cube, load_store
 
 
-#==========================================================================
-#FUNÇÕES
-#==========================================================================
-# FUNÇÕES UTILIZADAS PARA AJUSTE E LIMPEZA DO DF
-
-#=====================================
-# Preenchimento do nome dos países
-
-COUNTRIES = {
-    1: "India",
-    14: "Australia",
-    30: "Brazil",
-    37: "Canada",
-    94: "Indonesia",
-    148: "New Zeland",
-    162: "Philippines",
-    166: "Qatar",
-    184: "Singapure",
-    189: "South Africa",
-    191: "Sri Lanka",
-    208: "Turkey",
-    214: "United Arab Emirates",
-    215: "England",
-    216: "United States of America",
-}
-def country_name(country_id):
-    return COUNTRIES[country_id]
-
-#=====================================
-# Criação do Tipo de classe do preço
-
-def create_price_type(price_range):
-    if price_range == 1:
-        return "cheap"
-    elif price_range == 2:
-        return "normal"
-    elif price_range == 3:
-        return "expensive"
-    else:
-        return "gourmet"
-
-#=====================================
-#Criação do nome das Cores
-
-COLORS = {
-    "3F7E00": "darkgreen",
-    "5BA829": "green",
-    "9ACD32": "lightgreen",
-    "CDD614": "orange",
-    "FFBA00": "red",
-    "CBCBC8": "darkred",
-    "FF7800": "darkred",
-}
-def color_name(color_code):
-    return COLORS[color_code]
-
-#=====================================
-#Renomear as colunas do DataFrame
-
-def rename_columns(df1):
-    df1 = df1.copy()
-    title = lambda x: inflection.titleize(x)
-    snakecase = lambda x: inflection.underscore(x)
-    spaces = lambda x: x.replace(" ", "")
-    cols_old = list(df1.columns)
-    cols_old = list(map(title, cols_old))
-    cols_old = list(map(spaces, cols_old))
-    cols_new = list(map(snakecase, cols_old))
-    df1.columns = cols_new
-    return df1
-
-#=====================================
-#LIMPANDO DADOS 
-
-def clean_data(file_path): 
-
-    """ Esta função realiza a limpeza da base
-    
-    """
-    
-    df1 = pd.read_csv(file_path)
-
-    # Renomeando as colunas do DataFrame - ajustando os nomes.
-
-    df1 = rename_columns(df1)
-    
-    # Excluindo nan
-    df1 = df1.dropna()
-    
-    # categorizar todos os restaurantes somente por um tipo de culinária
-    df1['cuisines'] = df1.loc[:, 'cuisines'].astype(str).apply(lambda x: x.split(',')[0])
-
-    # Substituindo  os nomes dos países e renomeando a coluna
-    df1['country'] = df1.loc[:, 'country_code'].apply(lambda x: country_name(x))
-
-    # Criação do Tipo de classe do preço
-    df1["price_type"] = df1.loc[:, "price_range"].apply(lambda x: create_price_type(x))
-    # Criação do nome das Cores
-    df1['color_name'] = df1.loc[:, 'rating_color'].apply(lambda x: color_name(x))
-
-    # Excluindo coluna com somente 1 dado 'switch_to_order_menu'
-
-    df1 = df1.drop('switch_to_order_menu', axis = 1)
-
-    #Excluindo entradas duplicadas
-
-    df1 = df1.drop_duplicates().reset_index(drop=True)
-
-    df1.to_csv("data\processed\data.csv", index=False)
-
-
-    
-    return df1
-
-def adjust_columns_order(dataframe):
-    df1 = dataframe.copy()
-
-    new_cols_order = [
-        "restaurant_id",
-        "restaurant_name",
-        "country",
-        "city",
-        "address",
-        "locality",
-        "locality_verbose",
-        "longitude",
-        "latitude",
-        "cuisines",
-        "price_type",
-        "average_cost_for_two",
-        "currency",
-        "has_table_booking",
-        "has_online_delivery",
-        "is_delivering_now",
-        "aggregate_rating",
-        "rating_color",
-        "color_name",
-        "rating_text",
-        "votes",
-    ]
-
-    return df1.loc[:, new_cols_order]
-
 #-------------------------------------FUNÇÕES DO DASHBOARD--------------------------------------
 
 #=====================================
 #Quantidade de restaurantes por país 
 
-def restaurants_by_country(df1):
+def restaurants_by_country(cube):
     """
     A função é utilizada para criar um gráfico de barras, mostrando a quantidade de restaurantes em cada país.
 
     Args:
-        df1 (dataframe): dataframe utilizado
+        cube (dataframe): células do cubo de agregados que atendem aos filtros (ver utils.cube)
 
     Returns:
         fig: retorna o gráfico que será mostrado ao inseri-lo na função do streamlit.
     """
-    #Criando novo DF agrupando os restaurantes por país e contando a quantidade.
-    df_aux = (df1.loc[:,['country','restaurant_id']]
-                .groupby(['country'])
-                .count()
+    #Criando novo DF somando as células do cubo por país (quantidade de restaurantes).
+    df_aux = (rollup(cube, ['country'])
+                .loc[:,['country','restaurants']]
+                .rename(columns={'restaurants':'restaurant_id'})
                 .sort_values('restaurant_id', ascending = False)
-                .reset_index())
+                .reset_index(drop=True))
     
     #imprimindo gráfico
     fig = px.bar(df_aux, 
@@ -212,22 +71,20 @@ def restaurants_by_country(df1):
     #Quantidade de cidades por país
 
 
-def cities_by_country(df1):
+def cities_by_country(cube):
     """
     A função é utilizada para criar um gráfico de barras, mostrando a quantidade de cidades que possuem em restaurantes, segregado por país.
 
     Args:
-        df1 (dataframe): dataframe utilizado
+        cube (dataframe): células do cubo de agregados que atendem aos filtros (ver utils.cube)
 
     Returns:
         fig: retorna o gráfico que será mostrado ao inseri-lo na função do streamlit.
     """
     #Quantidade de cidades por país
-    df_aux = (df1.loc[:,['country','city']]
-                                            .groupby(['country'])
-                                            .nunique()
+    df_aux = (group_aggregate(cube, ['country'], {'city': ('city', 'nunique')})
                                             .sort_values('city', ascending = False)
-                                            .reset_index())
+                                            .reset_index(drop=True))
 
     #imprimindo gráfico
     fig = px.bar(df_aux, 
@@ -260,7 +117,7 @@ def cities_by_country(df1):
 
 #=====================================
 #Média de avaliações feitas por país
-def votes_by_country (df1):
+def votes_by_country (cube):
     
     """
     A função é utilizada para criar um gráfico de barras, mostrando a média de avaliações
@@ -268,18 +125,17 @@ def votes_by_country (df1):
     
 
     Args:
-        df1 (dataframe): dataframe utilizado
+        cube (dataframe): células do cubo de agregados que atendem aos filtros (ver utils.cube)
 
     Returns:
         fig: retorna o gráfico que será mostrado ao inseri-lo na função do streamlit.
     """
     #Média de avaliações feitas por país
     
-    df_aux = round(df1.loc[:,['country','votes']]
-                                                    .groupby('country')
-                                                    .mean()
+    df_aux = round(rollup(cube, ['country'])
+                                                    .loc[:,['country','votes']]
                                                     .sort_values('votes', ascending= True)
-                                                    .reset_index(),2)
+                                                    .reset_index(drop=True),2)
     
     #imprimindo Gráfico
     fig = px.bar(df_aux, 
@@ -309,22 +165,21 @@ def votes_by_country (df1):
 
 #=====================================
 # média de preço de um prato para duas pessoas por país
-def cost_by_country (df1):
+def cost_by_country (cube):
     """
     A função é utilizada para criar um gráfico de barras, mostrando a média do preço
     de um prato para duas pessoas em cada país.    
 
     Args:
-        df1 (dataframe): dataframe utilizado
+        cube (dataframe): células do cubo de agregados que atendem aos filtros (ver utils.cube)
 
     Returns:
         fig: retorna o gráfico que será mostrado ao inseri-lo na função do streamlit.
     """      
-    df_aux = round(df1.loc[:,['country','average_cost_for_two','currency']]
-                                                                    .groupby(['country','currency'])
-                                                                    .mean()
+    df_aux = round(rollup(cube, ['country','currency'])
+                                                                    .loc[:,['country','currency','average_cost_for_two']]
                                                                     .sort_values('average_cost_for_two', ascending= True)
-                                                                    .reset_index(),2)
+                                                                    .reset_index(drop=True),2)
     #imprimindo Gráfico
     fig = px.bar(df_aux, 
                 x='average_cost_for_two', 
@@ -359,7 +214,7 @@ def cost_by_country (df1):
 
 RAW_DATA_PATH = r'data/raw_data/zomato.csv'
 
-df1 = clean_data(RAW_DATA_PATH) # Limpando Dataset com função criada.
+df1 = load_store(RAW_DATA_PATH) # Base limpa (cache do CSV bruto + atualizações ingeridas).
 
 
 #=====================================
@@ -390,7 +245,7 @@ with st.sidebar:
     #Seleção para o filtro de países
     st.header('Filtros')
     #Variável
-    countries = df1['country'].unique()
+    countries = df1['country'].unique().tolist()
     #Criando filtro
     countries_filter = st.multiselect(
     'Escolha os países que deseja visualizar',
@@ -400,7 +255,7 @@ with st.sidebar:
 
     #Filtro por valor
     #Variável
-    price = df1['price_type'].unique()
+    price = df1['price_type'].unique().tolist()
     #Criando filtro
     price_filter = st.multiselect(
     'Escolha os restaurantes pelo preço',
@@ -422,12 +277,10 @@ with st.sidebar:
     st.divider()
 
 
-    processed_data = pd.read_csv("./data/processed/data.csv")
- 
     #BOTÃO PARA DOWNLOAD DA BASE SEM FILTROS
     st.download_button(
         label="Download Data",
-        data=processed_data.to_csv(index=False, sep=";"),
+        data=processed_download_data(), # CSV publicado, convertido uma vez por versão
         file_name="data.csv",
         mime="text/csv",
     )
@@ -435,15 +288,9 @@ with st.sidebar:
 
 
 
-#Filtro de paises - filtra o df inteiro conforme a slecção acima
-filtro = df1['country'].isin(countries_filter)
-df1 = df1.loc[filtro,:]
-
-filtro = df1['price_type'].isin(price_filter)
-df1 = df1.loc[filtro,:]
-
-filtro = df1['aggregate_rating'] >= rating_filter
-df1 = df1.loc[filtro,:]
+#Filtros de países, preço e nota - os gráficos somam somente as células do cubo de
+#agregados que atendem aos filtros, sem percorrer os restaurantes
+cube = slice_cube(load_cube(RAW_DATA_PATH), countries_filter, price_filter, min_rating=rating_filter)
 
 #=====================================
 #Layout no Streamlit
@@ -456,7 +303,7 @@ with st.container():
     st.subheader('Quantidade de restaurantes registrados por país')
       
     #Chamando a função
-    fig = restaurants_by_country(df1)
+    fig = restaurants_by_country(cube)
     
     #MOSTRANDO GRAFICO
     st.plotly_chart(fig, use_container_width=True)
@@ -468,7 +315,7 @@ with st.container():
     st.subheader('Quantidade de cidades por país')
        
     #Chamando a função
-    fig = cities_by_country(df1)
+    fig = cities_by_country(cube)
     
     #MOSTRANDO GRAFICO
     st.plotly_chart(fig, use_container_width=True)
@@ -485,7 +332,7 @@ with st.container():
         
         
         #Chamando a função
-        fig = votes_by_country(df1)
+        fig = votes_by_country(cube)
         
         #MOSTRANDO GRAFICO
         st.plotly_chart(fig, use_container_width=True)
@@ -497,7 +344,7 @@ with st.container():
         
         
         #Chamando a função
-        fig = cost_by_country(df1)
+        fig = cost_by_country(cube)
         
 
         #MOSTRANDO GRAFICO
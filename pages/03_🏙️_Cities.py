@@ -5,185 +5,50 @@ import plotly.graph_objects as go
 
 # bibliotecas necessárias
 import folium
+import numpy as np
 import pandas as pd
 import streamlit as st
 from PIL import Image
 from datetime import datetime
 
 from streamlit_folium import folium_static
-import inflection
 
-#from utils.process_data import clean_data
+from utils.artifacts import processed_download_data
+from utils.cities import cached_rating_histogram, cities_by_rating, city_distances, country_spread, nearest_cities
+from utils.cube import rollup, slice_cube
+from utils.grouping import group_aggregate
+from utils.filters import filter_key
+from utils.store import load_by_city, load_cube, load_store, open_store, store_version
 
 
-#==========================================================================
-#FUNÇÕES
-#==========================================================================
-# FUNÇÕES UTILIZADAS PARA AJUSTE E LIMPEZA DO DF
-
-#=====================================
-# Preenchimento do nome dos países
-
-COUNTRIES = {
-    1: "India",
-    14: "Australia",
-    30: "Brazil",
-    37: "Canada",
-    94: "Indonesia",
-    148: "New Zeland",
-    162: "Philippines",
-    166: "Qatar",
-    184: "Singapure",
-    189: "South Africa",
-    191: "Sri Lanka",
-    208: "Turkey",
-    214: "United Arab Emirates",
-    215: "England",
-    216: "United States of America",
-}
-def country_name(country_id):
-    return COUNTRIES[country_id]
-
-#=====================================
-# Criação do Tipo de classe do preço
-
-def create_price_type(price_range):
-    if price_range == 1:
-        return "cheap"
-    elif price_range == 2:
-        return "normal"
-    elif price_range == 3:
-        return "expensive"
-    else:
-        return "gourmet"
-
-#=====================================
-#Criação do nome das Cores
-
-COLORS = {
-    "3F7E00": "darkgreen",
-    "5BA829": "green",
-    "9ACD32": "lightgreen",
-    "CDD614": "orange",
-    "FFBA00": "red",
-    "CBCBC8": "darkred",
-    "FF7800": "darkred",
-}
-def color_name(color_code):
-    return COLORS[color_code]
-
-#=====================================
-#Renomear as colunas do DataFrame
-
-def rename_columns(df1):
-    df1 = df1.copy()
-    title = lambda x: inflection.titleize(x)
-    snakecase = lambda x: inflection.underscore(x)
-    spaces = lambda x: x.replace(" ", "")
-    cols_old = list(df1.columns)
-    cols_old = list(map(title, cols_old))
-    cols_old = list(map(spaces, cols_old))
-    cols_new = list(map(snakecase, cols_old))
-    df1.columns = cols_new
-    return df1
-
-#=====================================
-#LIMPANDO DADOS 
-
-def clean_data(file_path): 
-
-    """ Esta função realiza a limpeza da base
-    
-    """
-    
-    df1 = pd.read_csv(file_path)
-
-    # Renomeando as colunas do DataFrame - ajustando os nomes.
-
-    df1 = rename_columns(df1)
-    
-    # Excluindo nan
-    df1 = df1.dropna()
-    
-    # categorizar todos os restaurantes somente por um tipo de culinária
-    df1['cuisines'] = df1.loc[:, 'cuisines'].astype(str).apply(lambda x: x.split(',')[0])
-
-    # Substituindo  os nomes dos países e renomeando a coluna
-    df1['country'] = df1.loc[:, 'country_code'].apply(lambda x: country_name(x))
-
-    # Criação do Tipo de classe do preço
-    df1["price_type"] = df1.loc[:, "price_range"].apply(lambda x: create_price_type(x))
-    # Criação do nome das Cores
-    df1['color_name'] = df1.loc[:, 'rating_color'].apply(lambda x: color_name(x))
-
-    # Excluindo coluna com somente 1 dado 'switch_to_order_menu'
-
-    df1 = df1.drop('switch_to_order_menu', axis = 1)
-
-    #Excluindo entradas duplicadas
-
-    df1 = df1.drop_duplicates().reset_index(drop=True)
-
-    df1.to_csv("data\processed\data.csv", index=False)
-
-
-    
-    return df1
-
-def adjust_columns_order(dataframe):
-    df1 = dataframe.copy()
-
-    new_cols_order = [
-        "restaurant_id",
-        "restaurant_name",
-        "country",
-        "city",
-        "address",
-        "locality",
-        "locality_verbose",
-        "longitude",
-        "latitude",
-        "cuisines",
-        "price_type",
-        "average_cost_for_two",
-        "currency",
-        "has_table_booking",
-        "has_online_delivery",
-        "is_delivering_now",
-        "aggregate_rating",
-        "rating_color",
-        "color_name",
-        "rating_text",
-        "votes",
-    ]
-
-    return df1.loc[:, new_cols_order]
 #-------------------------------------FUNÇÕES DO DASHBOARD--------------------------------------
 
 #=====================================
 #Cria DF com a quantidade de restaurantes por cidade e país, e traz o id do restaurante mais antigo.
 
-def restaurant_per_city(df1):
+def restaurant_per_city(cube):
     """
     Esta função é responsável por criar o gráfico que mostra as cidades com mais restaurantes.
     
-    Para chamar a função, precisamos definir o DataFrame.
-    'seu_dataframe' - nome do DF utilizado
+    Para chamar a função, precisamos definir as células do cubo de agregados (ver utils.cube).
+    'cube_slice' - células que atendem aos filtros
     
     Chamando a função:
-    # Substitua 'seu_dataframe' pelo DataFrame que você deseja usar.
-    # restaurant_per_city(<seu_dataframe>)
+    # restaurant_per_city(<cube_slice>)
 
     A função irá retornar um fig, que pode ser utilizado diretamente na função de mostrar gráfico do Streamlit
     
     """    
-    df_aux = df1.loc[:,['restaurant_id','country', 'city']].groupby(['country','city']).agg(['count','min'])
+    df_aux = rollup(cube, ['country','city']).loc[:,['country','city','restaurants','min_restaurant_id']]
 
     # Renomeando colunas
-    df_aux.columns=['amount_of_restaurants','oldest_restaurant']
+    df_aux.columns=['country','city','amount_of_restaurants','oldest_restaurant']
 
     # reordenando DF
-    df_aux = df_aux.sort_values(['amount_of_restaurants', 'oldest_restaurant'], ascending=[False, True]).reset_index().head(10)
+    df_aux = df_aux.sort_values(['amount_of_restaurants', 'oldest_restaurant'], ascending=[False, True]).reset_index(drop=True).head(10)
+
+    # o plotly agrupa as cores pelo país: convertendo de category para texto
+    df_aux = df_aux.astype({'country': str, 'city': str})
 
     fig = px.bar(df_aux,x='city', y='amount_of_restaurants',
                                                                     text_auto=True, 
@@ -211,20 +76,21 @@ def restaurant_per_city(df1):
 
 
 #=====================================
-#Gráfico das top 7 cidades com mais restaurantes com média acima de 4 ou abaixo de 2.5
+#Gráfico das top 7 cidades com mais restaurantes com nota acima ou abaixo de um limite
 
-def restaurant_by_rating(df1,filtro='best/worst',title='something'):
+def restaurant_by_rating(histogram,above=None,below=None,title='something'):
     """
     Os gráficos gerados pela função, mostram a quantidade de restaurantes por cidade, que atendem o critério de
-    nota acima de 4.0 ou abaixo de 2.5, ficando a escolha através do parametro <filtro>
+    nota acima de <above> e/ou abaixo de <below> (ex.: acima de 4.0 para os melhores, abaixo de 2.5 para os piores).
     
     Retorna um gráfico de barras mostrando as top7 cidades com mais dos melhores ou dos piores restaurantes, 
     com base na classificação agregada.
 
     Parâmetros:
-    df (DataFrame): O DataFrame contendo os dados dos restaurantes.
-    filtro (str): 'best' para os restaurantes com nota acima de 4.0 (melhores restaurantes), 'worst' para os restaurantes com notas abaixo de 2.5 ( piores restaurantes ).
-    num_results (int): O número de resultados a serem exibidos no gráfico.
+    histogram (DataFrame): Histograma das notas de cada cidade, calculado uma única vez para os dois gráficos
+    e para qualquer limite de nota (ver utils.cities.cached_rating_histogram).
+    above (float): somente os restaurantes com nota acima deste valor.
+    below (float): somente os restaurantes com nota abaixo deste valor.
     title(str): Título do gráfico
     
     Retorna:
@@ -232,18 +98,14 @@ def restaurant_by_rating(df1,filtro='best/worst',title='something'):
     
     """
     
-    if filtro == 'best':
-        filtro = df1['aggregate_rating'] > 4
-    elif filtro == 'worst':
-        filtro = df1['aggregate_rating'] < 2.5
-    
     #CRIANDO NOVO DF
-    df_aux = (df1.loc[filtro,['restaurant_id','city','country']]
-            .groupby(['country', 'city'])
-            .count()
-            .sort_values('restaurant_id', ascending = False)
+    df_aux = (cities_by_rating(histogram, above=above, below=below)
+            .rename('restaurant_id')
             .reset_index()
-            .head(7))
+            .sort_values('restaurant_id', ascending = False)
+            .reset_index(drop=True)
+            .head(7)
+            .astype({'country': str, 'city': str})) # o plotly agrupa as cores pelo país: category -> texto
 
     #criando grafico
     fig = px.bar(df_aux,
@@ -284,12 +146,12 @@ def restaurant_by_rating(df1,filtro='best/worst',title='something'):
 
 #=====================================
 #Top 10 cidades com tipos de culinária distintos
-def cuisines_by_city(df1):
+def cuisines_by_city(cube):
     """
     Esta função é responsável por criar o gráfico que mostra as cidades com mais tipos de culinária distintos.
     
     Parâmetros:
-    df (DataFrame): O DataFrame contendo os dados dos restaurantes.
+    cube (DataFrame): As células do cubo de agregados que atendem aos filtros (ver utils.cube).
     
     Retorna:
     fig (plotly.graph_objs.Figure): O gráfico de barras.
@@ -297,12 +159,11 @@ def cuisines_by_city(df1):
     O retorno deve ser utilizado diretamente na função de mostrar gráfico do Streamlit
     """
     
-    df_aux = (df1.loc[:,['city','cuisines','country']]
-                .groupby(['country', 'city'])
-                .nunique()
+    df_aux = (group_aggregate(cube, ['country', 'city'], {'cuisines': ('cuisines', 'nunique')})
                 .sort_values('cuisines',ascending = False)
-                .reset_index()
-                .head(10))
+                .reset_index(drop=True)
+                .head(10)
+                .astype({'country': str, 'city': str})) # o plotly agrupa as cores pelo país: category -> texto
 
     #criando grafico
     fig = px.bar(df_aux,
@@ -327,6 +188,35 @@ def cuisines_by_city(df1):
     return fig
 
 
+#=====================================
+#Distância entre as cidades de um país
+
+def city_distance_heatmap(cities, matrix, max_cities=40):
+    """
+    Esta função é responsável por criar o mapa de calor com as distâncias entre as cidades de um país.
+
+    Parâmetros:
+    cities (DataFrame): As cidades do país, na ordem da matriz (ver utils.cities.city_distances).
+    matrix (array): As distâncias entre as cidades, em km.
+    max_cities (int): Quantidade máxima de cidades no gráfico (as com mais restaurantes).
+
+    Retorna:
+    fig (plotly.graph_objs.Figure): O mapa de calor.
+    """
+    # somente as cidades com mais restaurantes, para o gráfico continuar legível
+    top = np.sort(np.argsort(-cities['restaurants'].to_numpy(), kind='stable')[:max_cities])
+    names = cities['city'].astype(str).to_numpy()[top]
+
+    fig = px.imshow(matrix[np.ix_(top, top)],
+                    x=names,
+                    y=names,
+                    color_continuous_scale='Blues',
+                    labels={'color': 'Distância (km)'},
+                    aspect='auto')
+    fig = fig.update_traces(hovertemplate='%{y} - %{x}: %{z:,.0f} km<extra></extra>')
+    return fig
+
+
 #*************************************************************************************************************
 #===================================== INICIO ESTRUTURA LÓGICA DO CÓDIGO =====================================
 #*************************************************************************************************************
@@ -335,7 +225,7 @@ def cuisines_by_city(df1):
 
 RAW_DATA_PATH = r'data/raw_data/zomato.csv'
 
-df1 = clean_data(RAW_DATA_PATH) # Limpando Dataset com função criada.
+df1 = load_store(RAW_DATA_PATH) # Base limpa (cache do CSV bruto + atualizações ingeridas).
 
 
 #=====================================
@@ -366,7 +256,7 @@ with st.sidebar:
     #Seleção para o filtro de países
     st.header('Filtros')
     #Variável
-    countries = df1['country'].unique()
+    countries = df1['country'].unique().tolist()
     #Criando filtro
     countries_filter = st.multiselect(
     'Escolha os países que deseja visualizar',
@@ -376,7 +266,7 @@ with st.sidebar:
 
     #Filtro por valor
     #Variável
-    price = df1['price_type'].unique()
+    price = df1['price_type'].unique().tolist()
     #Criando filtro
     price_filter = st.multiselect(
     'Escolha os restaurantes pelo preço',
@@ -398,12 +288,10 @@ with st.sidebar:
     st.divider()
 
 
-    processed_data = pd.read_csv("./data/processed/data.csv")
- 
     #BOTÃO PARA DOWNLOAD DA BASE SEM FILTROS
     st.download_button(
         label="Download Data",
-        data=processed_data.to_csv(index=False, sep=";"),
+        data=processed_download_data(), # CSV publicado, convertido uma vez por versão
         file_name="data.csv",
         mime="text/csv",
     )
@@ -411,15 +299,13 @@ with st.sidebar:
 
 
 
-#Filtro de paises - filtra o df inteiro conforme a slecção acima
-filtro = df1['country'].isin(countries_filter)
-df1 = df1.loc[filtro,:]
+#Filtros de países, preço e nota - os gráficos somam somente as células do cubo de
+#agregados que atendem aos filtros, sem percorrer os restaurantes
+cube = slice_cube(load_cube(RAW_DATA_PATH), countries_filter, price_filter, min_rating=rating_filter)
 
-filtro = df1['price_type'].isin(price_filter)
-df1 = df1.loc[filtro,:]
-
-filtro = df1['aggregate_rating'] >= rating_filter
-df1 = df1.loc[filtro,:]
+#Histograma das notas por cidade, calculado uma vez por versão da base e estado dos filtros
+version = store_version(open_store(RAW_DATA_PATH))
+histogram = cached_rating_histogram((version, filter_key(countries_filter, price_filter, rating_filter)), cube)
 
 
 
@@ -434,7 +320,7 @@ with st.container(): #Primeiro Container
     #Título do container
     st.subheader('Top 10 cidades com mais restaurantes') 
     #Chamando a função para criar o gráfico
-    fig = restaurant_per_city(df1)
+    fig = restaurant_per_city(cube)
     #MOSTRANDO GRAFICO
     st.plotly_chart(fig, use_container_width=True)
     
@@ -448,20 +334,22 @@ with st.container():
     col1, col2 = st.columns(2)
         
     with col1:
-        #FILTRANDO REST. ACIMA DE 4
+        #FILTRANDO REST. ACIMA DO LIMITE (4.0 inicialmente)
+        above = st.slider('Nota acima de:', 0.0, 5.0, 4.0, step=0.1)
 
         #Chamando função
-        fig = restaurant_by_rating(df1,filtro='best',title='Acima de 4.0')
+        fig = restaurant_by_rating(histogram,above=above,title=f'Acima de {above:.1f}')
         
         #MOSTRANDO GRAFICO
         st.plotly_chart(fig, use_container_width=True)    
         
             
     with col2:
-        #FILTRANDO REST. ABAIXO DE 2.5
+        #FILTRANDO REST. ABAIXO DO LIMITE (2.5 inicialmente)
+        below = st.slider('Nota abaixo de:', 0.0, 5.0, 2.5, step=0.1)
 
         #Chamando função
-        fig = restaurant_by_rating(df1,filtro='worst',title='Abaixo de 2.5')
+        fig = restaurant_by_rating(histogram,below=below,title=f'Abaixo de {below:.1f}')
         
         #MOSTRANDO GRAFICO
         st.plotly_chart(fig, use_container_width=True)    
@@ -474,11 +362,38 @@ with st.container():
     st.subheader("Top 10 cidades com mais tipos de culinária distintos")
     
     #chamando a função
-    fig = cuisines_by_city(df1)
+    fig = cuisines_by_city(cube)
     #MOSTRANDO GRAFICO
     st.plotly_chart(fig, use_container_width=True)
-    
-    
-    
 
 
+    #Divider para ter melhor separação no dash
+    st.subheader('',divider='gray')
+
+with st.container():
+    #Título do Container
+    st.subheader("Distância entre as cidades")
+
+    # Matrizes de distâncias entre os centros das cidades, em cache enquanto as cidades da base não mudam
+    distances = city_distances(load_by_city(RAW_DATA_PATH))
+    distances = {country: distances[country] for country in countries_filter if country in distances}
+
+    if distances:
+        #Espalhamento das cidades de cada país selecionado
+        df_aux = country_spread(distances).round({'mean_distance_km': 0, 'max_distance_km': 0})
+        df_aux.columns = ['País', 'Cidades', 'Distância média (km)', 'Maior distância (km)']
+        st.dataframe(df_aux, use_container_width=True, hide_index=True)
+
+        #Cidades de um país
+        country = st.selectbox('Escolha o país', list(distances))
+        cities, matrix = distances[country]
+
+        col1, col2 = st.columns(2)
+        with col1:
+            fig = city_distance_heatmap(cities, matrix)
+            st.plotly_chart(fig, use_container_width=True)
+
+        with col2:
+            df_aux = nearest_cities(cities, matrix).round({'distance_km': 0})
+            df_aux.columns = ['Cidade', 'Cidade mais próxima', 'Distância (km)']
+            st.dataframe(df_aux, use_container_width=True, hide_index=True)
@@ -0,0 +1,104 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pytest
+
+from utils import artifacts
+from utils.artifacts import atomic_write, publish_processed_data, published_version
+
+
+@pytest.fixture(autouse=True)
+def new_process(monkeypatch):
+    """ Cada teste começa como um processo novo, sem versões conferidas em memória. """
+    monkeypatch.setattr(artifacts, '_PUBLISHED', {})
+
+
+def frame(version):
+    return pd.DataFrame({'restaurant_id': [1, 2, 3], 'version': [version] * 3})
+
+#=====================================
+#Escrita atômica
+
+def test_atomic_write_failure_keeps_previous_file(tmp_path):
+    """ Um erro no meio da gravação mantém o arquivo anterior e não deixa temporários na pasta. """
+    path = str(tmp_path / 'data.csv')
+    atomic_write(path, lambda file: file.write('anterior'), mode='w')
+
+    def write(file):
+        file.write('pela metade')
+        raise RuntimeError('falha na gravação')
+
+    with pytest.raises(RuntimeError):
+        atomic_write(path, write, mode='w')
+
+    with open(path, encoding='utf-8') as file:
+        assert file.read() == 'anterior'
+    assert os.listdir(tmp_path) == ['data.csv']
+
+#=====================================
+#Publicando a base processada
+
+def test_published_once_per_version(tmp_path, monkeypatch):
+    """ O CSV é gravado na primeira publicação de cada versão; os reruns não acessam o disco. """
+    path = str(tmp_path / 'data.csv')
+
+    assert publish_processed_data(frame('a'), 'v1', path)
+    assert not publish_processed_data(frame('a'), 'v1', path)
+
+    # rerun no mesmo processo: nem o arquivo '.version' é lido
+    with monkeypatch.context() as patch:
+        patch.setattr(artifacts, 'published_version', lambda path: pytest.fail('acesso ao disco'))
+        assert not publish_processed_data(frame('a'), 'v1', path)
+
+    assert publish_processed_data(frame('b'), 'v2', path)
+    assert published_version(path) == 'v2'
+    pd.testing.assert_frame_equal(pd.read_csv(path), frame('b'))
+
+
+def test_version_file_honored_by_new_process(tmp_path, monkeypatch):
+    """ Um processo novo não grava de novo uma versão que outro processo já publicou. """
+    path = str(tmp_path / 'data.csv')
+    publish_processed_data(frame('a'), 'v1', path)
+    modified = os.stat(path).st_mtime_ns
+
+    monkeypatch.setattr(artifacts, '_PUBLISHED', {})
+    assert not publish_processed_data(frame('outro'), 'v1', path)
+    assert os.stat(path).st_mtime_ns == modified
+    pd.testing.assert_frame_equal(pd.read_csv(path), frame('a'))
+
+
+def test_failed_publish_keeps_previous_version(tmp_path):
+    """ Se a gravação do CSV falhar, o arquivo e a versão anteriores continuam publicados. """
+    path = str(tmp_path / 'data.csv')
+    publish_processed_data(frame('a'), 'v1', path)
+
+    class Broken(pd.DataFrame):
+        def to_csv(self, *args, **kwargs):
+            raise OSError('disco cheio')
+
+    with pytest.raises(OSError):
+        publish_processed_data(Broken(frame('b')), 'v2', path)
+
+    assert published_version(path) == 'v1'
+    pd.testing.assert_frame_equal(pd.read_csv(path), frame('a'))
+
+    # a versão nova continua pendente e é publicada na próxima chamada
+    assert publish_processed_data(frame('b'), 'v2', path)
+    assert published_version(path) == 'v2'
+
+
+def publish_in_process(path):
+    return publish_processed_data(frame('a'), 'v1', path)
+
+
+def test_concurrent_processes_publish_once(tmp_path):
+    """ Vários processos publicando a mesma versão ao mesmo tempo: somente um grava o arquivo. """
+    path = str(tmp_path / 'data.csv')
+
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        written = list(pool.map(publish_in_process, [path] * 8))
+
+    assert sum(written) == 1
+    assert published_version(path) == 'v1'
+    pd.testing.assert_frame_equal(pd.read_csv(path), frame('a'))
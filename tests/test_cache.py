@@ -0,0 +1,105 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from utils import cache
+from utils.cache import LRUCache, file_digest, memo_by_frame
+
+#=====================================
+#Hash do conteúdo do arquivo
+
+def test_file_digest_is_shared_between_processes(tmp_path, monkeypatch):
+    """ Um novo processo (sem hashes em memória) usa o hash gravado enquanto tamanho e data não mudam. """
+    path = tmp_path / 'raw.csv'
+    path.write_bytes(b'a,b\n1,2\n')
+    digest_dir = str(tmp_path / 'digests')
+
+    monkeypatch.setattr(cache, '_DIGESTS', {})
+    assert file_digest(str(path), digest_dir=digest_dir) == hashlib.sha256(b'a,b\n1,2\n').hexdigest()
+
+    # mesmo tamanho e mesma data de modificação: o arquivo não é lido de novo
+    stat = os.stat(path)
+    path.write_bytes(b'a,b\n3,4\n')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    monkeypatch.setattr(cache, '_DIGESTS', {})
+    assert file_digest(str(path), digest_dir=digest_dir) == hashlib.sha256(b'a,b\n1,2\n').hexdigest()
+
+    # data de modificação diferente: o hash é recalculado
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    monkeypatch.setattr(cache, '_DIGESTS', {})
+    assert file_digest(str(path), digest_dir=digest_dir) == hashlib.sha256(b'a,b\n3,4\n').hexdigest()
+    assert len(os.listdir(digest_dir)) == 2
+
+#=====================================
+#Cache em memória (LRU)
+
+def test_lru_evicts_by_entries():
+    """ Passando de <max_entries>, sai o item usado há mais tempo (uma consulta conta como uso). """
+    cache = LRUCache(max_entries=2, max_bytes=10**6)
+
+    assert cache.get('a', lambda: 'A') == 'A'
+    assert cache.get('b', lambda: 'B') == 'B'
+    assert cache.get('a', lambda: 'x') == 'A'   # 'a' passa a ser o mais recente
+    cache.get('c', lambda: 'C')
+
+    assert list(cache.items) == ['a', 'c']
+    assert cache.get('b', lambda: 'B2') == 'B2'
+    assert cache.stats() == {'entries': 2, 'bytes': 3, 'hits': 1, 'misses': 4}
+
+
+def test_lru_evicts_by_bytes():
+    """ Passando de <max_bytes>, saem os itens mais antigos até o total caber; um item maior que o limite não é guardado. """
+    cache = LRUCache(max_entries=100, max_bytes=10)
+
+    cache.get('a', lambda: 'aaaa')
+    cache.get('b', lambda: 'bbbb')
+    cache.get('c', lambda: 'cccccc')
+    assert list(cache.items) == ['b', 'c']
+    assert cache.stats()['bytes'] == 10
+
+    assert cache.get('big', lambda: 'x' * 11) == 'x' * 11
+    assert list(cache.items) == ['b', 'c']
+
+    cache.get('d', lambda: 'd' * 10)
+    assert list(cache.items) == ['d']
+    assert cache.stats() == {'entries': 1, 'bytes': 10, 'hits': 0, 'misses': 5}
+
+
+def test_lru_concurrent_sessions():
+    """ Várias sessões ao mesmo tempo: cada consulta é um acerto ou uma falha e os limites são respeitados. """
+    cache = LRUCache(max_entries=16, max_bytes=64, sizeof=lambda value: 4)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda position: cache.get(position % 32, lambda: position % 32), range(20_000)))
+
+    stats = cache.stats()
+    assert results == [position % 32 for position in range(20_000)]
+    assert stats['hits'] + stats['misses'] == 20_000
+    assert stats['entries'] <= 16 and stats['bytes'] == 4 * stats['entries'] <= 64
+
+#=====================================
+#Índices por base
+
+def test_memo_by_frame_builds_once_per_frame():
+    """ O objeto é montado uma vez por base e descartado quando passa do limite de bases. """
+    calls = []
+    memo = memo_by_frame(lambda df1: calls.append(id(df1)) or len(calls), max_frames=2)
+    frames = [pd.DataFrame({'a': [position]}) for position in range(3)]
+
+    assert memo(frames[0]) == memo(frames[0]) == 1
+    assert memo(frames[1]) == 2
+    assert memo(frames[2]) == 3   # limite atingido: as bases anteriores são descartadas
+    assert memo(frames[0]) == 4
+
+
+def test_memo_by_frame_concurrent_sessions():
+    """ Várias sessões consultando e descartando bases ao mesmo tempo sempre recebem o objeto da sua base. """
+    memo = memo_by_frame(lambda df1: int(df1['a'].iloc[0]), max_frames=2)
+    frames = [pd.DataFrame({'a': [position]}) for position in range(8)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda position: memo(frames[position % 8]), range(20_000)))
+
+    assert results == [position % 8 for position in range(20_000)]
@@ -0,0 +1,57 @@
+import pytest
+
+from utils.cache import load_clean_data
+from utils.cities import cities_by_rating, city_rating_histogram
+from utils.cube import CUBE_KEYS
+from utils.grouping import encode_keys
+from utils.store import summarize
+
+RAW_DATA_PATH = r'data/raw_data/zomato.csv'
+
+
+@pytest.fixture(scope='module')
+def data():
+    """ Base completa e o histograma de notas por cidade montado a partir do cubo. """
+    df1 = load_clean_data(RAW_DATA_PATH, compact=False, publish=False)
+    return df1, city_rating_histogram(encode_keys(summarize(df1, CUBE_KEYS)))
+
+
+def count_by_city(df1, mask):
+    """ Quantidade de restaurantes por cidade como era feito na página (groupby sobre os restaurantes). """
+    return df1.loc[mask, ['restaurant_id', 'city', 'country']].groupby(['country', 'city'])['restaurant_id'].count()
+
+
+def assert_same_counts(result, expected):
+    result = result.rename(index=str).sort_index()
+    assert result.to_dict() == expected.sort_index().to_dict()
+
+#=====================================
+#Histograma x groupby dos restaurantes
+
+@pytest.mark.parametrize('above', [4.0, 4.000000000000001, 3.9999999999999996])
+def test_above_is_exclusive(data, above):
+    """ Acima de 4.0: as notas 4.0 ficam de fora, mesmo com o ruído do slider. """
+    df1, histogram = data
+    expected = count_by_city(df1, df1['aggregate_rating'] > 4.0)
+    assert_same_counts(cities_by_rating(histogram, above=above), expected)
+
+
+@pytest.mark.parametrize('below', [2.5, 2.5000000000000004, 2.4999999999999996])
+def test_below_is_exclusive(data, below):
+    """ Abaixo de 2.5: as notas 2.5 ficam de fora, mesmo com o ruído do slider. """
+    df1, histogram = data
+    expected = count_by_city(df1, df1['aggregate_rating'] < 2.5)
+    assert_same_counts(cities_by_rating(histogram, below=below), expected)
+
+
+@pytest.mark.parametrize('above, below', [(3.0, 4.5), (0.1 * 33, 0.1 * 44), (4.5, 3.0), (4.9, 5.0)])
+def test_between(data, above, below):
+    df1, histogram = data
+    ratings = df1['aggregate_rating']
+    expected = count_by_city(df1, (ratings > round(above, 1)) & (ratings < round(below, 1)))
+    assert_same_counts(cities_by_rating(histogram, above=above, below=below), expected)
+
+
+def test_without_limits(data):
+    df1, histogram = data
+    assert_same_counts(cities_by_rating(histogram), count_by_city(df1, df1['aggregate_rating'] >= 0))
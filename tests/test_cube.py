@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from utils.cache import load_clean_data
+from utils.cube import CUBE_KEYS, slice_cube
+from utils.filters import filter_key, select_rows
+from utils.grouping import encode_keys
+from utils.store import summarize
+
+RAW_DATA_PATH = r'data/raw_data/zomato.csv'
+
+# Valores do slider de nota (passo 0.1) como o Streamlit os devolve: 0.30000000000000004, 3.3000000000000003...
+SLIDER_VALUES = [step * 0.1 for step in range(51)]
+
+
+@pytest.fixture(scope='module')
+def data():
+    """ Base compacta (como a compartilhada) e o cubo montado a partir da base completa. """
+    df1 = load_clean_data(RAW_DATA_PATH, publish=False)
+    cube = encode_keys(summarize(load_clean_data(RAW_DATA_PATH, compact=False, publish=False), CUBE_KEYS))
+    return df1, cube
+
+#=====================================
+#Cubo x linhas filtradas
+
+@pytest.mark.parametrize('min_rating', SLIDER_VALUES + [3.3000000000000003, 4.499999999999999])
+def test_cube_matches_rows(data, min_rating):
+    """ Com a mesma nota mínima o cubo e as linhas filtradas têm a mesma quantidade de restaurantes. """
+    df1, cube = data
+    countries = df1['country'].cat.categories.tolist()
+    prices = df1['price_type'].cat.categories.tolist()
+
+    rows = select_rows(df1, countries, prices, min_rating)
+    cells = slice_cube(cube, countries, prices, min_rating=min_rating)
+
+    assert int(cells['restaurants'].sum()) == len(rows)
+
+
+def test_slider_noise_same_filter_key():
+    assert filter_key(['Brazil'], ['cheap'], 3.3000000000000003) == filter_key(['Brazil'], ['cheap'], 3.3)
+    assert np.isclose(filter_key([], [], 2.5000000000000004)[2], 2.5)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from utils.cache import load_clean_data
+from utils.filters import FilterIndex, filter_mask
+
+RAW_DATA_PATH = r'data/raw_data/zomato.csv'
+
+# Notas mínimas: extremos, valores exatos de uma casa e valores sem representação exata
+THRESHOLDS = [0.0, 1.0, 2.5, 2.5000000000000004, 3.3, 3.3000000000000003, 3.2999999999999998, 4.45, 4.9, 5.0, 5.1]
+
+
+@pytest.fixture(scope='module')
+def base():
+    """ Base compacta (nota em float32, país e tipo de preço em category) e o seu índice. """
+    df1 = load_clean_data(RAW_DATA_PATH, publish=False)
+    return df1, FilterIndex(df1)
+
+
+def selections(df1):
+    countries = df1['country'].cat.categories.tolist()
+    prices = df1['price_type'].cat.categories.tolist()
+    return [
+        (countries, prices),                             # tudo selecionado
+        ([], prices),                                    # nenhum país
+        (countries, []),                                 # nenhum tipo de preço
+        ([], []),                                        # nada selecionado
+        (['Brazil'], ['gourmet']),                       # um valor de cada
+        (['India', 'Qatar', 'Brazil'], ['cheap', 'normal']),
+        (['Brazil', 'Atlantis'], ['cheap', 'free']),     # valores que não existem na base
+    ]
+
+#=====================================
+#Índice de filtros x máscara direta
+
+@pytest.mark.parametrize('min_rating', THRESHOLDS)
+def test_index_matches_filter_mask(base, min_rating):
+    df1, index = base
+    for countries, prices in selections(df1):
+        expected = filter_mask(df1, countries, prices, min_rating)
+
+        np.testing.assert_array_equal(index.mask(countries, prices, min_rating), expected)
+        np.testing.assert_array_equal(index.rows(countries, prices, min_rating), np.flatnonzero(expected))
+
+
+def test_selection_order_does_not_matter(base):
+    df1, index = base
+    np.testing.assert_array_equal(index.rows(['Qatar', 'Brazil'], ['normal', 'cheap'], 3.0),
+                                  index.rows(['Brazil', 'Qatar', 'Brazil'], ['cheap', 'normal'], 3.0))
+
+
+def test_row_count_not_multiple_of_eight(base):
+    """ Bitmaps com bits de sobra no último byte (1 bit por linha, np.packbits). """
+    df1, _ = base
+    df_aux = df1.iloc[:1003]
+    index = FilterIndex(df_aux)
+
+    for min_rating in THRESHOLDS:
+        for countries, prices in selections(df_aux):
+            np.testing.assert_array_equal(index.mask(countries, prices, min_rating),
+                                          filter_mask(df_aux, countries, prices, min_rating))
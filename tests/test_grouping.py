@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import grouping
+from utils.grouping import encode_keys, group_aggregate
+
+#=====================================
+#group_aggregate x groupby do pandas
+
+AGGREGATIONS = {
+    'rows': ('value', 'size'),
+    'value_sum': ('value', 'sum'),
+    'weight_sum': ('weight', 'sum'),
+    'weight_mean': ('weight', 'mean'),
+    'value_min': ('value', 'min'),
+    'value_max': ('value', 'max'),
+    'weight_max': ('weight', 'max'),
+    'labels': ('label', 'nunique'),
+}
+
+
+def sample_frame(n_rows, n_keys=(5, 7), seed=0):
+    """ Linhas com chaves de texto, valores inteiros e decimais e um texto com valores nulos. """
+    rng = np.random.default_rng(seed)
+    df1 = pd.DataFrame({
+        'country': rng.choice([f'country {i}' for i in range(n_keys[0])], n_rows),
+        'city': rng.choice([f'city {i}' for i in range(n_keys[1])], n_rows),
+        'value': rng.integers(-1000, 1000, n_rows),
+        'weight': rng.uniform(0, 5, n_rows).round(1),
+        'label': rng.choice(['a', 'b', 'c', None], n_rows),
+    })
+    return df1
+
+
+def assert_same_as_groupby(df1, keys, aggregations=AGGREGATIONS):
+    expected = df1.groupby(keys, observed=True).agg(**aggregations).reset_index()
+    result = group_aggregate(encode_keys(df1), keys, aggregations)
+
+    result = result.astype({key: object for key in keys})
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-12)
+
+
+@pytest.mark.parametrize('keys', [['country'], ['country', 'city'], ['city', 'country']])
+def test_matches_groupby(keys):
+    assert_same_as_groupby(sample_frame(5_000), keys)
+
+
+def test_text_keys_without_category():
+    """ Colunas que não são category são fatoradas na hora, com o mesmo resultado. """
+    df1 = sample_frame(2_000)
+    expected = df1.groupby(['country'], observed=True).agg(**AGGREGATIONS).reset_index()
+    pd.testing.assert_frame_equal(group_aggregate(df1, ['country'], AGGREGATIONS), expected)
+
+
+def test_empty_input():
+    df1 = sample_frame(100).iloc[:0]
+    result = group_aggregate(encode_keys(df1), ['country', 'city'], AGGREGATIONS)
+
+    assert len(result) == 0
+    assert result.columns.tolist() == ['country', 'city', *AGGREGATIONS]
+    assert_same_as_groupby(df1, ['country', 'city'])
+
+
+def test_single_group():
+    assert_same_as_groupby(sample_frame(300, n_keys=(1, 1)), ['country', 'city'])
+
+
+def test_nunique_ignores_nulls():
+    df1 = sample_frame(1_000)
+    df1.loc[df1['country'] == 'country 0', 'label'] = None   # grupo somente com nulos
+
+    result = group_aggregate(encode_keys(df1), ['country'], {'labels': ('label', 'nunique')})
+    assert result.loc[result['country'] == 'country 0', 'labels'].item() == 0
+    assert_same_as_groupby(df1, ['country'])
+
+
+def test_unique_fallback(monkeypatch):
+    """ Acima de MAX_LOOKUP_GROUPS combinações os ids são compactados com np.unique. """
+    monkeypatch.setattr(grouping, 'MAX_LOOKUP_GROUPS', 10)
+    assert_same_as_groupby(sample_frame(5_000), ['country', 'city'])
+
+
+def test_unique_fallback_large_key_space():
+    """ Chaves cujo produto passa de MAX_LOOKUP_GROUPS sem alterar o limite. """
+    n_rows = 20_000
+    rng = np.random.default_rng(1)
+    df1 = pd.DataFrame({key: rng.integers(0, 300, n_rows).astype(str) for key in ['a', 'b', 'c']})
+    df1['value'] = rng.integers(0, 100, n_rows)
+
+    assert 300 ** 3 > grouping.MAX_LOOKUP_GROUPS
+    assert_same_as_groupby(df1, ['a', 'b', 'c'], {'rows': ('value', 'size'), 'value_min': ('value', 'min'),
+                                                  'value_sum': ('value', 'sum')})
+
+
+def test_unknown_function():
+    with pytest.raises(ValueError):
+        group_aggregate(sample_frame(10), ['country'], {'value': ('value', 'median')})
@@ -0,0 +1,11 @@
+import pytest
+
+from utils.ingest import clean_files
+
+#=====================================
+#Limpeza de vários arquivos
+
+def test_clean_files_without_files():
+    """ Sem arquivos a limpeza falha com uma mensagem clara (e não no pd.concat). """
+    with pytest.raises(ValueError, match='Nenhum arquivo'):
+        clean_files([])
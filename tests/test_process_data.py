@@ -0,0 +1,89 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_clean_data import legacy_clean_frame, legacy_map_columns
+from utils.process_data import (RowHashSet, clean_data, clean_data_chunked, clean_frame, clean_rows, map_columns,
+                                rename_columns, row_hashes)
+
+RAW_DATA_PATH = r'data/raw_data/zomato.csv'
+
+#=====================================
+#Limpeza vetorizada x limpeza antiga (.apply linha a linha)
+
+@pytest.fixture(scope='module')
+def raw():
+    return pd.read_csv(RAW_DATA_PATH)
+
+
+@pytest.mark.parametrize('n_rows', [None, 20_000])
+def test_clean_frame_matches_apply(raw, n_rows):
+    """ A base inteira e uma reamostragem (com mais duplicados) geram exatamente o mesmo DF da versão antiga. """
+    df1 = raw if n_rows is None else raw.sample(n_rows, replace=True, random_state=0).reset_index(drop=True)
+
+    renamed = rename_columns(df1).dropna()
+    pd.testing.assert_frame_equal(map_columns(renamed.copy()), legacy_map_columns(renamed.copy()))
+    pd.testing.assert_frame_equal(clean_frame(df1), legacy_clean_frame(df1))
+
+#=====================================
+#Conjunto de hashes das linhas
+
+def test_row_hash_set_keeps_first_occurrence():
+    """ Somente a primeira ocorrência de cada hash é nova, dentro do bloco e entre blocos. """
+    seen = RowHashSet()
+
+    assert seen.add(np.array([5, 3, 5, 9], dtype='uint64')).tolist() == [True, True, False, True]
+    assert seen.add(np.array([9, 1, 1], dtype='uint64')).tolist() == [False, True, False]
+    assert seen.add(np.array([3, 5, 1, 9], dtype='uint64')).tolist() == [False] * 4
+    assert len(seen) == 4
+
+
+def test_row_hash_set_matches_duplicated():
+    """ Muitos blocos (com os arrays sendo unidos) x duplicated sobre todos os hashes de uma vez. """
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(0, 5000, 20_000).astype('uint64')
+    seen = RowHashSet()
+
+    new = np.concatenate([seen.add(hashes[start:start + 300]) for start in range(0, len(hashes), 300)])
+
+    np.testing.assert_array_equal(new, ~pd.Series(hashes).duplicated().to_numpy())
+    assert len(seen) == len(np.unique(hashes))
+    assert len(seen.runs) <= np.log2(len(seen)) + 1
+
+def test_row_hashes_ignore_numeric_dtype():
+    """ A mesma linha tem o mesmo hash com as colunas numéricas lidas como int ou como float. """
+    df1 = clean_rows(pd.read_csv(RAW_DATA_PATH).head(50))
+    as_float = df1.astype({'votes': 'float64', 'price_range': 'float64', 'restaurant_id': 'float64'})
+
+    np.testing.assert_array_equal(row_hashes(as_float), row_hashes(df1))
+
+#=====================================
+#Limpeza em blocos x limpeza completa
+
+@pytest.fixture(scope='module')
+def raw_path(tmp_path_factory):
+    """ CSV bruto com duplicados espalhados pelo arquivo (em blocos diferentes) e linhas com nan. """
+    raw = pd.read_csv(RAW_DATA_PATH).head(1500)
+    repeated = raw.sample(400, replace=True, random_state=0)
+
+    missing = raw.head(3).assign(**{'Cuisines': np.nan})
+    df1 = pd.concat([raw, missing, repeated, raw.head(5)], ignore_index=True)
+
+    path = tmp_path_factory.mktemp('raw') / 'raw.csv'
+    df1.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize('chunksize', [3, 7, 250, 1499, 10**6])
+def test_chunked_matches_clean_data(raw_path, tmp_path, chunksize):
+    """ Duplicados entre blocos são excluídos (vale a primeira ocorrência) e o CSV é igual ao de clean_data. """
+    output_path = tmp_path / 'clean.csv'
+    rows_written = clean_data_chunked(raw_path, str(output_path), chunksize=chunksize)
+
+    expected = pd.read_csv(io.StringIO(clean_data(raw_path).to_csv(index=False)))
+    result = pd.read_csv(output_path)
+
+    assert rows_written == len(result)
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.rankings import RankIndex, best_cuisines, cuisine_statistics, top_cuisines, worst_cuisines
+
+#=====================================
+#Melhores e piores culinárias
+
+def cube_of(ratings):
+    """ Células do cubo com uma culinária por célula: culinária -> notas dos seus restaurantes. """
+    return pd.DataFrame({
+        'cuisines': list(ratings),
+        'restaurants': [len(values) for values in ratings.values()],
+        'votes_sum': [10 * len(values) for values in ratings.values()],
+        'average_cost_for_two_sum': [100 * len(values) for values in ratings.values()],
+        'aggregate_rating_sum': [sum(values) for values in ratings.values()],
+        'min_restaurant_id': range(len(ratings)),
+    })
+
+
+def test_ties_in_alphabetical_order():
+    """ Culinárias com a mesma nota média ficam em ordem alfabética nos dois gráficos. """
+    # somas com ruído de ponto flutuante: 4.9 * 11 / 11 != 4.9
+    stats = cuisine_statistics(cube_of({
+        'Tex-Mex': [4.9], 'American': [4.9] * 11, 'BBQ': [4.9] * 3, 'Asian': [4.9] * 7,
+        'Vietnamese': [4.9] * 6, 'World Cuisine': [4.9] * 9, 'Bakery': [4.8, 5.0],
+    }))
+
+    assert best_cuisines(stats, 3)['cuisines'].tolist() == ['American', 'Asian', 'BBQ']
+    assert worst_cuisines(stats, 3)['cuisines'].tolist() == ['American', 'Asian', 'BBQ']
+
+
+def test_worst_from_lowest_rating():
+    stats = cuisine_statistics(cube_of({'A': [3.0], 'B': [2.0, 2.2], 'C': [4.5], 'D': [2.1]}))
+
+    assert best_cuisines(stats, 2)['cuisines'].tolist() == ['C', 'A']
+    assert worst_cuisines(stats, 3)['cuisines'].tolist() == ['B', 'D', 'A']
+
+#=====================================
+#Principais culinárias
+
+@pytest.mark.parametrize('fraction', [1.0, 0.3, 0.0])
+def test_top_cuisines_from_rows(fraction):
+    """ Com <rows> o resultado é o mesmo das linhas filtradas copiadas com todas as colunas. """
+    rng = np.random.default_rng(0)
+    df1 = pd.DataFrame({
+        'restaurant_id': rng.permutation(2000), 'restaurant_name': [f'R{i}' for i in range(2000)],
+        'country': 'Brazil', 'city': rng.choice(['Rio', 'Santos'], 2000), 'currency': 'BRL',
+        'cuisines': pd.Categorical(rng.choice(['Pizza', 'Sushi', 'Bar', 'Cafe', 'Grill', 'Vegan', 'Tea'], 2000)),
+        'average_cost_for_two': rng.integers(10, 200, 2000), 'votes': rng.integers(0, 900, 2000),
+        'aggregate_rating': rng.integers(0, 51, 2000) / 10, 'address': 'Rua',
+    })
+    rows = np.flatnonzero(rng.random(2000) < fraction)
+
+    pd.testing.assert_frame_equal(top_cuisines(df1, 5, rows=rows), top_cuisines(df1.take(rows), 5))
+
+#=====================================
+#Ranking global x ordenação completa
+
+def ranked_frame(n_rows, seed=0):
+    """ Restaurantes com notas de uma casa decimal (muitos empates) e ids embaralhados. """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'restaurant_id': rng.permutation(n_rows).astype('int32') * 7,
+        'aggregate_rating': rng.integers(0, 51, n_rows).astype('float32') / np.float32(10),
+    })
+
+
+def top_by_sort(df1, rows, n):
+    """ Os <n> melhores de <rows> com a ordenação completa (maior nota, menor restaurant_id). """
+    return (df1.take(rows)
+               .sort_values(['aggregate_rating', 'restaurant_id'], ascending=[False, True])
+               .index[:n]
+               .to_numpy())
+
+
+@pytest.mark.parametrize('fraction', [1.0, 0.5, 0.05, 0.001])
+@pytest.mark.parametrize('n', [1, 10, 500])
+def test_top_matches_full_sort(fraction, n):
+    """ Seleções grandes passam pelo percurso em blocos e as pequenas pelo argpartition. """
+    df1 = ranked_frame(50_000)
+    rng = np.random.default_rng(1)
+    rows = np.flatnonzero(rng.random(len(df1)) < fraction)
+
+    np.testing.assert_array_equal(RankIndex(df1).top(rows, n), top_by_sort(df1, rows, n))
+
+
+def test_both_paths_match_full_sort():
+    """ O percurso em blocos e o argpartition dão o mesmo resultado para as mesmas seleções. """
+    df1 = ranked_frame(20_000)
+    index = RankIndex(df1)
+    rng = np.random.default_rng(2)
+
+    for fraction in [1.0, 0.3, 0.01]:
+        rows = np.flatnonzero(rng.random(len(df1)) < fraction)
+        for n in [1, 25, 300]:
+            n = min(n, len(rows))
+            expected = top_by_sort(df1, rows, n)
+            np.testing.assert_array_equal(index.scan(rows, n), expected)
+
+            ranks = np.sort(np.partition(index.rank[rows], n - 1)[:n])
+            np.testing.assert_array_equal(index.order[ranks], expected)
+
+
+def test_top_with_ties_and_n_above_selection():
+    df1 = pd.DataFrame({'restaurant_id': [50, 10, 30, 20, 40, 60],
+                        'aggregate_rating': [4.5, 4.5, 4.9, 4.5, 3.0, 4.9]})
+    index = RankIndex(df1)
+
+    # empates na nota: menor restaurant_id primeiro
+    np.testing.assert_array_equal(index.top(np.arange(6), 4), [2, 5, 1, 3])
+    # mais restaurantes pedidos do que selecionados
+    np.testing.assert_array_equal(index.top(np.array([0, 3, 4]), 10), [3, 0, 4])
+    assert len(index.top(np.array([], dtype='int64'), 10)) == 0
@@ -0,0 +1,158 @@
+import numpy as np
+import pytest
+from haversine import Unit, haversine_vector
+
+from utils.cache import load_clean_data
+from utils.spatial import GRID_DEGREES, KM_PER_DEGREE, MAX_RESULTS, nearby_restaurants, spatial_index
+
+RAW_DATA_PATH = r'data/raw_data/zomato.csv'
+
+# Pontos de consulta: centros de cidades da base, oceano (longe de qualquer restaurante),
+# perto do antimeridiano e perto do polo
+POINTS = [(28.61, 77.21), (-22.97, -43.18), (51.51, -0.13), (0.0, 0.0), (-36.85, 174.76),
+          (0.0, 179.99), (89.0, 0.0)]
+
+
+@pytest.fixture(scope='module')
+def df1():
+    """ Base compacta, como a compartilhada. """
+    return load_clean_data(RAW_DATA_PATH, publish=False)
+
+
+def brute_force(df1, point, rows=None):
+    """ Posições e distâncias haversine de todas as linhas (ou das <rows>), do mais perto para o mais longe. """
+    positions = np.arange(len(df1)) if rows is None else rows
+    coordinates = df1[['latitude', 'longitude']].to_numpy(dtype='float64')[positions]
+    distances = haversine_vector(point, coordinates, Unit.KILOMETERS, comb=True).ravel()
+    order = np.argsort(distances, kind='stable')
+    return positions[order], distances[order]
+
+
+def in_bounds(df1, bounds):
+    """ Posições (em ordem crescente) das linhas dentro do retângulo, conferindo todas as coordenadas. """
+    (south, west), (north, east) = bounds
+    latitude = df1['latitude'].to_numpy(dtype='float64')
+    longitude = df1['longitude'].to_numpy(dtype='float64')
+
+    inside = (latitude >= south) & (latitude <= north)
+    if west <= east:
+        inside &= (longitude >= west) & (longitude <= east)
+    else:
+        inside &= (longitude >= west) | (longitude <= east)
+    return np.flatnonzero(inside)
+
+#=====================================
+#Retângulo e círculo x varredura completa
+
+# Retângulos: em torno de uma cidade, com bordas sobre as células da grade, um país inteiro,
+# atravessando o antimeridiano, o mundo todo e um retângulo vazio
+BOUNDS = [[[28.5, 77.0], [28.7, 77.3]], [[-23.0, -43.3], [-22.9, -43.1]], [[6.0, 68.0], [36.0, 98.0]],
+          [[-50.0, 170.0], [-30.0, -170.0]], [[-90.0, -180.0], [90.0, 180.0]], [[10.0, -30.0], [20.0, -20.0]]]
+
+
+@pytest.mark.parametrize('bounds', BOUNDS)
+def test_within(df1, bounds):
+    """ Nenhum restaurante dentro do retângulo fica de fora das células candidatas. """
+    np.testing.assert_array_equal(spatial_index(df1).within(bounds), in_bounds(df1, bounds))
+
+
+@pytest.mark.parametrize('bounds', BOUNDS)
+@pytest.mark.parametrize('limit', [1, 50, MAX_RESULTS, 10**6])
+def test_query(df1, bounds, limit):
+    """ Os <limit> restaurantes de maior nota do retângulo, empates na ordem da base. """
+    positions = in_bounds(df1, bounds)
+    ratings = df1['aggregate_rating'].to_numpy(dtype='float64')[positions]
+    expected = positions[np.argsort(-ratings, kind='stable')][:limit]
+
+    result = spatial_index(df1).query(bounds, limit=limit)
+    np.testing.assert_array_equal(result, expected)
+    assert len(result) == min(limit, len(positions))
+
+
+@pytest.mark.parametrize('bounds', BOUNDS[:3])
+def test_query_selected_rows(df1, bounds):
+    """ Somente entre as linhas selecionadas. """
+    rows = np.flatnonzero(df1['aggregate_rating'].to_numpy() < 4.0)
+    positions = np.intersect1d(in_bounds(df1, bounds), rows)
+    ratings = df1['aggregate_rating'].to_numpy(dtype='float64')[positions]
+    expected = positions[np.argsort(-ratings, kind='stable')][:50]
+
+    np.testing.assert_array_equal(spatial_index(df1).query(bounds, limit=50, rows=rows), expected)
+    assert len(spatial_index(df1).query(bounds, rows=rows[:0])) == 0
+
+
+@pytest.mark.parametrize('point', POINTS)
+@pytest.mark.parametrize('radius_km', [1, 20, 500, 25000])
+def test_circle(df1, point, radius_km):
+    """ Todos os restaurantes até <radius_km> do ponto, em ordem crescente de posição. """
+    positions, distances = brute_force(df1, point)
+    inside = distances <= radius_km
+    order = np.argsort(positions[inside])
+
+    result_positions, result_distances = spatial_index(df1).circle(point, radius_km)
+    np.testing.assert_array_equal(result_positions, positions[inside][order])
+    np.testing.assert_allclose(result_distances, distances[inside][order])
+
+#=====================================
+#Restaurantes mais próximos x varredura completa
+
+@pytest.mark.parametrize('point', POINTS)
+@pytest.mark.parametrize('k', [1, 10, 300, 5000])
+def test_nearest_k(df1, point, k):
+    """ Os <k> mais próximos, inclusive quando o raio precisa crescer por vários anéis da grade. """
+    expected_positions, expected_distances = brute_force(df1, point)
+    positions, distances = spatial_index(df1).nearby(point, k=k)
+
+    np.testing.assert_array_equal(positions, expected_positions[:k])
+    np.testing.assert_allclose(distances, expected_distances[:k])
+
+
+@pytest.mark.parametrize('point', POINTS)
+@pytest.mark.parametrize('radius_km', [GRID_DEGREES * KM_PER_DEGREE / 2, 5, 50, 2000])
+def test_radius(df1, point, radius_km):
+    """ Somente os restaurantes até <radius_km>, do mais perto para o mais longe. """
+    expected_positions, expected_distances = brute_force(df1, point)
+    inside = expected_distances <= radius_km
+    positions, distances = spatial_index(df1).nearby(point, radius_km=radius_km)
+
+    np.testing.assert_array_equal(positions, expected_positions[inside])
+    np.testing.assert_allclose(distances, expected_distances[inside])
+    assert (distances <= radius_km).all()
+
+
+@pytest.mark.parametrize('point', POINTS[:3])
+def test_radius_and_k(df1, point):
+    """ Com raio e <k>, os <k> mais próximos dentro do raio. """
+    expected_positions, expected_distances = brute_force(df1, point)
+    inside = expected_positions[expected_distances <= 10]
+    positions, _ = spatial_index(df1).nearby(point, radius_km=10, k=20)
+
+    np.testing.assert_array_equal(positions, inside[:20])
+
+
+@pytest.mark.parametrize('point', POINTS[:3])
+def test_selected_rows(df1, point):
+    """ Somente entre as linhas selecionadas (a vizinhança mais próxima fica de fora). """
+    rows = np.flatnonzero(df1['aggregate_rating'].to_numpy() >= 4.0)
+    expected_positions, expected_distances = brute_force(df1, point, rows)
+    positions, distances = spatial_index(df1).nearby(point, k=25, rows=rows)
+
+    np.testing.assert_array_equal(positions, expected_positions[:25])
+    np.testing.assert_allclose(distances, expected_distances[:25])
+    assert len(spatial_index(df1).nearby(point, k=25, rows=rows[:0])[0]) == 0
+
+
+def test_nearby_restaurants(df1):
+    """ nearby_restaurants devolve as linhas da base na ordem da distância, com a coluna distance_km. """
+    point = POINTS[1]
+    expected_positions, expected_distances = brute_force(df1, point)
+    result = nearby_restaurants(df1, point, k=10)
+
+    assert result['restaurant_id'].tolist() == df1['restaurant_id'].take(expected_positions[:10]).tolist()
+    np.testing.assert_allclose(result['distance_km'], expected_distances[:10])
+    assert result['distance_km'].is_monotonic_increasing
+
+
+def test_requires_radius_or_k(df1):
+    with pytest.raises(ValueError):
+        spatial_index(df1).nearby(POINTS[0])
@@ -0,0 +1,131 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import store
+from utils.pyramid import MAX_ZOOM, PYRAMID_KEYS, pyramid_level
+
+RAW_DATA_PATH = r'data/raw_data/zomato.csv'
+
+#=====================================
+#Ingestão incremental x agregados recalculados
+
+def write_delta(path, seed):
+    """
+    Grava um arquivo de atualização com 55 restaurantes alterados e 20 novos.
+
+    Os alterados incluem os de menor restaurant_id da base (o menor id dos seus grupos
+    precisa ser recalculado) e mudam de nota e de posição (mudam de faixa, de célula da
+    pirâmide e da grade de densidade).
+    """
+    raw = pd.read_csv(RAW_DATA_PATH).drop_duplicates('Restaurant ID')
+    rng = np.random.default_rng(seed)
+
+    smallest = raw.nsmallest(15, 'Restaurant ID')
+    updated = pd.concat([smallest, raw.drop(smallest.index).sample(40, random_state=seed)])
+    updated['Aggregate rating'] = np.round(rng.uniform(1, 5, len(updated)), 1)
+    updated['Latitude'] = updated['Latitude'].to_numpy()[::-1]
+    updated['Longitude'] = updated['Longitude'].to_numpy()[::-1]
+
+    inserted = raw.sample(20, random_state=seed + 1)
+    inserted['Restaurant ID'] = inserted['Restaurant ID'] + 10**8
+
+    pd.concat([updated, inserted]).to_csv(path, index=False)
+
+
+def assert_matches_rebuild(store_dir):
+    """ Confere cada agregado da versão atual com o recalculado a partir de todas as linhas atuais. """
+    manifest = store.read_manifest(store_dir)
+    df1 = store.latest_rows([pd.read_parquet(os.path.join(store_dir, name)) for name in manifest['segments']])
+
+    for name, keys in store.AGGREGATES.items():
+        expected = store.summarize(df1, keys).sort_values(keys).reset_index(drop=True)
+        result = (store.load_aggregate(name, store_dir, manifest)
+                       .sort_values(keys)
+                       .reset_index(drop=True)
+                       .loc[:, expected.columns])
+
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_exact=False, rtol=1e-9,
+                                      obj=name)
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_ingest_matches_rebuild(tmp_path, seed):
+    """ Os agregados atualizados pela ingestão são iguais aos recalculados com a base inteira. """
+    store_dir = str(tmp_path / 'store')
+    store.open_store(RAW_DATA_PATH, store_dir)
+
+    delta_path = str(tmp_path / 'delta.csv')
+    write_delta(delta_path, seed)
+    assert store.ingest_delta(delta_path, RAW_DATA_PATH, store_dir) == {'inserted': 20, 'updated': 55}
+    assert_matches_rebuild(store_dir)
+
+    # a mesma atualização de novo: os restaurantes voltam aos mesmos grupos
+    assert store.ingest_delta(delta_path, RAW_DATA_PATH, store_dir) == {'inserted': 0, 'updated': 75}
+    assert_matches_rebuild(store_dir)
+
+
+def test_ingest_keeps_previous_aggregates(tmp_path):
+    """ A ingestão mantém os agregados da versão anterior e apaga os mais antigos. """
+    store_dir = str(tmp_path / 'store')
+    store.open_store(RAW_DATA_PATH, store_dir)
+
+    delta_path = str(tmp_path / 'delta.csv')
+    write_delta(delta_path, 0)
+    store.ingest_delta(delta_path, RAW_DATA_PATH, store_dir)
+    store.ingest_delta(delta_path, RAW_DATA_PATH, store_dir)
+
+    for name in store.AGGREGATES:
+        assert not os.path.exists(store.aggregate_path(name, 0, store_dir))
+        assert os.path.exists(store.aggregate_path(name, 1, store_dir))
+        assert os.path.exists(store.aggregate_path(name, 2, store_dir))
+
+
+def test_shared_pyramid_follows_ingest(tmp_path):
+    """ A pirâmide compartilhada (mmap) de cada versão tem as mesmas células do agregado, ordenadas por zoom. """
+    store_dir = str(tmp_path / 'store')
+    delta_path = str(tmp_path / 'delta.csv')
+    write_delta(delta_path, 0)
+
+    for ingest in [False, True]:
+        if ingest:
+            store.ingest_delta(delta_path, RAW_DATA_PATH, store_dir)
+        pyramid = store.load_pyramid(RAW_DATA_PATH, store_dir)
+        expected = store.load_aggregate('pyramid', store_dir).sort_values(PYRAMID_KEYS, ignore_index=True)
+
+        assert pyramid['zoom'].is_monotonic_increasing
+        pd.testing.assert_frame_equal(pyramid.astype({key: object for key in ['country', 'price_type', 'color_name']}),
+                                      expected)
+        for zoom in range(MAX_ZOOM + 1):
+            assert (pyramid_level(pyramid, zoom)['zoom'] == zoom).sum() == (pyramid['zoom'] == zoom).sum()
+
+
+def test_compact_keeps_previous_segments(tmp_path):
+    """ A compactação mantém os segmentos substituídos até a próxima compactação. """
+    store_dir = str(tmp_path / 'store')
+    store.open_store(RAW_DATA_PATH, store_dir)
+
+    delta_path = str(tmp_path / 'delta.csv')
+    write_delta(delta_path, 0)
+    store.ingest_delta(delta_path, RAW_DATA_PATH, store_dir)
+
+    before = store.read_manifest(store_dir)
+    store.compact_store(store_dir)
+    after = store.read_manifest(store_dir)
+
+    # uma sessão com o manifesto anterior ainda lê os mesmos dados
+    assert after['segments'] == ['part-00002.parquet']
+    previous = store.latest_rows([pd.read_parquet(store.segment_path(name, store_dir)) for name in before['segments']])
+    current = pd.read_parquet(store.segment_path(after['segments'][0], store_dir))
+    pd.testing.assert_frame_equal(current, previous)
+    assert_matches_rebuild(store_dir)
+
+    store.ingest_delta(delta_path, RAW_DATA_PATH, store_dir)
+    store.compact_store(store_dir)
+    assert sorted(os.listdir(store_dir)) == sorted(['aggregates', 'manifest.json', 'store.lock',
+                                                    'part-00002.parquet', 'part-00003.parquet',
+                                                    'part-00004.parquet'])
+    assert store.read_manifest(store_dir)['segments'] == ['part-00004.parquet']
+    assert_matches_rebuild(store_dir)
@@ -0,0 +1,155 @@
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+#==========================================================================
+#PUBLICAÇÃO DE ARQUIVOS
+#==========================================================================
+
+# Arquivos gerados pelo app (base processada, cache) são gravados uma única vez por
+# versão dos dados: com trava entre processos, em arquivo temporário e renomeados no
+# final. Quem lê nunca encontra um arquivo escrito pela metade.
+
+PROCESSED_DATA_PATH = r'data/processed/data.csv'
+
+# Versões de arquivos publicados já conferidas neste processo.
+_PUBLISHED = {}
+
+# Conteúdo do download já montado, identificado por (caminho, tamanho, data de modificação).
+_DOWNLOADS = {}
+
+#=====================================
+#Trava entre processos
+
+@contextmanager
+def file_lock(lock_path):
+    """
+    Trava exclusiva entre processos, feita sobre o arquivo <lock_path>.
+
+    Utiliza fcntl.flock no Linux/macOS e msvcrt.locking no Windows.
+
+    Exemplo:
+        with file_lock('data/processed/data.csv.lock'):
+            ...
+    """
+    os.makedirs(os.path.dirname(lock_path) or '.', exist_ok=True)
+
+    with open(lock_path, 'a+b') as lock_file:
+        if os.name == 'nt':
+            import msvcrt
+
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError: # LK_LOCK desiste depois de ~10s, tentamos novamente
+                    time.sleep(0.1)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+#=====================================
+#Escrita atômica
+
+def atomic_write(path, write, mode='wb'):
+    """
+    Grava um arquivo através de um temporário na mesma pasta, renomeado no final com os.replace.
+
+    Args:
+        path (str): caminho final do arquivo
+        write (function): função que recebe o arquivo temporário aberto e grava o conteúdo
+        mode (str): modo de abertura do temporário ('wb' ou 'w')
+    """
+    folder = os.path.dirname(path) or '.'
+    os.makedirs(folder, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as file:
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(tmp_path, 0o644) # mkstemp cria o arquivo visível somente para o dono
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+#=====================================
+#Publicando a base processada
+
+def published_version(path=PROCESSED_DATA_PATH):
+    """ Versão gravada junto com o arquivo publicado em <path>, ou None se ainda não existir. """
+    try:
+        with open(path + '.version', encoding='utf-8') as file:
+            return file.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def publish_processed_data(df1, version, path=PROCESSED_DATA_PATH):
+    """
+    Publica a base processada em CSV, somente se a versão publicada for diferente de <version>.
+
+    A conferência é feita uma vez por processo, então chamadas repetidas (reruns do
+    Streamlit) não fazem nenhum acesso ao disco. A gravação é feita com trava entre
+    processos e de forma atômica: primeiro o CSV, depois o arquivo '.version'.
+
+    Args:
+        df1 (dataframe): base limpa
+        version (str): versão dos dados (ex.: chave do cache)
+        path (str): caminho do CSV publicado
+
+    Returns:
+        bool: True se o arquivo foi gravado nesta chamada
+    """
+    if _PUBLISHED.get(path) == version:
+        return False
+
+    written = False
+    if published_version(path) != version:
+        with file_lock(path + '.lock'):
+            # outro processo pode ter publicado enquanto esperávamos a trava
+            if published_version(path) != version:
+                atomic_write(path, lambda file: df1.to_csv(file, index=False), mode='w')
+                atomic_write(path + '.version', lambda file: file.write(version), mode='w')
+                written = True
+
+    _PUBLISHED[path] = version
+    return written
+
+#=====================================
+#Download da base processada
+
+def processed_download_data(path=PROCESSED_DATA_PATH, sep=';'):
+    """
+    Conteúdo do botão de download: o CSV publicado, convertido para o separador <sep>.
+
+    A conversão é feita uma vez por versão do arquivo e reaproveitada nos reruns.
+
+    Returns:
+        str: conteúdo do CSV
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, sep)
+
+    if key not in _DOWNLOADS:
+        _DOWNLOADS.clear()
+        _DOWNLOADS[key] = pd.read_csv(path).to_csv(index=False, sep=sep)
+
+    return _DOWNLOADS[key]
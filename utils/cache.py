@@ -0,0 +1,275 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from utils import process_data
+from utils.artifacts import atomic_write, file_lock, publish_processed_data
+from utils.process_data import clean_data, compact_frame
+
+#==========================================================================
+#CACHE DA BASE PROCESSADA
+#==========================================================================
+
+# A base limpa é guardada em Parquet, com o nome do arquivo definido pelo conteúdo
+# do CSV bruto e pela versão do código de limpeza. Assim ela é reaproveitada entre
+# reruns, sessões e reinícios do servidor, e só é recalculada quando um dos dois muda.
+
+CACHE_DIR = r'data/cache'
+
+# Hashes já calculados, gravados em disco para que cada novo processo do servidor não
+# precise ler o arquivo bruto inteiro de novo (ver <file_digest>).
+DIGEST_DIR = os.path.join(CACHE_DIR, 'digests')
+
+# Guarda os hashes já calculados, identificados por (caminho, tamanho, data de modificação),
+# para não ler o arquivo bruto inteiro a cada rerun.
+_DIGESTS = {}
+
+# Bases já carregadas neste processo, identificadas por (chave do cache, compacta).
+_FRAMES = {}
+
+# Chaves do cache cuja base já foi publicada por este processo.
+_PUBLISHED = set()
+
+#=====================================
+#Hash do conteúdo do arquivo
+
+def file_digest(file_path, chunk_size=1024 * 1024, digest_dir=DIGEST_DIR):
+    """
+    Calcula o sha256 do conteúdo de um arquivo, lendo em blocos.
+
+    O resultado fica guardado em memória e em <digest_dir> enquanto o tamanho e a data de
+    modificação do arquivo não mudarem: somente o primeiro processo lê o arquivo inteiro,
+    os demais leem o hash gravado.
+
+    Args:
+        file_path (str): caminho do arquivo
+        chunk_size (int): tamanho de cada bloco lido
+        digest_dir (str): pasta onde os hashes calculados são gravados
+
+    Returns:
+        str: hash hexadecimal do conteúdo
+    """
+    stat = os.stat(file_path)
+    stat_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+    if stat_key not in _DIGESTS:
+        name = hashlib.sha256(repr(stat_key).encode('utf-8')).hexdigest()[:32]
+        digest_path = os.path.join(digest_dir, f'{name}.sha256')
+
+        try:
+            with open(digest_path, encoding='utf-8') as file:
+                _DIGESTS[stat_key] = file.read().strip()
+        except FileNotFoundError:
+            digest = hashlib.sha256()
+            with open(file_path, 'rb') as file:
+                for block in iter(lambda: file.read(chunk_size), b''):
+                    digest.update(block)
+            _DIGESTS[stat_key] = digest.hexdigest()
+            atomic_write(digest_path, lambda file: file.write(_DIGESTS[stat_key]), mode='w')
+
+    return _DIGESTS[stat_key]
+
+#=====================================
+#Versão do código de limpeza
+
+def code_version():
+    """
+    Retorna o hash do código fonte de utils/process_data.py.
+
+    Qualquer alteração nas regras de limpeza gera uma nova versão e invalida o cache.
+    """
+    return file_digest(process_data.__file__)
+
+#=====================================
+#Chave do cache
+
+def cache_key(file_path):
+    """
+    Chave do cache para um arquivo bruto: hash do conteúdo + versão do código de limpeza.
+
+    Args:
+        file_path (str): caminho do CSV bruto
+
+    Returns:
+        str: chave no formato '<hash do arquivo>-<versão do código>'
+    """
+    return f'{file_digest(file_path)[:16]}-{code_version()[:12]}'
+
+#=====================================
+#Carregando a base limpa
+
+def load_clean_data(file_path, cache_dir=CACHE_DIR, compact=True, publish=True):
+    """
+    Retorna a base limpa do arquivo <file_path>, utilizando o cache sempre que possível.
+
+    Ordem de busca:
+        1. DF já carregado neste processo (somente o pedido, completo ou compacto);
+        2. Parquet em <cache_dir> com a mesma chave;
+        3. <clean_data> sobre o CSV bruto, gravando o Parquet para as próximas chamadas.
+
+    Na primeira carga de cada versão a base também é publicada em data/processed/data.csv
+    (ver <publish_processed_data>), a não ser que <publish> seja False. Os reruns seguintes
+    não gravam nada em disco.
+
+    Com <compact> a base é convertida para os tipos de <compact_frame> (category, int32,
+    bool, float32...) logo na carga, reduzindo a memória de cada processo do Streamlit.
+
+    Args:
+        file_path (str): caminho do CSV bruto
+        cache_dir (str): pasta onde os arquivos Parquet são guardados
+        compact (bool): True para retornar a base com os tipos compactos
+        publish (bool): True para publicar a base em data/processed/data.csv
+
+    Returns:
+        dataframe: base limpa, com os mesmos valores do retorno de <clean_data>. O DF é o
+        mesmo para todas as chamadas do processo e não deve ser alterado in place (ex.:
+        filtrar com df1.loc[filtro, :] ou fazer uma cópia antes de alterar)
+    """
+    key = cache_key(file_path)
+    df1 = _FRAMES.get((key, compact))
+
+    # somente a base pedida fica guardada (completa ou compacta); a completa é lida de novo
+    # do Parquet apenas se ela ainda precisar ser publicada
+    if df1 is None or (publish and key not in _PUBLISHED):
+        full = df1 if df1 is not None and not compact else read_clean_parquet(file_path, key, cache_dir)
+
+        if publish:
+            publish_processed_data(full, key)
+            _PUBLISHED.add(key)
+
+        if df1 is None:
+            df1 = compact_frame(full) if compact else full
+            _FRAMES[key, compact] = df1
+
+    return df1
+
+
+def read_clean_parquet(file_path, key, cache_dir=CACHE_DIR):
+    """ Lê o Parquet da base limpa de <key>, criando-o com <clean_data> se ele não existir. """
+    cache_path = os.path.join(cache_dir, f'{key}.parquet')
+
+    if not os.path.exists(cache_path):
+        # somente um processo limpa a base, os demais esperam e leem o Parquet
+        with file_lock(cache_path + '.lock'):
+            if not os.path.exists(cache_path):
+                write_parquet(clean_data(file_path), cache_path)
+
+    return pd.read_parquet(cache_path)
+
+
+def write_parquet(df1, path):
+    """
+    Grava o DF em Parquet de forma atômica (ver <atomic_write>). Quem estiver lendo o
+    cache nunca encontra um arquivo pela metade.
+    """
+    atomic_write(path, lambda file: df1.to_parquet(file, index=False))
+
+
+#==========================================================================
+#CACHE EM MEMÓRIA (LRU)
+#==========================================================================
+
+class LRUCache:
+    """
+    Cache em memória limitado pela quantidade de itens e pelo total de bytes: quando um dos
+    limites é ultrapassado, os itens usados há mais tempo são descartados.
+
+    Pode ser compartilhado entre as sessões do Streamlit (threads do mesmo processo).
+
+    Exemplo:
+        cache = LRUCache(max_entries=32, max_bytes=64 * 2**20)
+        html = cache.get(key, lambda: render_html())
+        cache.stats()   # {'entries': ..., 'bytes': ..., 'hits': ..., 'misses': ...}
+
+    Args:
+        max_entries (int): quantidade máxima de itens
+        max_bytes (int): total máximo de bytes dos itens (um item maior que isso não é guardado)
+        sizeof (function): tamanho em bytes de um valor
+    """
+
+    def __init__(self, max_entries, max_bytes, sizeof=len):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+
+        self.items = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, build):
+        """
+        Retorna o valor de <key>, chamando <build>() para criá-lo se ele não estiver no cache.
+        """
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key][0]
+            self.misses += 1
+
+        # o valor é criado fora do lock para não bloquear as outras sessões
+        value = build()
+        size = self.sizeof(value)
+
+        with self.lock:
+            if size <= self.max_bytes and key not in self.items:
+                self.items[key] = (value, size)
+                self.total_bytes += size
+
+                while len(self.items) > self.max_entries or self.total_bytes > self.max_bytes:
+                    _, (_, old_size) = self.items.popitem(last=False)
+                    self.total_bytes -= old_size
+
+        return value
+
+    def stats(self):
+        """ Quantidade de itens, bytes ocupados, acertos e falhas do cache. """
+        with self.lock:
+            return {'entries': len(self.items), 'bytes': self.total_bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+#=====================================
+#Índices por base
+
+def memo_by_frame(factory, max_frames=4):
+    """
+    Guarda o objeto montado por <factory>(df1) para cada base, identificada pelo id do DF.
+
+    Deve ser utilizado com a base compartilhada (utils.store.load_store), que é o mesmo
+    objeto em todos os reruns do processo. A referência à base fica guardada junto com o
+    objeto, o que impede que o id seja reaproveitado por outro DF. Pode ser chamado por
+    várias sessões ao mesmo tempo: o objeto é montado fora do lock e retornado diretamente.
+
+    Exemplo:
+        _INDEXES = memo_by_frame(FilterIndex)
+        _INDEXES(df1)   # FilterIndex(df1), montado somente na primeira chamada
+
+    Args:
+        factory (function): recebe a base e monta o objeto (ex.: um índice)
+        max_frames (int): quantidade de bases guardadas (ao passar do limite todas são descartadas)
+
+    Returns:
+        function: recebe a base e retorna o seu objeto
+    """
+    built = {}
+    lock = threading.Lock()
+
+    def get(df1):
+        with lock:
+            entry = built.get(id(df1))
+        if entry is not None:
+            return entry[1]
+
+        value = factory(df1)
+        with lock:
+            if len(built) >= max_frames:
+                built.clear()
+            built[id(df1)] = (df1, value)
+        return value
+
+    return get
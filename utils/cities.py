@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+from haversine import Unit, haversine_vector
+
+from utils.cache import LRUCache
+from utils.filters import rating_threshold
+from utils.pyramid import POSITION_SUMS
+
+#==========================================================================
+#DISTÂNCIA ENTRE AS CIDADES
+#==========================================================================
+
+# O centro de cada cidade é a média das coordenadas dos seus restaurantes, calculada com as
+# somas do agregado 'by_city' (ver utils.store). As distâncias entre as cidades de um país
+# saem de uma única chamada do haversine_vector sobre os centros (matriz cidade x cidade).
+#
+# As matrizes ficam em cache pelo conjunto de cidades da base: a ingestão de restaurantes
+# em cidades já existentes não as recalcula, somente o surgimento ou o sumiço de uma cidade.
+
+# Limites do cache das matrizes (ver <city_distances>)
+DISTANCE_CACHE_ENTRIES = 4
+DISTANCE_CACHE_BYTES = 256 * 2**20
+
+# Limites do cache dos histogramas de notas (ver <cached_rating_histogram>)
+HISTOGRAM_CACHE_ENTRIES = 64
+HISTOGRAM_CACHE_BYTES = 64 * 2**20
+
+#=====================================
+#Centros e distâncias
+
+def city_centroids(by_city):
+    """
+    Centro e quantidade de restaurantes de cada cidade.
+
+    Args:
+        by_city (dataframe): agregado 'by_city' da base (ver utils.store.load_aggregate)
+
+    Returns:
+        dataframe: uma linha por país x cidade (ordenada), com 'restaurants', 'latitude' e 'longitude'
+    """
+    df_aux = by_city.groupby(['country', 'city'], observed=True)[['restaurants', *POSITION_SUMS.values()]].sum()
+
+    for col, sum_col in POSITION_SUMS.items():
+        df_aux[col] = df_aux[sum_col] / df_aux['restaurants']
+
+    return df_aux.reset_index().loc[:, ['country', 'city', 'restaurants', 'latitude', 'longitude']]
+
+
+def distance_matrix(latitude, longitude):
+    """
+    Distâncias haversine (km) entre todos os pontos, calculadas de uma vez.
+
+    Returns:
+        array: matriz n x n (diagonal zero)
+    """
+    points = np.column_stack([np.asarray(latitude, dtype='float64'), np.asarray(longitude, dtype='float64')])
+    return haversine_vector(points, points, Unit.KILOMETERS, comb=True)
+
+
+def country_distances(centroids):
+    """
+    Matriz de distâncias entre as cidades de cada país.
+
+    Returns:
+        dict: país -> (cidades do país, como em <city_centroids>; matriz de distâncias em km)
+    """
+    countries = {}
+    for country, cities in centroids.groupby('country', observed=True):
+        cities = cities.reset_index(drop=True)
+        countries[str(country)] = (cities, distance_matrix(cities['latitude'], cities['longitude']))
+    return countries
+
+
+def distances_size(countries):
+    return sum(cities.memory_usage(deep=True).sum() + matrix.nbytes for cities, matrix in countries.values())
+
+
+# Matrizes já calculadas, compartilhadas pelas sessões do processo
+DISTANCE_CACHE = LRUCache(DISTANCE_CACHE_ENTRIES, DISTANCE_CACHE_BYTES, sizeof=distances_size)
+
+def city_distances(by_city):
+    """
+    Matrizes de distâncias entre as cidades de cada país (ver <country_distances>), em cache
+    pelo conjunto de cidades da base.
+
+    Exemplo:
+        cities, matrix = city_distances(load_aggregate('by_city'))['Brazil']
+    """
+    key = tuple(sorted(set(zip(by_city['country'].astype(str), by_city['city'].astype(str)))))
+    return DISTANCE_CACHE.get(key, lambda: country_distances(city_centroids(by_city)))
+
+#=====================================
+#Resumos das distâncias
+
+def country_spread(countries):
+    """
+    Espalhamento das cidades de cada país.
+
+    Args:
+        countries (dict): retorno de <city_distances> (somente os países desejados)
+
+    Returns:
+        dataframe: uma linha por país, com a quantidade de cidades e a distância média e a
+        máxima entre elas (km)
+    """
+    rows = []
+    for country, (cities, matrix) in countries.items():
+        pairs = matrix[np.triu_indices(len(cities), k=1)]
+        rows.append({'country': country,
+                     'cities': len(cities),
+                     'mean_distance_km': pairs.mean() if len(pairs) > 0 else 0.0,
+                     'max_distance_km': pairs.max() if len(pairs) > 0 else 0.0})
+
+    return pd.DataFrame(rows, columns=['country', 'cities', 'mean_distance_km', 'max_distance_km'])
+
+
+def nearest_cities(cities, matrix):
+    """
+    Cidade mais próxima de cada cidade do país.
+
+    Returns:
+        dataframe: 'city', 'nearest_city' e 'distance_km' (sem a mais próxima quando o
+        país tem uma única cidade)
+    """
+    others = matrix + np.diag(np.full(len(cities), np.inf))
+    nearest = others.argmin(axis=1)
+    distances = others[np.arange(len(cities)), nearest]
+
+    single = ~np.isfinite(distances)
+    return pd.DataFrame({
+        'city': cities['city'].astype(str).to_numpy(),
+        'nearest_city': np.where(single, None, cities['city'].astype(str).to_numpy()[nearest]),
+        'distance_km': np.where(single, np.nan, distances),
+    })
+
+#=====================================
+#Histograma das notas por cidade
+
+# Quantidade de restaurantes de cada cidade por faixa de nota (ver utils.cube.with_rating_bucket),
+# calculada uma vez por estado dos filtros. A quantidade acima ou abaixo de qualquer nota
+# sai das somas acumuladas do histograma, sem somar o cubo de novo.
+
+def city_rating_histogram(cube):
+    """
+    Histograma das notas de cada cidade.
+
+    Args:
+        cube (dataframe): células do cubo de agregados que atendem aos filtros (ver utils.cube)
+
+    Returns:
+        dataframe: uma linha por país x cidade (índice) e uma coluna por faixa de nota, em
+        ordem crescente, com a quantidade de restaurantes
+    """
+    return (cube.groupby(['country', 'city', 'rating_bucket'], observed=True)['restaurants']
+                .sum()
+                .unstack('rating_bucket', fill_value=0)
+                .sort_index(axis=1))
+
+
+def cities_by_rating(histogram, above=None, below=None):
+    """
+    Quantidade de restaurantes de cada cidade com nota acima de <above> (>) e/ou abaixo de <below> (<).
+
+    Exemplo:
+        cities_by_rating(histogram, above=4)      # restaurantes com nota acima de 4.0
+        cities_by_rating(histogram, below=2.5)    # restaurantes com nota abaixo de 2.5
+
+    Args:
+        histogram (dataframe): retorno de <city_rating_histogram>
+
+    Returns:
+        series: quantidade por país x cidade, somente as cidades com algum restaurante
+    """
+    buckets = histogram.columns.to_numpy(dtype='float64')
+    counts = histogram.to_numpy()
+
+    # acumulado[:, i] = restaurantes nas i primeiras faixas
+    cumulative = np.zeros((len(counts), len(buckets) + 1), dtype='int64')
+    np.cumsum(counts, axis=1, out=cumulative[:, 1:])
+
+    # as faixas têm uma casa decimal; os limites são arredondados porque o slider do Streamlit
+    # pode devolver valores como 2.5000000000000004 (ver utils.filters.rating_threshold)
+    start = np.searchsorted(buckets, rating_threshold(above), side='right') if above is not None else 0
+    end = np.searchsorted(buckets, rating_threshold(below), side='left') if below is not None else len(buckets)
+
+    selected = pd.Series(cumulative[:, max(end, start)] - cumulative[:, start], index=histogram.index)
+    return selected.loc[selected > 0]
+
+
+# Histogramas já calculados, compartilhados pelas sessões do processo
+HISTOGRAM_CACHE = LRUCache(HISTOGRAM_CACHE_ENTRIES, HISTOGRAM_CACHE_BYTES,
+                           sizeof=lambda histogram: int(histogram.memory_usage(deep=True).sum()))
+
+def cached_rating_histogram(key, cube):
+    """
+    <city_rating_histogram> guardado no cache pelo estado dos filtros.
+
+    Exemplo:
+        key = (versão da base, filter_key(countries, prices, rating))
+        histogram = cached_rating_histogram(key, cube_slice)
+    """
+    return HISTOGRAM_CACHE.get(key, lambda: city_rating_histogram(cube))
@@ -0,0 +1,99 @@
+import numpy as np
+
+from utils.filters import isin_mask, rating_threshold
+from utils.grouping import group_aggregate
+
+#==========================================================================
+#CUBO DE AGREGADOS DOS GRÁFICOS
+#==========================================================================
+
+# O cubo guarda, para cada combinação de país x moeda x cidade x culinária x tipo de preço
+# x faixa de nota, a quantidade de restaurantes, as somas de votos, custo e nota e o menor
+# restaurant_id. Ele é montado e atualizado junto com a base (ver utils.store), e os
+# gráficos são calculados somando as células que atendem aos filtros da barra lateral:
+# o custo depende da quantidade de células, e não da quantidade de restaurantes.
+#
+# A moeda entra no cubo porque o gráfico de custo médio é agrupado por país e moeda
+# (cada país tem uma única moeda, então ela não aumenta a quantidade de células).
+
+CUBE_KEYS = ['country', 'currency', 'city', 'cuisines', 'price_type', 'rating_bucket']
+
+# Medidas somadas nas células: coluna da base -> coluna do cubo.
+SUMS = {
+    'votes': 'votes_sum',
+    'average_cost_for_two': 'average_cost_for_two_sum',
+    'aggregate_rating': 'aggregate_rating_sum',
+}
+
+#=====================================
+#Faixa de nota
+
+def with_rating_bucket(df1):
+    """
+    Acrescenta a coluna 'rating_bucket': a nota arredondada em uma casa decimal.
+
+    As notas da Zomato já têm uma casa decimal, então cada faixa é exatamente uma nota e
+    qualquer filtro de nota mínima/máxima pode ser respondido pelo cubo sem aproximação.
+    """
+    buckets = np.round(df1['aggregate_rating'].to_numpy(dtype='float64'), 1)
+    return df1.assign(rating_bucket=buckets)
+
+#=====================================
+#Filtrando e somando o cubo
+
+def slice_cube(cube, countries, prices, min_rating=None, above=None, below=None):
+    """
+    Células do cubo que atendem aos filtros.
+
+    Args:
+        cube (dataframe): cubo de agregados
+        countries (list): países selecionados
+        prices (list): tipos de preço selecionados
+        min_rating (float): nota mínima (>=), como no filtro da barra lateral
+        above (float): somente notas acima deste valor (>)
+        below (float): somente notas abaixo deste valor (<)
+
+    Os limites de nota passam por utils.filters.rating_threshold, como em <select_rows>.
+
+    Returns:
+        dataframe: células selecionadas
+    """
+    mask = np.ones(len(cube), dtype=bool)
+    if countries is not None:
+        mask &= isin_mask(cube['country'], countries)
+    if prices is not None:
+        mask &= isin_mask(cube['price_type'], prices)
+
+    ratings = cube['rating_bucket'].to_numpy()
+    if min_rating is not None:
+        mask &= ratings >= rating_threshold(min_rating)
+    if above is not None:
+        mask &= ratings > rating_threshold(above)
+    if below is not None:
+        mask &= ratings < rating_threshold(below)
+
+    return cube.loc[mask, :]
+
+
+def rollup(cube, keys):
+    """
+    Soma as células do cubo por <keys> (ver utils.grouping.group_aggregate).
+
+    Exemplo:
+        rollup(cube_slice, ['country'])
+
+    Returns:
+        dataframe: uma linha por grupo (ordenada por <keys>), com:
+            - 'restaurants': quantidade de restaurantes;
+            - 'votes', 'average_cost_for_two', 'aggregate_rating': médias;
+            - as somas e 'min_restaurant_id' (menor restaurant_id do grupo).
+    """
+    aggregations = {'restaurants': ('restaurants', 'sum'), 'min_restaurant_id': ('min_restaurant_id', 'min')}
+    aggregations.update({sum_col: (sum_col, 'sum') for sum_col in SUMS.values()})
+
+    df_aux = group_aggregate(cube, keys, aggregations)
+
+    for col, sum_col in SUMS.items():
+        df_aux[col] = df_aux[sum_col] / df_aux['restaurants']
+
+    return df_aux
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+from utils.cube import rollup
+from utils.pyramid import TILE_PIXELS
+
+#==========================================================================
+#GRADE DE DENSIDADE DOS RESTAURANTES
+#==========================================================================
+
+# Para visões de um país inteiro os marcadores individuais são lentos e ilegíveis. A grade
+# de densidade divide o mundo em células de latitude/longitude em alguns níveis de
+# resolução (DENSITY_LEVELS) e guarda, por nível x célula x país x moeda x tipo de preço
+# x faixa de nota, a quantidade de restaurantes e as somas de votos, custo e nota (ver
+# utils.cube.SUMS), de onde saem a nota média e o custo médio de cada célula.
+#
+# Ela é montada e atualizada junto com a base (ver utils.store), como a pirâmide de
+# clusters, e a página Geral mostra as células do nível adequado ao zoom do mapa.
+
+# Nível -> tamanho da célula em graus
+DENSITY_LEVELS = {
+    0: 5.0,     # ~550 km
+    1: 1.0,     # ~110 km
+    2: 0.25,    # ~28 km
+    3: 0.05,    # ~5,5 km
+    4: 0.01,    # ~1,1 km
+}
+
+# Tamanho mínimo da célula na tela, em pixels (ver <density_level>)
+DENSITY_CELL_PIXELS = 24
+
+DENSITY_KEYS = ['level', 'grid_row', 'grid_col', 'country', 'currency', 'price_type', 'rating_bucket']
+
+#=====================================
+#Montando a grade
+
+def grid_cells(latitude, longitude, degrees):
+    """ Célula (grid_row, grid_col) de cada ponto em uma grade de <degrees> graus. """
+    grid_row = np.floor((np.asarray(latitude, dtype='float64') + 90) / degrees).astype('int32')
+    grid_col = np.floor((np.asarray(longitude, dtype='float64') + 180) / degrees).astype('int32')
+    return grid_row, grid_col
+
+
+def density_cell_levels(df1):
+    """
+    As linhas de cada nível da grade, uma cópia por vez, com as colunas 'level', 'grid_row' e
+    'grid_col' (cada nível é agregado antes do próximo, ver utils.store.summarize).
+
+    Args:
+        df1 (dataframe): linhas da base limpa (somente as colunas necessárias)
+
+    Returns:
+        generator: um DF por nível de DENSITY_LEVELS
+    """
+    for level, degrees in DENSITY_LEVELS.items():
+        grid_row, grid_col = grid_cells(df1['latitude'], df1['longitude'], degrees)
+        yield df1.assign(level=np.int8(level), grid_row=grid_row, grid_col=grid_col)
+
+
+def with_density_cells(df1):
+    """
+    Repete as linhas uma vez por nível da grade (ver <density_cell_levels>).
+
+    Returns:
+        dataframe: len(df1) * len(DENSITY_LEVELS) linhas
+    """
+    return pd.concat(density_cell_levels(df1), ignore_index=True)
+
+#=====================================
+#Consultando a grade
+
+def density_level(zoom):
+    """
+    Nível mais detalhado da grade cujas células têm pelo menos DENSITY_CELL_PIXELS
+    pixels no <zoom> do mapa (ou o nível menos detalhado, se nenhum tiver).
+    """
+    world = TILE_PIXELS * 2 ** zoom
+    levels = [level for level, degrees in DENSITY_LEVELS.items()
+              if degrees / 360 * world >= DENSITY_CELL_PIXELS]
+    return max(levels) if levels else min(DENSITY_LEVELS)
+
+
+def density_cells(density, level, bounds=None):
+    """
+    Células da grade em um nível.
+
+    Exemplo:
+        # grade já filtrada pela barra lateral (ver utils.cube.slice_cube)
+        density_cells(slice_cube(density, countries, prices, min_rating=rating), 2, bounds)
+
+    Args:
+        density (dataframe): células da grade que atendem aos filtros
+        level (int): nível da grade (ver DENSITY_LEVELS)
+        bounds (list): área visível [[lat mín, lon mín], [lat máx, lon máx]] (None para o mundo todo)
+
+    Returns:
+        dataframe: uma linha por célula, com os limites 'south', 'west', 'north' e 'east',
+        'restaurants', 'aggregate_rating' e 'average_cost_for_two' (médias) e 'currency'
+        (None quando a célula tem restaurantes de mais de uma moeda)
+    """
+    degrees = DENSITY_LEVELS[level]
+    mask = density['level'].to_numpy() == level
+
+    if bounds is not None:
+        (south, west), (north, east) = bounds
+        west, east = np.clip([west, east], -180, 180)
+        row_min, col_min = grid_cells(south, west, degrees)
+        row_max, col_max = grid_cells(north, east, degrees)
+        grid_row = density['grid_row'].to_numpy()
+        grid_col = density['grid_col'].to_numpy()
+        mask &= (grid_row >= row_min) & (grid_row <= row_max)
+        if col_min <= col_max:
+            mask &= (grid_col >= col_min) & (grid_col <= col_max)
+        else:
+            # área visível atravessando o antimeridiano
+            mask &= (grid_col >= col_min) | (grid_col <= col_max)
+
+    df_aux = density.loc[mask, :]
+    cells = rollup(df_aux, ['grid_row', 'grid_col'])
+
+    # moeda do custo médio: somente quando a célula tem uma única moeda
+    currencies = df_aux.groupby(['grid_row', 'grid_col'], observed=True)['currency'].agg(['first', 'nunique'])
+    currencies = currencies.reindex(pd.MultiIndex.from_frame(cells[['grid_row', 'grid_col']]))
+    cells['currency'] = np.where(currencies['nunique'].to_numpy() == 1, currencies['first'].to_numpy(), None)
+
+    cells['south'] = cells['grid_row'] * degrees - 90
+    cells['north'] = cells['south'] + degrees
+    cells['west'] = cells['grid_col'] * degrees - 180
+    cells['east'] = cells['west'] + degrees
+
+    return cells.loc[:, ['south', 'west', 'north', 'east', 'restaurants',
+                         'aggregate_rating', 'average_cost_for_two', 'currency']]
@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+
+from utils.cache import memo_by_frame
+
+#==========================================================================
+#FILTROS DA BARRA LATERAL
+#==========================================================================
+
+# A base carregada por utils.store.load_store é a mesma para todas as sessões do processo
+# e não é alterada. Cada rerun calcula somente uma máscara (ou o índice das linhas)
+# para os filtros da barra lateral, e a base filtrada é montada com uma única cópia.
+#
+# Para a base compartilhada, a máscara é respondida por um índice montado uma única
+# vez (<FilterIndex>): bitmaps por país/tipo de preço e as notas ordenadas.
+
+#=====================================
+#Máscara de uma coluna
+
+def isin_mask(series, values):
+    """
+    Equivalente a series.isin(values), retornando um array booleano.
+
+    Para colunas category a comparação é feita nos códigos inteiros: os valores
+    selecionados viram uma tabela de consulta do tamanho da quantidade de categorias.
+
+    Args:
+        series (Series): coluna da base
+        values (list): valores selecionados
+
+    Returns:
+        ndarray: máscara booleana com uma posição por linha
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.isin(values).to_numpy()
+
+    categories = series.cat.categories
+    positions = categories.get_indexer(list(values))
+
+    # a última posição fica False e atende o código -1 (valor nulo)
+    lookup = np.zeros(len(categories) + 1, dtype=bool)
+    lookup[positions[positions >= 0]] = True
+
+    return lookup[series.cat.codes.to_numpy()]
+
+#=====================================
+#Nota mínima
+
+def rating_threshold(value):
+    """
+    Limite de nota em forma canônica: arredondado em 6 casas decimais.
+
+    As notas têm uma casa decimal, mas o slider do Streamlit pode devolver valores como
+    3.3000000000000003. Sem o arredondamento a comparação com a nota em float32 (base
+    compacta) e com a faixa de nota em float64 (cubo, ver utils.cube) dá resultados
+    diferentes para o mesmo filtro. Todos os filtros de nota passam por esta função.
+
+    Returns:
+        float: limite arredondado, ou None se <value> for None
+    """
+    return None if value is None else round(float(value), 6)
+
+#=====================================
+#Filtros combinados
+
+def filter_mask(df1, countries, prices, min_rating):
+    """
+    Máscara das linhas que atendem aos três filtros da barra lateral.
+
+    Args:
+        df1 (dataframe): base completa
+        countries (list): países selecionados
+        prices (list): tipos de preço selecionados
+        min_rating (float): nota mínima
+
+    Returns:
+        ndarray: máscara booleana com uma posição por linha
+    """
+    mask = isin_mask(df1['country'], countries)
+    mask &= isin_mask(df1['price_type'], prices)
+    mask &= df1['aggregate_rating'].to_numpy() >= rating_threshold(min_rating)
+    return mask
+
+
+def filter_key(countries, prices, min_rating):
+    """
+    Estado dos filtros da barra lateral em forma canônica (mesma seleção -> mesma chave,
+    independente da ordem em que os valores foram escolhidos), para ser usado em caches.
+    """
+    return (tuple(sorted(set(countries))), tuple(sorted(set(prices))), rating_threshold(min_rating))
+
+
+def select_rows(df1, countries, prices, min_rating):
+    """
+    Posições (iloc) das linhas que atendem aos filtros da barra lateral, respondidas
+    pelo índice de filtros da base (ver <FilterIndex>).
+
+    Exemplo:
+        rows = select_rows(df1, countries_filter, price_filter, rating_filter)
+        df_filtered = df1.take(rows)
+    """
+    return filter_index(df1).rows(countries, prices, min_rating)
+
+#=====================================
+#Índice de filtros: bitmaps + índice ordenado da nota
+
+class FilterIndex:
+    """
+    Índice dos filtros da barra lateral, montado uma vez por base.
+
+    - país e tipo de preço: um bitmap por valor (np.packbits, 1 bit por linha);
+    - nota: posições das linhas ordenadas pela nota, consultadas com busca binária.
+
+    Qualquer combinação de filtros vira um OR dos bitmaps de cada coluna, um AND entre
+    as colunas e o bitmap das linhas com nota >= mínima.
+    """
+
+    def __init__(self, df1):
+        self.n_rows = len(df1)
+        self.bitmaps = {col: value_bitmaps(df1[col]) for col in ['country', 'price_type']}
+
+        ratings = df1['aggregate_rating'].to_numpy()
+        self.rating_order = np.argsort(ratings, kind='stable')
+        self.sorted_ratings = ratings[self.rating_order]
+
+    def column_bits(self, col, values):
+        """ OR dos bitmaps dos valores selecionados, ou None se todos os valores da coluna estiverem selecionados. """
+        bitmaps = self.bitmaps[col]
+        selected = [bitmaps[value] for value in set(values) if value in bitmaps]
+
+        if len(selected) == len(bitmaps):
+            return None
+        if not selected:
+            return np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        return np.bitwise_or.reduce(selected)
+
+    def rating_bits(self, min_rating):
+        """ Bitmap das linhas com nota >= <min_rating>, ou None se todas atenderem. """
+        # comparação no mesmo tipo da coluna (float32 na base compacta), como em <filter_mask>
+        min_rating = np.asarray(rating_threshold(min_rating), dtype=self.sorted_ratings.dtype)
+        start = np.searchsorted(self.sorted_ratings, min_rating, side='left')
+        if start == 0:
+            return None
+
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.rating_order[start:]] = True
+        return np.packbits(mask)
+
+    def mask(self, countries, prices, min_rating):
+        """ Mesmo resultado de <filter_mask>, calculado com os bitmaps. """
+        parts = [self.column_bits('country', countries),
+                 self.column_bits('price_type', prices),
+                 self.rating_bits(min_rating)]
+        parts = [bits for bits in parts if bits is not None]
+
+        if not parts:
+            return np.ones(self.n_rows, dtype=bool)
+
+        bits = np.bitwise_and.reduce(parts) if len(parts) > 1 else parts[0]
+        return np.unpackbits(bits, count=self.n_rows).view(bool)
+
+    def rows(self, countries, prices, min_rating):
+        """ Posições (iloc) das linhas selecionadas, em ordem crescente. """
+        return np.flatnonzero(self.mask(countries, prices, min_rating))
+
+
+def value_bitmaps(series):
+    """
+    Um bitmap (np.packbits) por valor distinto da coluna.
+
+    Returns:
+        dict: valor -> array uint8 com 1 bit por linha
+    """
+    codes, uniques = pd.factorize(series)
+    return {value: np.packbits(codes == position) for position, value in enumerate(uniques)}
+
+
+# Índices já montados neste processo (ver utils.cache.memo_by_frame)
+_INDEXES = memo_by_frame(FilterIndex)
+
+def filter_index(df1):
+    """
+    Retorna o <FilterIndex> da base, montando-o na primeira chamada.
+
+    Deve ser utilizado com a base compartilhada (utils.store.load_store), que é o mesmo
+    objeto em todos os reruns do processo.
+    """
+    return _INDEXES(df1)
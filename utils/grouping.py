@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+#==========================================================================
+#AGRUPAMENTO POR CÓDIGOS INTEIROS
+#==========================================================================
+
+# Os agregados compartilhados (ver utils.store.load_shared_aggregate) têm as colunas de texto
+# convertidas para category na leitura (<encode_keys>): cada valor vira um código inteiro
+# uma única vez por versão da base, e as fatias filtradas herdam os códigos.
+#
+# <group_aggregate> agrupa por esses códigos sem o groupby do pandas: os códigos das chaves
+# são combinados em um único id de grupo (base mista), e as agregações são feitas com
+# np.bincount (quantidade, soma, média, valores distintos) e ufunc.reduceat sobre as linhas
+# ordenadas por grupo (mínimo, máximo).
+# O resultado tem os mesmos grupos, na mesma ordem, do groupby(keys, observed=True).
+
+# Acima desta quantidade de combinações possíveis das chaves os ids dos grupos são
+# compactados com np.unique (ordenação) em vez de uma tabela de consulta.
+MAX_LOOKUP_GROUPS = 2**24
+
+# Agregações disponíveis em <group_aggregate>
+FUNCTIONS = ['size', 'sum', 'mean', 'min', 'max', 'nunique']
+
+#=====================================
+#Códigos
+
+def encode_keys(df1):
+    """
+    Converte as colunas de texto (object) para category, com as categorias em ordem
+    alfabética (a mesma ordem dos grupos do groupby).
+
+    Returns:
+        dataframe: cópia do DF com as colunas convertidas
+    """
+    text_columns = [col for col in df1.columns if df1[col].dtype == object]
+    return df1.astype({col: 'category' for col in text_columns})
+
+
+def column_codes(series):
+    """
+    Códigos inteiros de uma coluna, na ordem dos valores, e os valores de cada código.
+
+    Colunas category usam os códigos já calculados; as demais são fatoradas (pd.factorize).
+
+    Returns:
+        tuple: (array int64 com um código por linha, valores distintos)
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy().astype('int64'), series.cat.categories
+
+    codes, uniques = pd.factorize(series, sort=True)
+    return codes.astype('int64'), uniques
+
+
+def group_ids(df1, keys):
+    """
+    Id do grupo de cada linha para as colunas <keys>.
+
+    Os ids seguem a ordem dos valores das chaves (como os grupos do groupby) e somente os
+    grupos com alguma linha recebem um id. As chaves não podem ter valores nulos.
+
+    Returns:
+        tuple: (array com o id de cada linha, quantidade de grupos, DF com as chaves de cada grupo)
+    """
+    codes, values = zip(*[column_codes(df1[key]) for key in keys])
+    sizes = [max(len(uniques), 1) for uniques in values]
+
+    # id em base mista: ((código 1 * tamanho 2) + código 2) * tamanho 3 + código 3 ...
+    combined = np.zeros(len(df1), dtype='int64')
+    for code, size in zip(codes, sizes):
+        combined = combined * size + code
+
+    total = int(np.prod(sizes, dtype='float64')) if sizes else 1
+    if total <= MAX_LOOKUP_GROUPS:
+        present = np.flatnonzero(np.bincount(combined, minlength=total))
+        lookup = np.empty(total, dtype='int64')
+        lookup[present] = np.arange(len(present))
+        ids = lookup[combined]
+    else:
+        present, ids = np.unique(combined, return_inverse=True)
+
+    # chaves de cada grupo: desfazendo a base mista
+    columns = {}
+    remainder = present
+    for key, uniques, size in reversed(list(zip(keys, values, sizes))):
+        columns[key] = np.asarray(uniques)[remainder % size]
+        remainder = remainder // size
+
+    groups = pd.DataFrame({key: columns[key] for key in keys})
+    return ids, len(present), groups
+
+#=====================================
+#Agregações
+
+def group_order(ids, counts):
+    """
+    Posições das linhas ordenadas por grupo e o início de cada grupo nessa ordem.
+
+    Com até 2**16 grupos os ids são ordenados como inteiros de 16 bits, o que faz o numpy
+    usar a ordenação radix (linear) em vez de uma ordenação por comparação.
+
+    Returns:
+        tuple: (array de posições, array com a posição inicial de cada grupo)
+    """
+    if len(counts) <= 2**16:
+        ids = ids.astype('uint16')
+    order = np.argsort(ids, kind='stable')
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    return order, starts
+
+
+def group_aggregate(df1, keys, aggregations):
+    """
+    Agrupa as linhas por <keys>, como df1.groupby(keys, observed=True).agg(**aggregations).reset_index().
+
+    Exemplo:
+        group_aggregate(cube, ['country'], {
+            'restaurants': ('restaurants', 'sum'),
+            'cities': ('city', 'nunique'),
+            'min_restaurant_id': ('min_restaurant_id', 'min'),
+        })
+
+    Args:
+        df1 (dataframe): linhas a agrupar (ex.: células do cubo, ver utils.cube)
+        keys (list): colunas de agrupamento
+        aggregations (dict): coluna do resultado -> (coluna de df1, função de FUNCTIONS)
+
+    Returns:
+        dataframe: uma linha por grupo, na ordem das chaves, com <keys> e as colunas de <aggregations>
+    """
+    ids, n_groups, groups = group_ids(df1, keys)
+    counts = np.bincount(ids, minlength=n_groups)
+    order = None
+
+    for name, (col, function) in aggregations.items():
+        if function == 'size':
+            groups[name] = counts
+            continue
+
+        if function == 'nunique':
+            codes, uniques = column_codes(df1[col])
+            valid = codes >= 0  # valores nulos não contam
+            size = max(len(uniques), 1)
+            pairs = ids[valid] * size + codes[valid]
+            if n_groups * size <= MAX_LOOKUP_GROUPS:
+                present = np.bincount(pairs, minlength=n_groups * size).reshape(n_groups, size) > 0
+                groups[name] = present.sum(axis=1)
+            else:
+                groups[name] = np.bincount(np.unique(pairs) // size, minlength=n_groups)
+            continue
+
+        values = df1[col].to_numpy()
+        if function in ('sum', 'mean'):
+            # bincount com pesos soma em float64 (exato para inteiros até 2**53)
+            sums = np.bincount(ids, weights=values, minlength=n_groups).astype('float64')
+            if function == 'mean':
+                groups[name] = sums / counts
+            elif np.issubdtype(values.dtype, np.integer):
+                groups[name] = sums.round().astype('int64')
+            else:
+                groups[name] = sums
+        elif function in ('min', 'max'):
+            # ufunc.reduceat sobre as linhas ordenadas por grupo (todos os grupos têm linhas)
+            if order is None:
+                order, starts = group_order(ids, counts)
+            reduce = np.minimum if function == 'min' else np.maximum
+            groups[name] = reduce.reduceat(values[order], starts) if n_groups > 0 else values[:0]
+        else:
+            raise ValueError(f'Agregação desconhecida: {function} (use uma de {FUNCTIONS}).')
+
+    return groups
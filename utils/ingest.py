@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from utils.process_data import clean_rows
+
+#==========================================================================
+#INGESTÃO DE VÁRIOS ARQUIVOS EM PARALELO
+#==========================================================================
+
+# Cada país/região chega em um CSV bruto separado, no formato da Zomato. Os arquivos são
+# limpos em paralelo (um processo por arquivo) e depois unidos, com a exclusão de
+# duplicados feita sobre a base inteira, como em <clean_data>.
+
+#=====================================
+#Limpeza de um arquivo (executada nos processos do pool)
+
+def clean_file(file_path):
+    """
+    Lê e limpa um CSV bruto, sem excluir duplicados (ver <clean_rows>).
+
+    Args:
+        file_path (str): caminho do CSV bruto
+
+    Returns:
+        tuple: (DataFrame limpo, dict com o tempo e a quantidade de linhas do arquivo)
+    """
+    start = time.perf_counter()
+
+    df1 = pd.read_csv(file_path)
+    rows_read = len(df1)
+    df1 = clean_rows(df1)
+
+    timing = {
+        'file': file_path,
+        'rows_read': rows_read,
+        'rows_clean': len(df1),
+        'seconds': round(time.perf_counter() - start, 3),
+        'pid': os.getpid(),
+    }
+    return df1, timing
+
+#=====================================
+#Limpeza de vários arquivos
+
+def clean_files(file_paths, max_workers=None):
+    """
+    Limpa vários CSVs brutos em paralelo e junta o resultado em uma única base.
+
+    Os arquivos são distribuídos em um pool de processos com <max_workers> processos
+    (padrão: quantidade de núcleos da máquina, limitada à quantidade de arquivos).
+    Com max_workers=1 tudo roda no processo atual, sem pool.
+
+    A base final é igual a limpar a concatenação dos arquivos, na ordem recebida, com
+    <clean_data>: duplicados entre arquivos diferentes também são excluídos.
+
+    Args:
+        file_paths (list): caminhos dos CSVs brutos
+        max_workers (int): quantidade de processos
+
+    Returns:
+        tuple: (DataFrame limpo, DataFrame com o tempo de cada arquivo)
+
+    Raises:
+        ValueError: se nenhum arquivo for informado
+    """
+    file_paths = list(file_paths)
+    if not file_paths:
+        raise ValueError('Nenhum arquivo informado: clean_files precisa de pelo menos um CSV bruto.')
+    max_workers = min(max_workers or os.cpu_count() or 1, max(len(file_paths), 1))
+
+    start = time.perf_counter()
+
+    if max_workers == 1:
+        results = [clean_file(path) for path in file_paths]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            # map mantém a ordem dos arquivos, então a primeira ocorrência de cada duplicado
+            # é a mesma da limpeza serial
+            results = list(pool.map(clean_file, file_paths))
+
+    frames = [df_aux for df_aux, _ in results]
+    timings = pd.DataFrame([timing for _, timing in results])
+
+    merge_start = time.perf_counter()
+    #Excluindo entradas duplicadas - entre todos os arquivos
+    df1 = pd.concat(frames, ignore_index=True).drop_duplicates().reset_index(drop=True)
+
+    timings.attrs['merge_seconds'] = round(time.perf_counter() - merge_start, 3)
+    timings.attrs['total_seconds'] = round(time.perf_counter() - start, 3)
+    timings.attrs['workers'] = max_workers
+
+    return df1, timings
+
+
+if __name__ == '__main__':
+    # python -m utils.ingest arquivo1.csv arquivo2.csv ...
+    if len(sys.argv) < 2:
+        sys.exit('Uso: python -m utils.ingest arquivo1.csv [arquivo2.csv ...]')
+
+    df1, timings = clean_files(sys.argv[1:])
+
+    print(timings.to_string(index=False))
+    print(f"{len(df1):,} linhas após a exclusão de duplicados | "
+          f"{timings.attrs['workers']} processos | "
+          f"junção {timings.attrs['merge_seconds']}s | total {timings.attrs['total_seconds']}s")
@@ -0,0 +1,563 @@
+import math
+
+import numpy as np
+import pandas as pd
+import folium
+import plotly.graph_objects as go
+from branca.element import CssLink, Element, JavascriptLink, MacroElement
+from folium.plugins import FastMarkerCluster
+from jinja2 import Template
+from streamlit_folium import generate_leaflet_string
+
+from utils.cache import LRUCache
+from utils.pyramid import fit_zoom
+
+#==========================================================================
+#MAPA DOS RESTAURANTES
+#==========================================================================
+
+# O mapa é montado de uma vez só: o texto dos popups é gerado coluna a coluna (sem iterrows
+# e sem um objeto folium por restaurante) e os marcadores são criados no navegador por uma
+# única camada FastMarkerCluster, que recebe a lista [lat, lon, popup, cor] e uma função JS.
+#
+# Com popups sob demanda (lazy_popups) cada marcador leva somente [lat, lon, restaurant_id,
+# código da cor]; os dados dos popups vão uma única vez, em uma tabela por colunas com os
+# textos repetidos (cidade, culinária, moeda) codificados, e o HTML do popup só é montado
+# no navegador quando o marcador é clicado.
+
+# Colunas usadas pelo mapa
+MAP_COLUMNS = ['restaurant_name', 'city', 'longitude', 'latitude', 'aggregate_rating', 'address',
+               'cuisines', 'price_type', 'average_cost_for_two', 'currency', 'color_name']
+
+# Marcador de um cluster com mais de um restaurante: círculo na cor predominante com a quantidade.
+CLUSTER_ICON = ('<div style="width: {size}px; height: {size}px; line-height: {size}px; border-radius: 50%; '
+                'background: {color}; opacity: 0.85; border: 2px solid white; color: white; '
+                'font-weight: bold; text-align: center;">{count}</div>')
+
+# Limites do cache das camadas do mapa já geradas (ver <cached_layer>)
+MAP_CACHE_ENTRIES = 64
+MAP_CACHE_BYTES = 64 * 2**20
+
+# Cores das células da grade de densidade, da menor para a maior quantidade de restaurantes
+DENSITY_COLORS = ['#ffffb2', '#fed976', '#feb24c', '#fd8d3c', '#f03b20', '#bd0026']
+
+# Mapa WebGL (ver <webgl_map>): estilo sem tiles externos e tamanho dos pontos em pixels
+WEBGL_STYLE = 'white-bg'
+WEBGL_POINT_SIZE = 5
+
+# Função JS chamada para cada linha de dados: mesmo ícone e popup dos marcadores do folium.
+MARKER_CALLBACK = """function (row) {
+    var icon = L.AwesomeMarkers.icon({icon: 'home', prefix: 'fa', markerColor: row[3]});
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+    marker.bindPopup(row[2], {maxWidth: 500});
+    return marker;
+}"""
+
+# Função JS dos marcadores com popup sob demanda (linha: [lat, lon, restaurant_id, código da cor]).
+LAZY_MARKER_CALLBACK = """function (row) {
+    var icon = L.AwesomeMarkers.icon({icon: 'home', prefix: 'fa', markerColor: details.colors[row[3]]});
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+    marker.bindPopup(function () { return popup(row[2]); }, {maxWidth: 500});
+    return marker;
+}"""
+
+#=====================================
+#Texto dos popups
+
+def text(series):
+    """
+    Coluna convertida para um array de textos (object), pronto para ser concatenado.
+
+    Nas colunas categóricas somente as categorias são convertidas, e os textos são
+    distribuídos pelos códigos.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories.astype(str).to_numpy(dtype=object)
+        return categories[series.cat.codes.to_numpy()]
+    return series.astype(str).to_numpy(dtype=object)
+
+
+def popup_html(df1):
+    """
+    Monta o HTML do popup de todos os restaurantes de uma vez.
+
+    Args:
+        df1 (dataframe): restaurantes com as colunas de MAP_COLUMNS
+
+    Returns:
+        array: HTML do popup de cada restaurante (na ordem do df1)
+    """
+    # Nota com uma casa decimal, como em f"{nota:.1f}"
+    ratings = np.round(df1['aggregate_rating'].to_numpy(dtype='float64'), 1).astype(str).astype(object)
+
+    return ('<b>Restaurante:</b> ' + text(df1['restaurant_name'])
+            + '<br><b>Cidade:</b> ' + text(df1['city'])
+            + '<br><b>Culinária:</b> ' + text(df1['cuisines'])
+            + '<br>Nota: ' + ratings
+            + '/5.0<br><b>Média do prato para 2 pessoas:</b> ' + text(df1['average_cost_for_two'])
+            + ' - ' + text(df1['currency'])
+            + '<br><b>Endereço:</b> ' + text(df1['address']))
+
+#=====================================
+#Dados dos marcadores
+
+def marker_rows(df1):
+    """
+    Linhas [lat, lon, popup, cor] enviadas para a camada de marcadores.
+
+    Args:
+        df1 (dataframe): restaurantes com as colunas de MAP_COLUMNS
+
+    Returns:
+        list: uma tupla por restaurante (vira uma lista no JSON)
+    """
+    return list(zip(df1['latitude'].astype('float64').tolist(),
+                    df1['longitude'].astype('float64').tolist(),
+                    popup_html(df1).tolist(),
+                    text(df1['color_name']).tolist()))
+
+
+def codes(series):
+    """ Códigos (lista de int) e valores distintos (lista de textos) de uma coluna. """
+    values, uniques = pd.factorize(series)
+    return values.tolist(), [str(value) for value in uniques]
+
+
+def popup_table(df1):
+    """
+    Tabela dos popups, por colunas, para os marcadores com popup sob demanda.
+
+    Args:
+        df1 (dataframe): restaurantes com as colunas de MAP_COLUMNS
+
+    Returns:
+        dict: colunas da tabela (listas na ordem do df1), pronto para o JSON
+    """
+    table = {
+        'id': df1['restaurant_id'].astype('int64').tolist(),
+        'name': text(df1['restaurant_name']).tolist(),
+        'address': text(df1['address']).tolist(),
+        # nota com uma casa decimal (toFixed(1) no navegador)
+        'rating': np.round(df1['aggregate_rating'].to_numpy(dtype='float64'), 1).tolist(),
+        'cost': df1['average_cost_for_two'].astype('int64').tolist(),
+    }
+    for col in ['city', 'cuisines', 'currency']:
+        table[col], table[col + '_values'] = codes(df1[col])
+    return table
+
+
+def lazy_marker_rows(df1):
+    """
+    Linhas [lat, lon, restaurant_id, código da cor] e lista de cores dos marcadores com popup sob demanda.
+
+    Returns:
+        tuple: (linhas, cores)
+    """
+    color_codes, colors = codes(df1['color_name'])
+    rows = list(zip(df1['latitude'].astype('float64').tolist(),
+                    df1['longitude'].astype('float64').tolist(),
+                    df1['restaurant_id'].astype('int64').tolist(),
+                    color_codes))
+    return rows, colors
+
+
+def bounds(df1):
+    """ [[lat mín, lon mín], [lat máx, lon máx]] a partir do mínimo/máximo das colunas. """
+    latitude = df1['latitude'].to_numpy(dtype='float64')
+    longitude = df1['longitude'].to_numpy(dtype='float64')
+    return [[float(latitude.min()), float(longitude.min())],
+            [float(latitude.max()), float(longitude.max())]]
+
+#=====================================
+#Camada de marcadores
+
+class RawScript(Element):
+    """ Trecho de JS inserido no HTML sem passar pelo jinja. """
+
+    def __init__(self, text):
+        super().__init__()
+        self.text = text
+
+    def render(self, **kwargs):
+        return self.text
+
+
+class MarkerLayer(FastMarkerCluster):
+    """
+    FastMarkerCluster para bases grandes.
+
+    O FastMarkerCluster valida as linhas uma a uma em Python, e o branca compila o script
+    de cada camada (com os dados dentro) como um template jinja ao montar o HTML: com 100k
+    restaurantes isso leva segundos. Aqui as linhas são recebidas prontas (as coordenadas
+    da base limpa já são números válidos) e o script vai para o HTML como texto.
+
+    Args:
+        rows (list): linhas [lat, lon, ...] passadas para o <callback>
+        callback (str): função JS que recebe uma linha e retorna o marcador
+    """
+
+    def __init__(self, rows, callback, **kwargs):
+        super().__init__([], callback=callback, **kwargs)
+        self.data = rows
+
+    def render(self, **kwargs):
+        figure = self.get_root()
+        for name, url in self.default_js:
+            figure.header.add_child(JavascriptLink(url), name=name)
+        for name, url in self.default_css:
+            figure.header.add_child(CssLink(url), name=name)
+
+        script = self._template.module.__dict__['script']
+        figure.script.add_child(RawScript(script(self, kwargs)), name=self.get_name())
+
+
+class LazyMarkerLayer(MarkerLayer):
+    """
+    MarkerLayer com popup sob demanda: a tabela dos popups (<popup_table>) vai uma única vez
+    no script da camada e o HTML do popup é montado no navegador quando o marcador é clicado.
+
+    Args:
+        df1 (dataframe): restaurantes com as colunas de MAP_COLUMNS
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                var details = {{ this.details|tojson }};
+                details.colors = {{ this.colors|tojson }};
+
+                var position = {};
+                for (var i = 0; i < details.id.length; i++) {
+                    position[details.id[i]] = i;
+                }
+
+                function popup(restaurant_id) {
+                    var i = position[restaurant_id];
+                    return '<b>Restaurante:</b> ' + details.name[i]
+                        + '<br><b>Cidade:</b> ' + details.city_values[details.city[i]]
+                        + '<br><b>Culinária:</b> ' + details.cuisines_values[details.cuisines[i]]
+                        + '<br>Nota: ' + details.rating[i].toFixed(1)
+                        + '/5.0<br><b>Média do prato para 2 pessoas:</b> ' + details.cost[i]
+                        + ' - ' + details.currency_values[details.currency[i]]
+                        + '<br><b>Endereço:</b> ' + details.address[i];
+                }
+
+                {{ this.callback }}
+
+                var data = {{ this.data|tojson }};
+                var cluster = L.markerClusterGroup({{ this.options|tojson }});
+
+                for (var i = 0; i < data.length; i++) {
+                    var row = data[i];
+                    var marker = callback(row);
+                    marker.addTo(cluster);
+                }
+
+                cluster.addTo({{ this._parent.get_name() }});
+                return cluster;
+            })();
+        {% endmacro %}"""
+    )
+
+    def __init__(self, df1, **kwargs):
+        rows, self.colors = lazy_marker_rows(df1)
+        super().__init__(rows, callback=LAZY_MARKER_CALLBACK, **kwargs)
+        self.details = popup_table(df1)
+
+
+def marker_layer(df1, lazy_popups=True):
+    """ Camada de marcadores dos restaurantes, com o popup sob demanda ou dentro de cada marcador. """
+    if lazy_popups:
+        return LazyMarkerLayer(df1)
+    return MarkerLayer(marker_rows(df1), callback=MARKER_CALLBACK)
+
+#=====================================
+#Mapa
+
+def create_map(df1, lazy_popups=True):
+    """
+    Cria o mapa com os restaurantes agrupados em clusters.
+
+    Args:
+        df1 (dataframe): restaurantes (já filtrados) com as colunas de MAP_COLUMNS
+        lazy_popups (bool): True para montar o popup somente no clique (página bem menor);
+            False para levar o HTML do popup em cada marcador
+
+    Returns:
+        folium.Map: mapa pronto para o folium_static
+    """
+    # Criando o mapa
+    fig = folium.Figure(width=1920, height=1080)
+    map_ = folium.Map( max_bounds=True ).add_to(fig)
+
+    # Camada de clusters montada no navegador
+    marker_layer(df1, lazy_popups).add_to(map_)
+
+    #Ajustar o zoom e a posição do mapa para incluir os marcadores, mapa inicia com zoom próximo aos marcadores
+    if len(df1) > 0:
+        map_.fit_bounds(bounds(df1), padding=(100, 100))
+
+    return map_
+
+#=====================================
+#Mapa por clusters da pirâmide (ver utils.pyramid)
+
+def base_map(data_bounds=None):
+    """
+    Mapa sem marcadores, enquadrado em <data_bounds>; os clusters são enviados à parte
+    (feature_group_to_add do st_folium), então o mapa só é recriado no navegador quando
+    o enquadramento muda.
+    """
+    map_ = folium.Map( max_bounds=True )
+    if data_bounds is not None:
+        map_.fit_bounds(data_bounds, padding=(100, 100))
+    return map_
+
+
+def cluster_layer(clusters, df1):
+    """
+    Camada com um marcador por cluster.
+
+    Os clusters com um único restaurante (o de 'min_restaurant_id') são mostrados como os
+    marcadores do mapa completo, com o popup do restaurante; os demais como um círculo
+    com a quantidade de restaurantes, na cor predominante das notas.
+
+    Args:
+        clusters (dataframe): retorno de utils.pyramid.clusters
+        df1 (dataframe): restaurantes com as colunas de MAP_COLUMNS (já filtrados ou a base
+            compartilhada, já que os restaurantes dos clusters atendem aos filtros)
+
+    Returns:
+        folium.FeatureGroup: camada dos clusters
+    """
+    layer = folium.FeatureGroup(name='Restaurantes')
+
+    single = clusters.loc[clusters['restaurants'] == 1, 'min_restaurant_id']
+    details = df1.loc[df1['restaurant_id'].isin(single), :]
+    popups = dict(zip(details['restaurant_id'].tolist(), popup_html(details).tolist()))
+
+    for cluster in clusters.itertuples(index=False):
+        location = [cluster.latitude, cluster.longitude]
+
+        if cluster.restaurants == 1 and cluster.min_restaurant_id in popups:
+            folium.Marker(
+                location,
+                popup=folium.Popup(folium.Html(popups[cluster.min_restaurant_id], script=True), max_width=500),
+                icon=folium.Icon(color=cluster.color_name, icon="home", prefix="fa"),
+            ).add_to(layer)
+        else:
+            count = f'{cluster.restaurants:,}'.replace(',','.')
+            size = 30 + 8 * int(math.log10(cluster.restaurants))
+            folium.Marker(
+                location,
+                tooltip=f'{count} restaurantes',
+                icon=folium.DivIcon(html=CLUSTER_ICON.format(size=size, color=cluster.color_name, count=count),
+                                    icon_size=(size, size), icon_anchor=(size // 2, size // 2)),
+            ).add_to(layer)
+
+    return layer
+
+
+def restaurant_layer(df1, lazy_popups=True):
+    """
+    Camada com os marcadores dos restaurantes (como no mapa completo), utilizada quando a
+    área visível tem poucos restaurantes (ver utils.spatial).
+
+    Args:
+        df1 (dataframe): restaurantes com as colunas de MAP_COLUMNS
+        lazy_popups (bool): popup montado somente no clique (ver <create_map>)
+
+    Returns:
+        folium.FeatureGroup: camada dos restaurantes
+    """
+    layer = folium.FeatureGroup(name='Restaurantes')
+    marker_layer(df1, lazy_popups).add_to(layer)
+    return layer
+
+
+def returned_view(state):
+    """
+    Zoom e área visível devolvidos pelo st_folium.
+
+    Returns:
+        dict: {'zoom': int, 'bounds': [[lat mín, lon mín], [lat máx, lon máx]]}, ou None
+        enquanto o navegador ainda não informou a posição do mapa
+    """
+    state = state or {}
+    bounds = state.get('bounds') or {}
+    south_west, north_east = bounds.get('_southWest') or {}, bounds.get('_northEast') or {}
+    if state.get('zoom') is None or south_west.get('lat') is None or north_east.get('lat') is None:
+        return None
+
+    return {'zoom': int(state['zoom']),
+            'bounds': [[south_west['lat'], south_west['lng']], [north_east['lat'], north_east['lng']]]}
+
+def density_layer(cells):
+    """
+    Camada com um retângulo por célula da grade de densidade, colorido pela quantidade de
+    restaurantes (escala logarítmica) e com a nota média e o custo médio no tooltip.
+
+    Args:
+        cells (dataframe): retorno de utils.density.density_cells
+
+    Returns:
+        folium.FeatureGroup: camada da grade
+    """
+    layer = folium.FeatureGroup(name='Densidade')
+    if len(cells) == 0:
+        return layer
+
+    counts = cells['restaurants'].to_numpy(dtype='float64')
+    shades = np.floor(np.log1p(counts) / np.log1p(counts.max()) * (len(DENSITY_COLORS) - 1)).astype(int)
+
+    for cell, shade in zip(cells.itertuples(index=False), shades.tolist()):
+        count = f'{cell.restaurants:,}'.replace(',','.')
+        cost = f'{cell.average_cost_for_two:,.0f}'.replace(',','.')
+        currency = cell.currency if cell.currency is not None else 'várias moedas'
+
+        tooltip = (f'<b>Restaurantes:</b> {count}<br>'
+                   f'<b>Nota média:</b> {cell.aggregate_rating:.1f}/5.0<br>'
+                   f'<b>Média do prato para 2 pessoas:</b> {cost} - {currency}')
+        folium.Rectangle(
+            [[cell.south, cell.west], [cell.north, cell.east]],
+            tooltip=tooltip,
+            color=DENSITY_COLORS[shade],
+            weight=1,
+            fill=True,
+            fill_color=DENSITY_COLORS[shade],
+            fill_opacity=0.6,
+        ).add_to(layer)
+
+    return layer
+
+#=====================================
+#Cache das camadas já geradas
+
+class RenderedScript(MacroElement):
+    """ JS já gerado de um elemento do mapa. """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            {{ this.text }}
+        {% endmacro %}""")
+
+    def __init__(self, text):
+        super().__init__()
+        self._name = 'RenderedScript'
+        self.text = text
+
+    def render(self, **kwargs):
+        self.get_root().script.add_child(RawScript(self.text), name=self.get_name())
+
+
+class RenderedLayer(folium.FeatureGroup):
+    """ FeatureGroup com o JS dos marcadores já gerado (ver <cached_layer>). """
+
+    def __init__(self, script, name='Restaurantes'):
+        super().__init__(name=name)
+        RenderedScript(script).add_to(self)
+
+
+def layer_script(layer):
+    """
+    JS dos elementos de uma camada, como o st_folium gera para o feature_group_to_add
+    (a camada é identificada como 'feature_group').
+    """
+    layer._id = 'feature_group'
+    return '\n'.join(generate_leaflet_string(child, base_id=f'feature_group_{idx}')
+                     for idx, child in enumerate(layer._children.values()))
+
+
+# Camadas já geradas, compartilhadas pelas sessões do processo
+MAP_LAYER_CACHE = LRUCache(MAP_CACHE_ENTRIES, MAP_CACHE_BYTES,
+                           sizeof=lambda value: len(value[0].encode()) + len(value[1].encode()))
+
+def cached_layer(key, build):
+    """
+    Camada do mapa guardada no cache pelo estado que a define, para não refazer a consulta
+    nem gerar de novo o JS dos marcadores em reruns que não mudam o mapa.
+
+    Exemplo:
+        key = (versão da base, filter_key(countries, prices, rating), zoom, área visível)
+        layer, note = cached_layer(key, lambda: (cluster_layer(...), ''))
+
+    Args:
+        key (tuple): estado do mapa
+        build (function): retorna (camada, texto de aviso sobre a camada)
+
+    Returns:
+        tuple: (RenderedLayer, texto de aviso)
+    """
+    def render():
+        layer, note = build()
+        return layer_script(layer), note
+
+    script, note = MAP_LAYER_CACHE.get(key, render)
+    return RenderedLayer(script), note
+
+#=====================================
+#Mapa WebGL (muitos restaurantes)
+
+# Com dezenas de milhares de marcadores o Leaflet cria um elemento no DOM por marcador e o
+# navegador trava. O mapa WebGL desenha todos os restaurantes como pontos de um traço
+# Scattermapbox do plotly (um traço por cor, com as coordenadas em arrays) e funciona sem
+# tiles externos (estilo WEBGL_STYLE).
+
+def webgl_map(df1, data_bounds=None, width=1366, height=768, style=WEBGL_STYLE):
+    """
+    Mapa com todos os restaurantes desenhado com WebGL, colorido por 'color_name'.
+
+    O popup dos marcadores vira o hover de cada ponto, somente com a nota (o texto dos
+    popups de milhões de restaurantes não caberia na página).
+
+    Args:
+        df1 (dataframe): restaurantes com 'latitude', 'longitude', 'aggregate_rating' e 'color_name'
+        data_bounds (list): enquadramento inicial [[lat mín, lon mín], [lat máx, lon máx]]
+        width, height (int): tamanho do mapa em pixels (para o zoom inicial)
+        style (str): estilo do mapa do plotly ('white-bg' não usa tiles externos)
+
+    Returns:
+        plotly.graph_objects.Figure: mapa dos restaurantes
+    """
+    # coordenadas com 5 casas (~1 m) deixam o JSON da figura bem menor
+    latitude = np.round(df1['latitude'].to_numpy(dtype='float64'), 5)
+    longitude = np.round(df1['longitude'].to_numpy(dtype='float64'), 5)
+    rating = np.round(df1['aggregate_rating'].to_numpy(dtype='float64'), 1)
+    color_codes, colors = pd.factorize(df1['color_name'])
+
+    fig = go.Figure()
+
+    # um traço por cor, da maior para a menor nota, com a faixa de notas na legenda
+    traces = []
+    for code, color in enumerate(colors):
+        mask = color_codes == code
+        traces.append((rating[mask].mean(), str(color), mask))
+
+    for _, color, mask in sorted(traces, key=lambda trace: -trace[0]):
+        fig.add_trace(go.Scattermapbox(
+            lat=latitude[mask],
+            lon=longitude[mask],
+            customdata=rating[mask],
+            mode='markers',
+            marker={'size': WEBGL_POINT_SIZE, 'color': color},
+            name=f'Nota {rating[mask].min():.1f} a {rating[mask].max():.1f}',
+            hovertemplate='Nota: %{customdata:.1f}/5.0<extra></extra>',
+        ))
+
+    # mesmo enquadramento do mapa do folium (o zoom do plotly usa tiles de 512 pixels)
+    if data_bounds is not None:
+        (south, west), (north, east) = data_bounds
+        center = {'lat': (south + north) / 2, 'lon': (west + east) / 2}
+        zoom = max(fit_zoom(data_bounds, width, height) - 1, 0)
+    else:
+        center, zoom = {'lat': 0, 'lon': 0}, 0
+
+    fig.update_layout(
+        mapbox={'style': style, 'center': center, 'zoom': zoom},
+        width=width,
+        height=height,
+        margin={'l': 0, 'r': 0, 't': 0, 'b': 0},
+        legend={'x': 0, 'y': 1, 'bgcolor': 'rgba(255, 255, 255, 0.8)'},
+    )
+    return fig
@@ -1,6 +1,9 @@
 import inflection
+import numpy as np
 import pandas as pd
 
+from utils.artifacts import atomic_write
+
 #==========================================================================
 #FUNÇÕES
 #==========================================================================
@@ -74,48 +77,235 @@ def rename_columns(df1):
     return df1
 
 #=====================================
-#LIMPANDO DADOS 
+#Mapeamento vetorizado
 
-def clean_data(file_path): 
+def map_categories(series, mapper):
+    """
+    Aplica uma função de mapeamento somente nos valores únicos da coluna e espalha o
+    resultado para todas as linhas através dos códigos categóricos (pd.factorize).
 
-    """ Esta função realiza a limpeza da base
-    
+    A função <mapper> é chamada uma vez por valor distinto e não uma vez por linha,
+    então o custo em Python depende da quantidade de categorias e não do tamanho do DF.
+
+    Args:
+        series (Series): coluna com os valores originais
+        mapper (function): função que recebe um valor e retorna o valor mapeado
+
+    Returns:
+        ndarray: array de objetos com o valor mapeado de cada linha
     """
-    
-    df1 = pd.read_csv(file_path)
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    lookup = np.empty(len(uniques), dtype=object)
+    lookup[:] = [mapper(value) for value in uniques]
+    return lookup[codes]
 
-    # Renomeando as colunas do DataFrame - ajustando os nomes.
 
-    df1 = rename_columns(df1)
-    
-    # Excluindo nan
-    df1 = df1.dropna()
-    
+def first_cuisine(series):
+    """
+    Retorna somente o primeiro tipo de culinária de cada restaurante.
+
+    O split é feito com o acessor .str sobre os valores únicos da coluna, e depois o
+    resultado é distribuído para as linhas pelos códigos categóricos.
+
+    Args:
+        series (Series): coluna 'cuisines' original
+
+    Returns:
+        ndarray: array de objetos com a primeira culinária de cada linha
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    lookup = pd.Index(uniques).astype(str).str.split(',').str[0].to_numpy(dtype=object)
+    return lookup[codes]
+
+def map_columns(df1):
+    """
+    Cria/ajusta as colunas derivadas da base: 'cuisines', 'country', 'price_type' e 'color_name'.
+
+    Args:
+        df1 (dataframe): DataFrame com as colunas já renomeadas e sem nan
+
+    Returns:
+        dataframe: o mesmo DataFrame com as colunas mapeadas
+    """
     # categorizar todos os restaurantes somente por um tipo de culinária
-    df1['cuisines'] = df1.loc[:, 'cuisines'].astype(str).apply(lambda x: x.split(',')[0])
+    df1['cuisines'] = first_cuisine(df1['cuisines'])
 
     # Substituindo  os nomes dos países e renomeando a coluna
-    df1['country'] = df1.loc[:, 'country_code'].apply(lambda x: country_name(x))
+    df1['country'] = map_categories(df1['country_code'], country_name)
 
     # Criação do Tipo de classe do preço
-    df1["price_type"] = df1.loc[:, "price_range"].apply(lambda x: create_price_type(x))
+    df1["price_type"] = map_categories(df1["price_range"], create_price_type)
     # Criação do nome das Cores
-    df1['color_name'] = df1.loc[:, 'rating_color'].apply(lambda x: color_name(x))
+    df1['color_name'] = map_categories(df1['rating_color'], color_name)
+
+    return df1
+
+#=====================================
+#LIMPANDO DADOS 
+
+def clean_rows(df1):
+    """
+    Aplica as regras de limpeza que dependem somente de cada linha: renomear as colunas,
+    excluir nan, mapear as colunas derivadas e excluir 'switch_to_order_menu'.
+
+    Não exclui duplicados, então pode ser aplicada em partes da base (ver <clean_data_chunked>).
+
+    Args:
+        df1 (dataframe): DataFrame com as colunas originais do arquivo da Zomato
+
+    Returns:
+        dataframe: DataFrame limpo, ainda com possíveis linhas duplicadas
+    """
+    # Renomeando as colunas do DataFrame - ajustando os nomes.
+
+    df1 = rename_columns(df1)
+    
+    # Excluindo nan
+    df1 = df1.dropna()
+    
+    # Culinária principal, nome do país, tipo de preço e nome da cor
+    df1 = map_columns(df1)
 
     # Excluindo coluna com somente 1 dado 'switch_to_order_menu'
 
     df1 = df1.drop('switch_to_order_menu', axis = 1)
 
+    return df1
+
+
+def clean_frame(df1):
+    """
+    Realiza a limpeza de um DataFrame já carregado, com as mesmas regras de <clean_data>.
+
+    Nenhuma etapa utiliza .apply linha a linha: os mapeamentos são feitos sobre os
+    valores únicos de cada coluna (ver <map_categories>).
+
+    Args:
+        df1 (dataframe): DataFrame com as colunas originais do arquivo da Zomato
+
+    Returns:
+        dataframe: DataFrame limpo
+    """
+    df1 = clean_rows(df1)
+
     #Excluindo entradas duplicadas
 
     df1 = df1.drop_duplicates().reset_index(drop=True)
 
-    df1.to_csv("data\processed\data.csv", index=False)
+    return df1
+
 
+def clean_data(file_path): 
+
+    """ Esta função realiza a limpeza da base
 
+    A função não grava nenhum arquivo: a publicação de data/processed/data.csv é feita
+    uma vez por versão dos dados em utils.artifacts.publish_processed_data.
     
+    """
+    
+    df1 = pd.read_csv(file_path)
+
+    df1 = clean_frame(df1)
+
     return df1
 
+#=====================================
+#LIMPANDO DADOS EM BLOCOS - arquivos grandes
+
+def row_hashes(df1):
+    """
+    Hash de 64 bits de cada linha do DF, utilizado para encontrar duplicados entre blocos.
+
+    As colunas numéricas são convertidas para float64 antes do hash, porque o mesmo valor
+    pode ser lido como int em um bloco e como float em outro.
+    """
+    numeric_cols = df1.select_dtypes('number').columns
+    df1 = df1.astype({col: 'float64' for col in numeric_cols})
+    return pd.util.hash_pandas_object(df1, index=False).to_numpy()
+
+
+class RowHashSet:
+    """
+    Conjunto dos hashes das linhas já escritas, guardado em arrays numpy ordenados.
+
+    Cada bloco novo vira um array ordenado; quando o penúltimo array fica com até o dobro
+    do tamanho do último, os dois são unidos. Assim são mantidos poucos arrays
+    (log do total de linhas), e a memória é de 8 bytes por linha distinta.
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def add(self, hashes):
+        """
+        Registra os hashes de um bloco.
+
+        Args:
+            hashes (ndarray): hashes das linhas do bloco (ver <row_hashes>)
+
+        Returns:
+            ndarray: máscara booleana das linhas que ainda não tinham sido vistas,
+            mantendo somente a primeira ocorrência dentro do bloco
+        """
+        new = ~pd.Series(hashes).duplicated().to_numpy()
+
+        for run in self.runs:
+            position = np.searchsorted(run, hashes).clip(max=len(run) - 1)
+            new &= run[position] != hashes
+
+        if new.any():
+            self.runs.append(np.sort(hashes[new]))
+
+            while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+                last = self.runs.pop()
+                self.runs[-1] = np.sort(np.concatenate([self.runs[-1], last]))
+
+        return new
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+
+def clean_data_chunked(file_path, output_path, chunksize=100_000):
+    """
+    Limpa um CSV bruto bloco a bloco e grava a base limpa em <output_path> aos poucos.
+
+    Aplica as mesmas regras de <clean_data>, inclusive a exclusão de duplicados entre
+    blocos diferentes (mantendo a primeira ocorrência). Somente um bloco fica em memória
+    por vez, além dos hashes das linhas já escritas (8 bytes por linha distinta).
+
+    O arquivo final é publicado de forma atômica (ver utils.artifacts.atomic_write).
+
+    Args:
+        file_path (str): caminho do CSV bruto
+        output_path (str): caminho do CSV limpo
+        chunksize (int): quantidade de linhas lidas por bloco
+
+    Returns:
+        int: quantidade de linhas gravadas
+    """
+    seen = RowHashSet()
+    rows_written = 0
+
+    def write(file):
+        nonlocal rows_written
+
+        header = True
+        for chunk in pd.read_csv(file_path, chunksize=chunksize):
+            chunk = clean_rows(chunk)
+
+            # Excluindo entradas duplicadas - dentro do bloco e com os blocos anteriores
+            chunk = chunk.loc[seen.add(row_hashes(chunk))]
+
+            chunk.to_csv(file, index=False, header=header)
+            header = False
+            rows_written += len(chunk)
+
+    atomic_write(output_path, write, mode='w')
+
+    return rows_written
+
 def adjust_columns_order(dataframe):
     df1 = dataframe.copy()
 
@@ -143,4 +333,78 @@ def adjust_columns_order(dataframe):
         "votes",
     ]
 
-    return df1.loc[:, new_cols_order]
\ No newline at end of file
+    return df1.loc[:, new_cols_order]
+
+#=====================================
+#Representação compacta do DF em memória
+
+COMPACT_SCHEMA = {
+    "restaurant_id": "int32",
+    "country_code": "int16",
+    "country": "category",
+    "city": "category",
+    "cuisines": "category",
+    "price_range": "int8",
+    "price_type": "category",
+    "average_cost_for_two": "int32",
+    "currency": "category",
+    "has_table_booking": "bool",
+    "has_online_delivery": "bool",
+    "is_delivering_now": "bool",
+    "aggregate_rating": "float32",
+    "rating_color": "category",
+    "color_name": "category",
+    "rating_text": "category",
+    "votes": "int32",
+}
+
+def compact_frame(dataframe, schema=COMPACT_SCHEMA):
+    """
+    Converte as colunas do DF para tipos menores: textos repetidos em category, inteiros
+    em int32/int16/int8, flags 0/1 em bool e a nota em float32.
+
+    Colunas que não existirem no DF são ignoradas, e inteiros que não cabem no tipo
+    menor (ex.: um custo acima de 2 bilhões) continuam com o tipo original.
+
+    Args:
+        dataframe (dataframe): base limpa (retorno de <clean_data> ou <adjust_columns_order>)
+        schema (dict): nome da coluna -> tipo compacto
+
+    Returns:
+        dataframe: cópia do DF com os tipos compactos
+    """
+    dtypes = {}
+    for col, dtype in schema.items():
+        if col not in dataframe.columns:
+            continue
+
+        values = dataframe[col]
+        if dtype.startswith('int'):
+            limits = np.iinfo(dtype)
+            if len(values) and (values.min() < limits.min or values.max() > limits.max):
+                continue
+        dtypes[col] = dtype
+
+    return dataframe.astype(dtypes)
+
+
+def memory_report(before, after):
+    """
+    Compara o uso de memória de cada coluna antes e depois de <compact_frame>.
+
+    Args:
+        before (dataframe): DF original
+        after (dataframe): DF compacto
+
+    Returns:
+        dataframe: bytes por coluna antes/depois, redução em % e uma linha 'total'
+    """
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'dtype_after': after.dtypes.astype(str),
+        'bytes_before': before.memory_usage(index=False, deep=True),
+        'bytes_after': after.memory_usage(index=False, deep=True),
+    })
+    report.loc['total', ['bytes_before', 'bytes_after']] = report[['bytes_before', 'bytes_after']].sum()
+    report['reduction_%'] = round(100 * (1 - report['bytes_after'] / report['bytes_before']), 1)
+    return report
@@ -0,0 +1,191 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+#==========================================================================
+#PIRÂMIDE DE CLUSTERS DO MAPA
+#==========================================================================
+
+# Para cada nível de zoom do mapa (0 a MAX_ZOOM) o mundo é dividido em células de
+# CELL_PIXELS x CELL_PIXELS pixels na projeção do Leaflet (Web Mercator). A pirâmide guarda,
+# por zoom x célula x país x tipo de preço x faixa de nota x cor, a quantidade de
+# restaurantes, a soma das coordenadas (para o centróide) e o menor restaurant_id.
+#
+# Ela é montada e atualizada junto com a base (ver utils.store), então a página Geral envia
+# para o navegador somente os clusters do zoom atual dentro da área visível: no máximo uma
+# marcação por célula da tela, qualquer que seja o tamanho da base.
+
+MAX_ZOOM = 15
+
+CELL_PIXELS = 64
+
+TILE_PIXELS = 256
+
+# Latitude máxima da projeção Web Mercator
+MAX_LATITUDE = 85.0511287798
+
+PYRAMID_KEYS = ['zoom', 'cell_x', 'cell_y', 'country', 'price_type', 'rating_bucket', 'color_name']
+
+# Coordenadas somadas nas células: coluna da base -> coluna da pirâmide.
+POSITION_SUMS = {
+    'latitude': 'latitude_sum',
+    'longitude': 'longitude_sum',
+}
+
+#=====================================
+#Projeção
+
+def mercator(latitude, longitude):
+    """
+    Posição dos pontos no mapa-múndi do Leaflet, de 0 a 1 (x de oeste para leste, y de norte para sul).
+
+    Args:
+        latitude (array): latitudes em graus
+        longitude (array): longitudes em graus
+
+    Returns:
+        tuple: arrays x e y
+    """
+    latitude = np.radians(np.clip(np.asarray(latitude, dtype='float64'), -MAX_LATITUDE, MAX_LATITUDE))
+    longitude = np.clip(np.asarray(longitude, dtype='float64'), -180, 180)
+
+    x = (longitude + 180) / 360
+    y = (1 - np.log(np.tan(latitude) + 1 / np.cos(latitude)) / np.pi) / 2
+    return x, y
+
+
+def cells_per_side(zoom):
+    return (TILE_PIXELS << zoom) // CELL_PIXELS
+
+
+def cell_of(x, y, zoom):
+    """ Célula (cell_x, cell_y) de cada ponto no <zoom>. """
+    side = cells_per_side(zoom)
+    cell_x = np.clip(np.floor(x * side), 0, side - 1).astype('int32')
+    cell_y = np.clip(np.floor(y * side), 0, side - 1).astype('int32')
+    return cell_x, cell_y
+
+#=====================================
+#Montando a pirâmide
+
+def map_cell_levels(df1):
+    """
+    As linhas de cada nível de zoom, uma cópia por vez, com as colunas 'zoom', 'cell_x' e 'cell_y'.
+
+    Para montar a pirâmide cada nível é agregado antes de passar para o próximo (ver
+    utils.store.summarize), então a memória não cresce com a quantidade de níveis.
+
+    Args:
+        df1 (dataframe): linhas da base limpa (somente as colunas necessárias)
+
+    Returns:
+        generator: um DF por zoom, de 0 a MAX_ZOOM
+    """
+    x, y = mercator(df1['latitude'], df1['longitude'])
+
+    for zoom in range(MAX_ZOOM + 1):
+        cell_x, cell_y = cell_of(x, y, zoom)
+        yield df1.assign(zoom=np.int8(zoom), cell_x=cell_x, cell_y=cell_y)
+
+
+def with_map_cells(df1):
+    """
+    Repete as linhas uma vez por nível de zoom (ver <map_cell_levels>).
+
+    Returns:
+        dataframe: len(df1) * (MAX_ZOOM + 1) linhas
+    """
+    return pd.concat(map_cell_levels(df1), ignore_index=True)
+
+#=====================================
+#Consultando a pirâmide
+
+def fit_zoom(bounds, width, height, padding=100):
+    """
+    Zoom em que o Leaflet mostra <bounds> inteiro em um mapa de <width> x <height> pixels
+    (como o fit_bounds do folium com padding=(padding, padding)).
+
+    Args:
+        bounds (list): [[lat mín, lon mín], [lat máx, lon máx]]
+    """
+    (south, west), (north, east) = bounds
+    x, y = mercator([north, south], [west, east])
+
+    zooms = [MAX_ZOOM]
+    for size, span in [(width, x[1] - x[0]), (height, y[1] - y[0])]:
+        if span > 0:
+            zooms.append(math.floor(math.log2(max(size - 2 * padding, 1) / (TILE_PIXELS * span))))
+
+    return int(np.clip(min(zooms), 0, MAX_ZOOM))
+
+
+def visible_cells(bounds, zoom):
+    """ Intervalos de cell_x e cell_y que cobrem <bounds> (uma célula a mais de cada lado). """
+    (south, west), (north, east) = bounds
+    x, y = mercator([north, south], [west, east])
+    cell_x, cell_y = cell_of(x, y, zoom)
+
+    side = cells_per_side(zoom)
+    return ((max(int(cell_x[0]) - 1, 0), min(int(cell_x[1]) + 1, side - 1)),
+            (max(int(cell_y[0]) - 1, 0), min(int(cell_y[1]) + 1, side - 1)))
+
+
+def pyramid_level(pyramid, zoom):
+    """
+    Células de um nível de zoom da pirâmide ordenada por zoom (ver utils.store.load_pyramid):
+    um trecho contínuo das linhas, encontrado com busca binária e sem cópia.
+    """
+    zoom = int(np.clip(zoom, 0, MAX_ZOOM))
+    zooms = pyramid['zoom'].to_numpy()
+    start, end = np.searchsorted(zooms, [zoom, zoom + 1])
+    return pyramid.iloc[start:end]
+
+
+def clusters(pyramid, zoom, bounds=None):
+    """
+    Clusters do mapa em um nível de zoom.
+
+    Exemplo:
+        # nível do zoom filtrado pela barra lateral (ver utils.cube.slice_cube)
+        level = slice_cube(pyramid_level(pyramid, 4), countries, prices, min_rating=rating)
+        clusters(level, 4, bounds)
+
+    Args:
+        pyramid (dataframe): células da pirâmide que atendem aos filtros, ordenadas por zoom
+        zoom (int): zoom do mapa (acima de MAX_ZOOM é utilizado o último nível)
+        bounds (list): área visível [[lat mín, lon mín], [lat máx, lon máx]] (None para o mundo todo)
+
+    Returns:
+        dataframe: um cluster por célula, com 'latitude'/'longitude' (centróide),
+        'restaurants', 'color_name' (cor com mais restaurantes) e 'min_restaurant_id'
+    """
+    zoom = int(np.clip(zoom, 0, MAX_ZOOM))
+    pyramid = pyramid_level(pyramid, zoom)
+    mask = np.ones(len(pyramid), dtype=bool)
+
+    if bounds is not None:
+        (x_min, x_max), (y_min, y_max) = visible_cells(bounds, zoom)
+        cell_x = pyramid['cell_x'].to_numpy()
+        cell_y = pyramid['cell_y'].to_numpy()
+        mask &= (cell_x >= x_min) & (cell_x <= x_max) & (cell_y >= y_min) & (cell_y <= y_max)
+
+    aggregations = {'restaurants': 'sum', 'min_restaurant_id': 'min'}
+    aggregations.update({col: 'sum' for col in POSITION_SUMS.values()})
+
+    by_color = (pyramid.loc[mask, :]
+                       .groupby(['cell_x', 'cell_y', 'color_name'], observed=True)
+                       .agg(aggregations)
+                       .reset_index())
+
+    df_aux = by_color.groupby(['cell_x', 'cell_y']).agg(aggregations)
+    for col, sum_col in POSITION_SUMS.items():
+        df_aux[col] = df_aux[sum_col] / df_aux['restaurants']
+
+    # cor predominante: a que tem mais restaurantes na célula
+    dominant = (by_color.sort_values('restaurants', ascending=False, kind='stable')
+                        .drop_duplicates(['cell_x', 'cell_y'])
+                        .set_index(['cell_x', 'cell_y'])['color_name'])
+    df_aux['color_name'] = dominant
+
+    return df_aux.reset_index().loc[:, ['latitude', 'longitude', 'restaurants', 'color_name', 'min_restaurant_id']]
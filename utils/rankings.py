@@ -0,0 +1,211 @@
+import numpy as np
+
+from utils.cache import LRUCache, memo_by_frame
+from utils.cube import rollup
+
+#==========================================================================
+#RANKINGS DOS RESTAURANTES
+#==========================================================================
+
+# Colunas da tabela dos melhores restaurantes (página Cuisines)
+TOP_COLUMNS = ['restaurant_id', 'restaurant_name', 'country', 'city', 'cuisines', 'average_cost_for_two',
+               'currency', 'aggregate_rating']
+
+# Limites do cache das estatísticas das culinárias (ver <cached_cuisine_statistics>)
+CUISINE_CACHE_ENTRIES = 64
+CUISINE_CACHE_BYTES = 16 * 2**20
+
+# Colunas do melhor restaurante de cada culinária (cards da página Cuisines)
+BEST_COLUMNS = ['country', 'city', 'restaurant_name', 'cuisines', 'average_cost_for_two',
+                'aggregate_rating', 'restaurant_id', 'currency']
+
+#=====================================
+#Principais culinárias e o melhor restaurante de cada uma
+
+def top_cuisines(df1, n=5, rows=None):
+    """
+    As <n> culinárias com mais restaurantes e o melhor restaurante de cada uma, calculados
+    de uma vez para todos os cards.
+
+    A contagem é feita em uma única passada agrupada e somente as <n> maiores são
+    escolhidas (nlargest, sem ordenar todas as culinárias); em caso de empate vale a ordem
+    das culinárias no agrupamento. O melhor restaurante é o de maior nota e, entre os de
+    mesma nota, o de menor restaurant_id (o mais antigo): duas passadas agrupadas sobre os
+    restaurantes das <n> culinárias, sem ordenar os restaurantes.
+
+    Exemplo:
+        top = top_cuisines(df1, 5)
+        top.iloc[0]   # culinária com mais restaurantes, com o seu melhor restaurante
+
+    Args:
+        df1 (dataframe): restaurantes (já filtrados, ou a base compartilhada com <rows>)
+        n (int): quantidade de culinárias
+        rows (array): somente estas posições (ex.: utils.filters.select_rows); somente as
+            colunas utilizadas dessas linhas são copiadas
+
+    Returns:
+        dataframe: uma linha por culinária, da que tem mais para a que tem menos
+        restaurantes, com 'restaurants' e as colunas de BEST_COLUMNS do melhor restaurante
+    """
+    if rows is not None:
+        df1 = df1.loc[:, ['votes', *BEST_COLUMNS]].take(rows)
+
+    counts = df1.groupby('cuisines', observed=True)['votes'].count().nlargest(n, keep='first')
+
+    # restaurantes das <n> culinárias
+    mask = df1['cuisines'].isin(counts.index).to_numpy()
+    df_aux = df1.loc[mask, BEST_COLUMNS]
+
+    # maior nota de cada culinária e, entre os restaurantes com essa nota, o menor id
+    grouped = df_aux.groupby('cuisines', observed=True)
+    best_rating = grouped['aggregate_rating'].transform('max').to_numpy()
+    df_aux = df_aux.loc[df_aux['aggregate_rating'].to_numpy() == best_rating, :]
+    best_id = df_aux.groupby('cuisines', observed=True)['restaurant_id'].transform('min').to_numpy()
+    df_aux = df_aux.loc[df_aux['restaurant_id'].to_numpy() == best_id, :]
+
+    best = df_aux.drop_duplicates('cuisines').set_index('cuisines')
+    best = best.reindex(counts.index)
+
+    return (best.assign(restaurants=counts.to_numpy())
+                .reset_index()
+                .loc[:, ['restaurants', *BEST_COLUMNS]])
+
+#=====================================
+#Estatísticas das culinárias (melhores e piores)
+
+def cuisine_statistics(cube):
+    """
+    Quantidade de restaurantes, nota média e média de votos de cada culinária, da maior
+    para a menor nota média, somadas a partir das células do cubo (sem percorrer os restaurantes).
+
+    As k melhores culinárias são as k primeiras linhas, para qualquer k; as k piores saem da
+    mesma tabela (ver <best_cuisines> e <worst_cuisines>). Entre as culinárias com a mesma
+    nota vale a ordem alfabética.
+
+    Args:
+        cube (dataframe): células do cubo de agregados que atendem aos filtros (ver utils.cube)
+
+    Returns:
+        dataframe: 'cuisines', 'restaurants', 'aggregate_rating', 'votes' e 'rating_key'
+        (chave de ordenação da nota média)
+    """
+    df_aux = rollup(cube, ['cuisines'])
+
+    # as notas têm uma casa decimal: a média é ordenada pela fração exata (soma * 10) / quantidade,
+    # para que culinárias com a mesma média empatem sem o ruído da soma em ponto flutuante
+    df_aux['rating_key'] = np.round(df_aux['aggregate_rating_sum'] * 10) / df_aux['restaurants']
+
+    return (df_aux.sort_values('rating_key', ascending=False, kind='stable')
+                  .loc[:, ['cuisines', 'restaurants', 'aggregate_rating', 'votes', 'rating_key']]
+                  .reset_index(drop=True))
+
+
+def best_cuisines(stats, k):
+    """ As <k> culinárias de maior nota média, da melhor para a pior. """
+    return stats.head(k)
+
+
+def worst_cuisines(stats, k):
+    """
+    As <k> culinárias de menor nota média, da pior para a melhor.
+
+    Entre as culinárias com a mesma nota vale a ordem alfabética, como em <best_cuisines>
+    (inverter <stats> inverteria também os empates e mudaria as culinárias escolhidas no corte).
+    """
+    return stats.sort_values(['rating_key', 'cuisines'], kind='stable').head(k).reset_index(drop=True)
+
+
+# Estatísticas já calculadas, compartilhadas pelas sessões do processo
+CUISINE_CACHE = LRUCache(CUISINE_CACHE_ENTRIES, CUISINE_CACHE_BYTES,
+                         sizeof=lambda stats: int(stats.memory_usage(deep=True).sum()))
+
+def cached_cuisine_statistics(key, cube):
+    """
+    <cuisine_statistics> guardado no cache pelo estado dos filtros, para ser calculado uma
+    única vez por estado e compartilhado pelos gráficos das melhores e das piores culinárias.
+
+    Exemplo:
+        key = (versão da base, filter_key(countries, prices, rating))
+        stats = cached_cuisine_statistics(key, cube_slice)
+    """
+    return CUISINE_CACHE.get(key, lambda: cuisine_statistics(cube))
+
+#=====================================
+#Índice do ranking: melhores restaurantes com os filtros
+
+class RankIndex:
+    """
+    Ordem global dos restaurantes da base (maior nota e, entre as notas iguais, menor
+    restaurant_id), montada uma vez por base.
+
+    Os N melhores restaurantes de uma seleção são os N primeiros da ordem global que estão
+    na seleção: a ordem é percorrida em blocos até encontrar N restaurantes, sem ordenar a
+    seleção. Quando a seleção é pequena (o percurso passaria por muitos restaurantes fora
+    dela) as posições no ranking da própria seleção são ordenadas parcialmente (argpartition).
+
+    Exemplo:
+        rows = select_rows(df1, countries_filter, price_filter, rating_filter)
+        df1.take(rank_index(df1).top(rows, 10))   # 10 melhores restaurantes filtrados
+    """
+
+    def __init__(self, df1):
+        ratings = df1['aggregate_rating'].to_numpy(dtype='float64')
+        ids = df1['restaurant_id'].to_numpy()
+
+        # posições das linhas do melhor para o pior restaurante, e o ranking de cada linha
+        self.order = np.lexsort((ids, -ratings))
+        self.rank = np.empty_like(self.order)
+        self.rank[self.order] = np.arange(len(self.order))
+
+    def top(self, rows, n):
+        """
+        Posições (iloc) dos <n> melhores restaurantes entre <rows>, do melhor para o pior.
+
+        Args:
+            rows (array): posições das linhas selecionadas, em ordem crescente
+                (ex.: utils.filters.select_rows)
+            n (int): quantidade de restaurantes
+        """
+        n = min(n, len(rows))
+        if n == 0:
+            return self.order[:0]
+
+        # percurso esperado da ordem global até encontrar <n> restaurantes da seleção
+        if n * len(self.order) / len(rows) <= len(rows):
+            return self.scan(rows, n)
+
+        ranks = self.rank[rows]
+        ranks = np.partition(ranks, n - 1)[:n] if n < len(ranks) else ranks
+        return self.order[np.sort(ranks)]
+
+    def scan(self, rows, n):
+        """
+        Percorre a ordem global em blocos crescentes até encontrar <n> restaurantes de <rows>.
+
+        A seleção de cada bloco é conferida com busca binária em <rows> (ordenado), então o
+        custo depende somente do trecho percorrido da ordem, e não do tamanho da base.
+        """
+        found, count = [], 0
+        start, size = 0, max(4 * n, 1024)
+        while count < n and start < len(self.order):
+            block = self.order[start:start + size]
+            positions = np.minimum(np.searchsorted(rows, block), len(rows) - 1)
+            block = block[rows[positions] == block]
+            found.append(block)
+            count += len(block)
+            start, size = start + size, 2 * size
+
+        return np.concatenate(found)[:n]
+
+
+# Índices já montados neste processo (ver utils.cache.memo_by_frame)
+_INDEXES = memo_by_frame(RankIndex)
+
+def rank_index(df1):
+    """
+    Retorna o <RankIndex> da base, montando-o na primeira chamada (uma vez por versão da base).
+
+    Deve ser utilizado com a base compartilhada (utils.store.load_store), que é o mesmo
+    objeto em todos os reruns do processo.
+    """
+    return _INDEXES(df1)
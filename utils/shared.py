@@ -0,0 +1,92 @@
+import glob
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+from utils.artifacts import atomic_write
+
+#==========================================================================
+#BASE COMPARTILHADA ENTRE PROCESSOS (Arrow IPC mapeado em memória)
+#==========================================================================
+
+# A base compacta é gravada uma vez por versão em um arquivo Arrow IPC sem compressão.
+# Cada processo do Streamlit abre o arquivo com mmap: as páginas ficam no cache do
+# sistema operacional e são as mesmas para todos os processos, então a memória por
+# máquina não cresce com a quantidade de processos. Nenhum CSV é lido na abertura.
+#
+# Na conversão para pandas:
+#   - colunas numéricas sem nulos apontam direto para o arquivo (somente leitura);
+#   - textos longos (nome, endereço...) ficam como pd.ArrowDtype(string), também sem cópia;
+#   - colunas category trazem somente os códigos para o processo (int8/int16 por linha).
+
+#=====================================
+#Gravando o arquivo
+
+def write_shared_table(df1, path):
+    """
+    Grava o DF em Arrow IPC (formato de arquivo, sem compressão) de forma atômica.
+
+    Args:
+        df1 (dataframe): base compacta (ver <compact_frame>)
+        path (str): caminho do arquivo .arrow
+    """
+    table = pa.Table.from_pandas(df1, preserve_index=False)
+
+    def write(file):
+        with pa.ipc.new_file(file, table.schema) as writer:
+            writer.write_table(table)
+
+    atomic_write(path, write)
+
+
+def remove_old_tables(path):
+    """
+    Apaga os arquivos .arrow antigos da mesma pasta, mantendo somente <path>.
+
+    Processos que ainda estiverem com um arquivo antigo aberto continuam lendo o mapeamento
+    normalmente. No Windows o arquivo em uso não pode ser apagado e fica para a próxima vez.
+    """
+    for old_path in glob.glob(os.path.join(os.path.dirname(path) or '.', '*.arrow')):
+        if os.path.abspath(old_path) != os.path.abspath(path):
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+#=====================================
+#Abrindo o arquivo
+
+def open_shared_table(path):
+    """
+    Abre o arquivo Arrow com mmap, sem copiar os dados para a memória do processo.
+
+    Returns:
+        pyarrow.Table: tabela apontando para o arquivo mapeado
+    """
+    source = pa.memory_map(path, 'r')
+    return pa.ipc.open_file(source).read_all()
+
+
+def arrow_string_types(arrow_type):
+    """ types_mapper do to_pandas: colunas de texto continuam em Arrow (sem cópia). """
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    return None
+
+
+def read_shared_frame(path):
+    """
+    Retorna a base do arquivo Arrow como DataFrame, reaproveitando a memória do mmap.
+
+    O DF retornado é compartilhado: os arrays numéricos são somente leitura, então
+    qualquer alteração deve ser feita em uma cópia (ex.: df1.loc[filtro, :]).
+
+    Args:
+        path (str): caminho do arquivo .arrow
+
+    Returns:
+        dataframe: base compacta
+    """
+    table = open_shared_table(path)
+    return table.to_pandas(split_blocks=True, types_mapper=arrow_string_types)
@@ -0,0 +1,225 @@
+import math
+
+import numpy as np
+from haversine import Unit, haversine_vector
+
+from utils.cache import memo_by_frame
+
+#==========================================================================
+#ÍNDICE ESPACIAL DOS RESTAURANTES
+#==========================================================================
+
+# Grade regular de GRID_DEGREES x GRID_DEGREES graus sobre latitude/longitude. As posições
+# das linhas ficam ordenadas pela célula da grade (linha a linha, de oeste para leste), então
+# as células de uma faixa de latitude dentro de um retângulo formam um único trecho contíguo,
+# encontrado com busca binária. Somente os restaurantes desses trechos são conferidos.
+
+GRID_DEGREES = 0.1 # ~11 km no equador
+
+CELLS_PER_ROW = math.ceil(360 / GRID_DEGREES)
+
+# Quantidade máxima de restaurantes retornada por consulta (os de maior nota)
+MAX_RESULTS = 500
+
+# Quilômetros por grau de latitude (raio médio da Terra, o mesmo do haversine)
+KM_PER_DEGREE = 6371.0088 * math.pi / 180
+
+# Metade da circunferência da Terra: nenhum ponto fica mais longe do que isso
+MAX_DISTANCE_KM = 6371.0088 * math.pi
+
+#=====================================
+#Grade
+
+def grid_row(latitude):
+    return np.clip(np.floor((np.asarray(latitude, dtype='float64') + 90) / GRID_DEGREES),
+                   0, math.ceil(180 / GRID_DEGREES) - 1).astype('int64')
+
+
+def grid_col(longitude):
+    return np.clip(np.floor((np.asarray(longitude, dtype='float64') + 180) / GRID_DEGREES),
+                   0, CELLS_PER_ROW - 1).astype('int64')
+
+#=====================================
+#Índice
+
+class SpatialIndex:
+    """
+    Índice espacial da base, montado uma vez por base.
+
+    Exemplo:
+        index = spatial_index(df1)
+        positions = index.query([[28.5, 77.0], [28.7, 77.3]], limit=100)
+        df1.take(positions)   # 100 restaurantes de maior nota no retângulo
+    """
+
+    def __init__(self, df1):
+        self.latitude = df1['latitude'].to_numpy(dtype='float64')
+        self.longitude = df1['longitude'].to_numpy(dtype='float64')
+        self.rating = df1['aggregate_rating'].to_numpy(dtype='float64')
+
+        cells = grid_row(self.latitude) * CELLS_PER_ROW + grid_col(self.longitude)
+        self.order = np.argsort(cells, kind='stable')
+        self.sorted_cells = cells[self.order]
+
+    def candidates(self, south, west, north, east):
+        """ Posições das linhas nas células que cobrem o retângulo (sem conferir as coordenadas). """
+        rows = np.arange(grid_row(south), grid_row(north) + 1)
+        starts = np.searchsorted(self.sorted_cells, rows * CELLS_PER_ROW + grid_col(west), side='left')
+        ends = np.searchsorted(self.sorted_cells, rows * CELLS_PER_ROW + grid_col(east), side='right')
+
+        slices = [self.order[start:end] for start, end in zip(starts, ends)]
+        return np.concatenate(slices) if slices else np.array([], dtype=self.order.dtype)
+
+    def within(self, bounds, rows=None):
+        """
+        Posições (iloc) das linhas dentro do retângulo, em ordem crescente.
+
+        Args:
+            bounds (list): [[lat mín, lon mín], [lat máx, lon máx]]; se a longitude mínima for
+                maior que a máxima, o retângulo atravessa o antimeridiano
+            rows (array): somente entre estas posições (ex.: utils.filters.select_rows), em ordem crescente
+        """
+        (south, west), (north, east) = bounds
+        west, east = np.clip([west, east], -180, 180)
+
+        if west <= east:
+            boxes = [(west, east)]
+        else:
+            boxes = [(west, 180), (-180, east)]
+
+        parts = []
+        for box_west, box_east in boxes:
+            positions = self.candidates(south, box_west, north, box_east)
+            latitude = self.latitude[positions]
+            longitude = self.longitude[positions]
+            inside = ((latitude >= south) & (latitude <= north)
+                      & (longitude >= box_west) & (longitude <= box_east))
+            parts.append(positions[inside])
+
+        positions = np.unique(np.concatenate(parts))
+        if rows is not None and len(rows) > 0:
+            # busca binária de cada posição nas linhas permitidas (rows está ordenado)
+            found = np.minimum(np.searchsorted(rows, positions), len(rows) - 1)
+            positions = positions[rows[found] == positions]
+        elif rows is not None:
+            positions = positions[:0]
+        return positions
+
+    def query(self, bounds, limit=MAX_RESULTS, rows=None):
+        """
+        Restaurantes dentro do retângulo, da maior para a menor nota, no máximo <limit>.
+
+        Em caso de empate na nota vale a ordem da base.
+
+        Args:
+            bounds (list): [[lat mín, lon mín], [lat máx, lon máx]]
+            limit (int): quantidade máxima de restaurantes
+            rows (array): somente entre estas posições (ex.: utils.filters.select_rows)
+
+        Returns:
+            array: posições (iloc) dos restaurantes
+        """
+        positions = self.within(bounds, rows)
+        ratings = self.rating[positions]
+
+        if len(positions) > limit:
+            # somente as notas a partir da <limit>-ésima maior precisam ser ordenadas
+            threshold = np.partition(ratings, len(ratings) - limit)[len(ratings) - limit]
+            keep = ratings >= threshold
+            positions, ratings = positions[keep], ratings[keep]
+
+        return positions[np.argsort(-ratings, kind='stable')[:limit]]
+
+    def nearby(self, point, radius_km=None, k=None, rows=None):
+        """
+        Restaurantes mais próximos de um ponto, do mais perto para o mais longe.
+
+        Somente as células da grade que cobrem o círculo de <radius_km> são conferidas, com a
+        distância haversine calculada de uma vez para os candidatos. Sem <radius_km>, o raio
+        começa em uma célula da grade e dobra até o círculo ter pelo menos <k> restaurantes
+        (os <k> mais próximos estão, então, todos dentro dele).
+
+        Em caso de empate na distância vale a ordem da base.
+
+        Args:
+            point (tuple): (latitude, longitude) em graus
+            radius_km (float): somente restaurantes até esta distância
+            k (int): no máximo os <k> restaurantes mais próximos
+            rows (array): somente entre estas posições (ex.: utils.filters.select_rows)
+
+        Returns:
+            tuple: arrays com as posições (iloc) dos restaurantes e as distâncias em km
+        """
+        if radius_km is None and k is None:
+            raise ValueError('Informe o raio (radius_km) e/ou a quantidade de restaurantes (k).')
+
+        if radius_km is not None:
+            positions, distances = self.circle(point, radius_km, rows)
+        else:
+            radius = GRID_DEGREES * KM_PER_DEGREE
+            positions, distances = self.circle(point, radius, rows)
+            while len(positions) < k and radius < MAX_DISTANCE_KM:
+                radius *= 2
+                positions, distances = self.circle(point, radius, rows)
+
+        order = np.argsort(distances, kind='stable')[:k]
+        return positions[order], distances[order]
+
+    def circle(self, point, radius_km, rows=None):
+        """ Posições (em ordem crescente) e distâncias dos restaurantes até <radius_km> do ponto. """
+        latitude, longitude = point
+        degrees = radius_km / KM_PER_DEGREE
+        south, north = latitude - degrees, latitude + degrees
+
+        # graus de longitude que cabem no raio na latitude mais próxima do polo
+        widest = math.cos(math.radians(min(max(abs(south), abs(north)), 90)))
+        if north >= 90 or south <= -90 or degrees >= 180 * widest:
+            west, east = -180, 180
+        else:
+            west = (longitude - degrees / widest + 180) % 360 - 180
+            east = (longitude + degrees / widest + 180) % 360 - 180
+
+        positions = self.within([[max(south, -90), west], [min(north, 90), east]], rows)
+        if len(positions) == 0:
+            return positions, np.array([], dtype='float64')
+
+        coordinates = np.column_stack([self.latitude[positions], self.longitude[positions]])
+        distances = haversine_vector(point, coordinates, Unit.KILOMETERS, comb=True).ravel()
+
+        inside = distances <= radius_km
+        return positions[inside], distances[inside]
+
+
+# Índices já montados neste processo (ver utils.cache.memo_by_frame)
+_INDEXES = memo_by_frame(SpatialIndex)
+
+def spatial_index(df1):
+    """
+    Retorna o <SpatialIndex> da base, montando-o na primeira chamada.
+
+    Deve ser utilizado com a base compartilhada (utils.store.load_store), que é o mesmo
+    objeto em todos os reruns do processo.
+    """
+    return _INDEXES(df1)
+
+
+def nearby_restaurants(df1, point, radius_km=None, k=None, rows=None):
+    """
+    Restaurantes perto de um ponto, com a distância, utilizando o índice espacial da base.
+
+    Exemplo:
+        nearby_restaurants(df1, (-22.97, -43.18), radius_km=2)   # até 2 km do ponto
+        nearby_restaurants(df1, (-22.97, -43.18), k=10)          # os 10 mais próximos
+
+    Args:
+        df1 (dataframe): base compartilhada (utils.store.load_store)
+        point (tuple): (latitude, longitude) em graus
+        radius_km (float): somente restaurantes até esta distância
+        k (int): no máximo os <k> restaurantes mais próximos
+        rows (array): somente entre estas posições (ex.: utils.filters.select_rows)
+
+    Returns:
+        dataframe: restaurantes do mais perto para o mais longe, com a coluna 'distance_km'
+    """
+    positions, distances = spatial_index(df1).nearby(point, radius_km, k, rows)
+    return df1.take(positions).assign(distance_km=distances)
@@ -0,0 +1,596 @@
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.artifacts import atomic_write, file_lock, publish_processed_data
+from utils.cache import cache_key, load_clean_data, write_parquet
+from utils.cube import CUBE_KEYS, SUMS, with_rating_bucket
+from utils.density import DENSITY_KEYS, density_cell_levels, with_density_cells
+from utils.grouping import encode_keys
+from utils.process_data import clean_frame, compact_frame
+from utils.pyramid import POSITION_SUMS, PYRAMID_KEYS, map_cell_levels, with_map_cells
+from utils.shared import read_shared_frame, remove_old_tables, write_shared_table
+
+#==========================================================================
+#BASE PROCESSADA COM INGESTÃO INCREMENTAL
+#==========================================================================
+
+# A base processada fica em <STORE_DIR> dividida em segmentos Parquet:
+#   - part-00000.parquet: base limpa do CSV bruto (ver utils.cache.load_clean_data);
+#   - part-00001.parquet, ...: um segmento por arquivo de atualização ingerido.
+# Um restaurant_id presente em um segmento mais novo substitui o mesmo id dos anteriores.
+#
+# O manifesto (manifest.json) lista os segmentos atuais e a versão dos dados, que
+# aumenta a cada ingestão.
+#
+# Os agregados (AGGREGATES) também ficam na pasta, um arquivo por versão (a versão atual e a
+# anterior são mantidas), e são atualizados somente com as linhas alteradas: a contribuição da versão antiga é
+# subtraída e a da nova é somada. O menor restaurant_id de um grupo só é recalculado,
+# a partir das linhas do próprio grupo, quando o restaurante que era o menor saiu dele.
+
+STORE_DIR = r'data/store'
+
+MANIFEST = 'manifest.json'
+
+# Agregados mantidos pela base: nome -> colunas de agrupamento.
+AGGREGATES = {
+    'by_city': ['country', 'city', 'currency'],
+    'cube': CUBE_KEYS, # cubo dos gráficos (ver utils.cube)
+    'pyramid': PYRAMID_KEYS, # clusters do mapa por zoom (ver utils.pyramid)
+    'density': DENSITY_KEYS, # grade de densidade do mapa (ver utils.density)
+}
+
+# Somas guardadas em todos os agregados: coluna da base -> coluna do agregado. As somas das
+# coordenadas dão o centróide de cada grupo (ex.: clusters do mapa, centro das cidades).
+AGGREGATE_SUMS = {**SUMS, **POSITION_SUMS}
+
+# Colunas de agrupamento calculadas a partir da base (não existem nos segmentos).
+DERIVED_KEYS = ['rating_bucket', 'zoom', 'cell_x', 'cell_y', 'level', 'grid_row', 'grid_col']
+
+# Bases já carregadas neste processo, identificadas por (pasta, versão, compacta).
+_FRAMES = {}
+
+#=====================================
+#Manifesto da base
+
+def read_manifest(store_dir=STORE_DIR):
+    """
+    Lê o manifesto da base: origem (chave do CSV bruto), versão e lista de segmentos.
+
+    Returns:
+        dict: manifesto, ou None se a base ainda não foi criada
+    """
+    try:
+        with open(os.path.join(store_dir, MANIFEST), encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(manifest, store_dir=STORE_DIR):
+    atomic_write(os.path.join(store_dir, MANIFEST),
+                 lambda file: json.dump(manifest, file, indent=2), mode='w')
+
+
+def store_version(manifest):
+    """ Identificador da versão dos dados da base (utilizado na publicação do CSV). """
+    return f"{manifest['source']}-v{manifest['version']}"
+
+#=====================================
+#Agregados
+
+def with_derived_keys(df1, keys):
+    """ Acrescenta às linhas as colunas de DERIVED_KEYS utilizadas em <keys>. """
+    if 'rating_bucket' in keys:
+        df1 = with_rating_bucket(df1)
+    if 'zoom' in keys:
+        df1 = with_map_cells(df1)
+    if 'level' in keys:
+        df1 = with_density_cells(df1)
+    return df1
+
+
+def summarize(df1, keys):
+    """
+    Agrega as linhas por <keys>.
+
+    Args:
+        df1 (dataframe): linhas da base limpa
+        keys (list): colunas de agrupamento (pode incluir as colunas de DERIVED_KEYS)
+
+    Returns:
+        dataframe: uma linha por grupo, com 'restaurants', as somas de AGGREGATE_SUMS e
+        'min_restaurant_id'
+    """
+    # somente as colunas das chaves e das somas são copiadas
+    columns = ['restaurant_id', *[key for key in keys if key not in DERIVED_KEYS], *AGGREGATE_SUMS]
+    df1 = df1.loc[:, list(dict.fromkeys(columns))]
+
+    # os níveis da pirâmide e da grade são agregados um por vez (a primeira chave é o nível,
+    # então os resultados já saem na ordem do groupby)
+    if 'zoom' in keys:
+        levels = map_cell_levels(df1)
+    elif 'level' in keys:
+        levels = density_cell_levels(df1)
+    else:
+        levels = [df1]
+
+    aggregations = {'restaurants': ('restaurant_id', 'size')}
+    aggregations.update({sum_col: (col, 'sum') for col, sum_col in AGGREGATE_SUMS.items()})
+    aggregations['min_restaurant_id'] = ('restaurant_id', 'min')
+
+    parts = []
+    for level in levels:
+        if 'rating_bucket' in keys:
+            level = with_rating_bucket(level)
+        parts.append(level.groupby(keys, observed=True).agg(**aggregations))
+
+    return pd.concat(parts).reset_index()
+
+
+def update_aggregate(aggregate, keys, removed, added, group_rows):
+    """
+    Atualiza um agregado sem recalcular a base inteira.
+
+    Args:
+        aggregate (dataframe): agregado atual (retorno de <summarize>)
+        keys (list): colunas de agrupamento
+        removed (dataframe): versões antigas das linhas alteradas
+        added (dataframe): linhas novas ou alteradas
+        group_rows (function): recebe um DF com as chaves de alguns grupos e retorna o
+            restaurant_id e as colunas de <keys> (já com as de DERIVED_KEYS) das linhas
+            atuais da base nesses grupos (utilizada somente para recalcular o menor id)
+
+    Returns:
+        dataframe: agregado atualizado, sem os grupos que ficaram vazios
+    """
+    counts = [col for col in aggregate.columns if col not in keys and col != 'min_restaurant_id']
+
+    removed = summarize(removed, keys)
+    added = summarize(added, keys)
+
+    negative = removed.copy()
+    negative[counts] *= -1
+
+    df_aux = (pd.concat([aggregate, negative, added], ignore_index=True)
+                .groupby(keys)[counts]
+                .sum())
+    df_aux['min_restaurant_id'] = (pd.concat([aggregate, added], ignore_index=True)
+                                     .groupby(keys)['min_restaurant_id']
+                                     .min())
+    df_aux = df_aux.loc[df_aux['restaurants'] > 0, :]
+
+    # grupos que perderam o restaurante de menor id: o menor id é recalculado com as linhas
+    # atuais, a não ser que um id menor ou igual (ex.: o mesmo restaurante) tenha entrado no grupo
+    removed_min = removed.set_index(keys)['min_restaurant_id'].reindex(df_aux.index)
+    lost_min = (removed_min.eq(aggregate.set_index(keys)['min_restaurant_id'].reindex(df_aux.index))
+            & ~added.set_index(keys)['min_restaurant_id'].reindex(df_aux.index).le(removed_min))
+    if lost_min.any():
+        stale = df_aux.index[lost_min.to_numpy()]
+        current = group_rows(stale.to_frame(index=False)).groupby(keys, observed=True)['restaurant_id'].min()
+        current = current.loc[current.index.isin(stale)]
+        df_aux.loc[current.index, 'min_restaurant_id'] = current
+
+    return df_aux.reset_index()
+
+
+def aggregate_path(name, version, store_dir=STORE_DIR):
+    return os.path.join(store_dir, 'aggregates', f'{name}-v{version}.parquet')
+
+
+def remove_old_aggregates(version, store_dir=STORE_DIR):
+    """
+    Apaga os arquivos dos agregados anteriores à versão <version> - 1.
+
+    Os da versão anterior são mantidos: uma sessão que leu o manifesto antigo logo antes da
+    ingestão ainda pode carregá-los. Arquivos em uso no Windows ficam para a próxima vez.
+    """
+    for path in glob.glob(os.path.join(store_dir, 'aggregates', '*-v*.parquet')):
+        old_version = int(os.path.basename(path).rsplit('-v', 1)[1].split('.')[0])
+        if old_version < version - 1:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def load_aggregate(name, store_dir=STORE_DIR, manifest=None):
+    """
+    Lê um agregado da versão atual da base (ver AGGREGATES).
+
+    Exemplo:
+        # restaurantes, somas de votos/custo/nota/coordenadas e menor id por país/cidade/moeda
+        load_aggregate('by_city')
+    """
+    manifest = manifest or read_manifest(store_dir)
+    return pd.read_parquet(aggregate_path(name, manifest['version'], store_dir))
+
+
+def load_shared_aggregate(name, raw_path, store_dir=STORE_DIR):
+    """
+    Retorna um agregado da versão atual da base, lido uma vez por versão em cada processo,
+    com as colunas de texto convertidas para category (ver utils.grouping.encode_keys).
+    O DF é compartilhado e não deve ser alterado in place.
+    """
+    manifest = open_store(raw_path, store_dir)
+    key = (os.path.abspath(store_dir), store_version(manifest), name)
+
+    if key not in _FRAMES:
+        _FRAMES[key] = encode_keys(load_aggregate(name, store_dir, manifest))
+
+    return _FRAMES[key]
+
+
+def load_by_city(raw_path, store_dir=STORE_DIR):
+    """ Restaurantes e somas por país/cidade/moeda (ver utils.cities). """
+    return load_shared_aggregate('by_city', raw_path, store_dir)
+
+
+def load_cube(raw_path, store_dir=STORE_DIR):
+    """ Cubo de agregados dos gráficos (ver utils.cube). """
+    return load_shared_aggregate('cube', raw_path, store_dir)
+
+
+def pyramid_path(manifest, store_dir=STORE_DIR):
+    return os.path.join(store_dir, 'aggregates', f'pyramid-{store_version(manifest)}.arrow')
+
+
+def load_pyramid(raw_path, store_dir=STORE_DIR):
+    """
+    Pirâmide de clusters do mapa (ver utils.pyramid), ordenada por zoom.
+
+    A pirâmide tem cerca de MAX_ZOOM + 1 células por restaurante, então ela é lida como a
+    base compartilhada (ver <load_store>): o primeiro processo que precisar da versão grava
+    um arquivo Arrow, com as colunas de texto em category, e os demais somente o abrem com
+    mmap. Cada zoom é um trecho contínuo das linhas (ver utils.pyramid.pyramid_level).
+    O DF é compartilhado e não deve ser alterado in place.
+    """
+    manifest = open_store(raw_path, store_dir)
+    key = (os.path.abspath(store_dir), store_version(manifest), 'pyramid')
+
+    if key not in _FRAMES:
+        path = pyramid_path(manifest, store_dir)
+
+        if not os.path.exists(path):
+            with file_lock(os.path.join(store_dir, 'store.lock')):
+                if not os.path.exists(path):
+                    pyramid = load_aggregate('pyramid', store_dir, manifest).sort_values(PYRAMID_KEYS, ignore_index=True)
+                    write_shared_table(encode_keys(pyramid), path)
+                    remove_old_tables(path)
+
+        _FRAMES[key] = read_shared_frame(path)
+
+    return _FRAMES[key]
+
+
+def load_density(raw_path, store_dir=STORE_DIR):
+    """ Grade de densidade do mapa (ver utils.density). """
+    return load_shared_aggregate('density', raw_path, store_dir)
+
+#=====================================
+#Criando a base
+
+def segment_path(name, store_dir=STORE_DIR):
+    return os.path.join(store_dir, name)
+
+
+def build_store(raw_path, store_dir=STORE_DIR):
+    """
+    Cria (ou recria) a base a partir do CSV bruto: um único segmento e os agregados completos.
+
+    Args:
+        raw_path (str): caminho do CSV bruto
+        store_dir (str): pasta da base
+
+    Returns:
+        dict: manifesto da base criada
+    """
+    df1 = load_clean_data(raw_path, compact=False, publish=False)
+    source = cache_key(raw_path)
+
+    write_parquet(df1, segment_path('part-00000.parquet', store_dir))
+    for name, keys in AGGREGATES.items():
+        write_parquet(summarize(df1, keys), aggregate_path(name, 0, store_dir))
+
+    manifest = {'source': source, 'version': 0, 'segments': ['part-00000.parquet'], 'next_segment': 1,
+                'aggregates': AGGREGATES, 'sums': list(AGGREGATE_SUMS.values())}
+    write_manifest(manifest, store_dir)
+    return manifest
+
+
+def rebuild_aggregates(manifest, store_dir=STORE_DIR):
+    """
+    Recalcula, a partir dos segmentos atuais, os agregados que não existem na base ou
+    cujas colunas de agrupamento mudaram no código, ou todos eles quando as somas
+    (AGGREGATE_SUMS) mudaram (as atualizações ingeridas são mantidas).
+
+    Returns:
+        dict: manifesto com a lista de agregados atualizada
+    """
+    built = manifest.get('aggregates', {})
+    if manifest.get('sums') != list(AGGREGATE_SUMS.values()):
+        built = {}
+    frames = [pd.read_parquet(segment_path(name, store_dir)) for name in manifest['segments']]
+    df1 = latest_rows(frames)
+
+    for name, keys in AGGREGATES.items():
+        if built.get(name) != keys:
+            write_parquet(summarize(df1, keys), aggregate_path(name, manifest['version'], store_dir))
+
+    # a cópia compartilhada da pirâmide (ver <load_pyramid>) tem o nome da mesma versão
+    if built.get('pyramid') != AGGREGATES['pyramid'] and os.path.exists(pyramid_path(manifest, store_dir)):
+        os.remove(pyramid_path(manifest, store_dir))
+
+    manifest = {**manifest, 'aggregates': AGGREGATES, 'sums': list(AGGREGATE_SUMS.values())}
+    write_manifest(manifest, store_dir)
+    return manifest
+
+
+def aggregates_current(manifest):
+    """ True se os agregados da base têm as mesmas colunas de agrupamento e somas do código. """
+    return manifest.get('aggregates') == AGGREGATES and manifest.get('sums') == list(AGGREGATE_SUMS.values())
+
+
+def open_store(raw_path, store_dir=STORE_DIR):
+    """
+    Retorna o manifesto da base, criando-a se ela não existir ou se o CSV bruto
+    (ou o código de limpeza) mudou desde a sua criação. Agregados novos no código são
+    calculados sobre a base existente (ver <rebuild_aggregates>).
+
+    Atenção: ao recriar a base, as atualizações ingeridas sobre o CSV antigo são descartadas.
+    """
+    source = cache_key(raw_path)
+    manifest = read_manifest(store_dir)
+
+    if manifest is None or manifest['source'] != source:
+        with file_lock(os.path.join(store_dir, 'store.lock')):
+            manifest = read_manifest(store_dir)
+            if manifest is None or manifest['source'] != source:
+                manifest = build_store(raw_path, store_dir)
+
+    if not aggregates_current(manifest):
+        with file_lock(os.path.join(store_dir, 'store.lock')):
+            manifest = read_manifest(store_dir)
+            if not aggregates_current(manifest):
+                manifest = rebuild_aggregates(manifest, store_dir)
+
+    return manifest
+
+#=====================================
+#Lendo a base
+
+def latest_rows(frames):
+    """
+    Junta os segmentos mantendo, para cada restaurant_id, somente as linhas do segmento
+    mais novo em que ele aparece.
+
+    Args:
+        frames (list): DataFrames dos segmentos, do mais antigo para o mais novo
+    """
+    seen = np.array([], dtype='int64')
+    parts = []
+    for df_aux in reversed(frames):
+        parts.append(df_aux.loc[~df_aux['restaurant_id'].isin(seen), :])
+        seen = np.concatenate([seen, df_aux['restaurant_id'].unique()])
+
+    return pd.concat(reversed(parts), ignore_index=True)
+
+
+def shared_path(version, store_dir=STORE_DIR):
+    return os.path.join(store_dir, f'shared-{version}.arrow')
+
+
+def read_store(manifest, store_dir=STORE_DIR):
+    """
+    Lê os segmentos da base (uma vez por versão em cada processo) e publica a base em
+    data/processed/data.csv na primeira leitura de cada versão.
+
+    Returns:
+        dataframe: base processada, com os tipos originais (não alterar in place)
+    """
+    version = store_version(manifest)
+    key = (os.path.abspath(store_dir), version)
+
+    if key not in _FRAMES:
+        frames = [pd.read_parquet(segment_path(name, store_dir)) for name in manifest['segments']]
+        _FRAMES[key] = latest_rows(frames)
+
+    publish_processed_data(_FRAMES[key], version)
+    return _FRAMES[key]
+
+
+def load_store(raw_path, store_dir=STORE_DIR, compact=True):
+    """
+    Retorna a base processada com todas as atualizações ingeridas.
+
+    Com <compact> a base vem com os tipos de <compact_frame> e é lida do arquivo Arrow
+    compartilhado da versão atual (ver utils.shared): o primeiro processo que precisar da
+    versão grava o arquivo, os demais somente o abrem com mmap, sem ler CSV nem Parquet.
+    Esse DF é o mesmo para todas as chamadas do processo e não deve ser alterado in place.
+
+    Sem <compact> os segmentos Parquet são lidos e uma cópia da base é retornada.
+
+    Nos reruns somente o manifesto é consultado.
+
+    Args:
+        raw_path (str): caminho do CSV bruto que deu origem à base
+        store_dir (str): pasta da base
+        compact (bool): True para retornar a base compartilhada, com os tipos compactos
+
+    Returns:
+        dataframe: base processada
+    """
+    manifest = open_store(raw_path, store_dir)
+    version = store_version(manifest)
+    key = (os.path.abspath(store_dir), version)
+
+    # descartando as versões antigas guardadas neste processo
+    for old_key in [old_key for old_key in _FRAMES if old_key[:2] != key]:
+        del _FRAMES[old_key]
+
+    if not compact:
+        return read_store(manifest, store_dir).copy()
+
+    if key + ('shared',) not in _FRAMES:
+        path = shared_path(version, store_dir)
+
+        if not os.path.exists(path):
+            with file_lock(os.path.join(store_dir, 'store.lock')):
+                if not os.path.exists(path):
+                    write_shared_table(compact_frame(read_store(manifest, store_dir)), path)
+                    remove_old_tables(path)
+
+        _FRAMES[key + ('shared',)] = read_shared_frame(path)
+
+    return _FRAMES[key + ('shared',)]
+
+#=====================================
+#Ingestão incremental
+
+def read_rows(restaurant_ids, manifest, store_dir=STORE_DIR):
+    """
+    Busca nos segmentos somente as linhas dos restaurant_id informados (versão mais nova).
+
+    O filtro é aplicado na leitura do Parquet, então somente a coluna restaurant_id dos
+    segmentos é percorrida por inteiro.
+    """
+    ids = [int(restaurant_id) for restaurant_id in restaurant_ids]
+    frames = [pd.read_parquet(segment_path(name, store_dir), filters=[('restaurant_id', 'in', ids)])
+              for name in manifest['segments']]
+    return latest_rows(frames)
+
+
+def read_groups(groups, keys, manifest, store_dir=STORE_DIR):
+    """
+    Busca os restaurantes atuais da base que pertencem aos grupos informados.
+
+    Os segmentos são lidos somente nas colunas de que as chaves dependem e filtrados na
+    leitura pelas colunas de texto das chaves (e pela faixa de notas, se ela for uma das
+    chaves). As colunas de DERIVED_KEYS são calculadas sobre essas linhas, que são
+    cruzadas com os grupos; depois é conferido, somente com a coluna restaurant_id, que cada
+    linha encontrada é a versão mais nova do restaurante.
+
+    Args:
+        groups (dataframe): uma linha por grupo, com as colunas de <keys>
+        keys (list): colunas de agrupamento do agregado
+        manifest (dict): manifesto da versão a ser lida
+
+    Returns:
+        dataframe: 'restaurant_id' e as colunas de <keys> de cada linha nos grupos
+    """
+    text_keys = [key for key in keys if key not in DERIVED_KEYS]
+    filters = [(key, 'in', groups[key].unique().tolist()) for key in text_keys]
+    columns = ['restaurant_id', *text_keys]
+    if 'rating_bucket' in keys:
+        columns.append('aggregate_rating')
+        filters += [('aggregate_rating', '>=', groups['rating_bucket'].min() - 0.05),
+                    ('aggregate_rating', '<', groups['rating_bucket'].max() + 0.05)]
+    if 'zoom' in keys or 'level' in keys:
+        columns += ['latitude', 'longitude']
+
+    matches = []
+    for position, name in enumerate(manifest['segments']):
+        df_aux = pd.read_parquet(segment_path(name, store_dir), columns=columns, filters=filters)
+        df_aux = with_derived_keys(df_aux, keys).merge(groups, on=keys, how='inner')
+        matches.append(df_aux.loc[:, ['restaurant_id', *keys]].assign(segment=position))
+    matches = pd.concat(matches, ignore_index=True)
+
+    # segmento mais novo de cada restaurante encontrado
+    ids = matches['restaurant_id'].unique().tolist()
+    latest = (pd.concat([pd.read_parquet(segment_path(name, store_dir), columns=['restaurant_id'],
+                                         filters=[('restaurant_id', 'in', ids)]).assign(segment=position)
+                         for position, name in enumerate(manifest['segments'])])
+                .groupby('restaurant_id')['segment']
+                .max())
+
+    current = matches['segment'].to_numpy() == latest.reindex(matches['restaurant_id']).to_numpy()
+    return matches.loc[current, ['restaurant_id', *keys]]
+
+
+def ingest_delta(delta_path, raw_path, store_dir=STORE_DIR):
+    """
+    Ingere um arquivo de atualização (mesmo formato do CSV bruto da Zomato) na base.
+
+    As linhas do arquivo passam pela mesma limpeza de <clean_data> e são gravadas por
+    restaurant_id: ids novos são inseridos e ids existentes são substituídos. Os
+    agregados são atualizados somente com as linhas alteradas, então o custo depende
+    do tamanho da atualização e não do tamanho da base.
+
+    Args:
+        delta_path (str): caminho do CSV com as linhas novas ou alteradas
+        raw_path (str): caminho do CSV bruto que deu origem à base
+        store_dir (str): pasta da base
+
+    Returns:
+        dict: quantidade de restaurantes inseridos e atualizados
+    """
+    delta = clean_frame(pd.read_csv(delta_path))
+    # se o mesmo restaurante aparecer mais de uma vez, vale a última linha
+    delta = delta.drop_duplicates('restaurant_id', keep='last').reset_index(drop=True)
+
+    manifest = open_store(raw_path, store_dir)
+
+    with file_lock(os.path.join(store_dir, 'store.lock')):
+        manifest = read_manifest(store_dir)
+        previous = read_rows(delta['restaurant_id'].unique(), manifest, store_dir)
+
+        segment = f"part-{manifest['next_segment']:05d}.parquet"
+        write_parquet(delta, segment_path(segment, store_dir))
+
+        new_manifest = {**manifest,
+                        'version': manifest['version'] + 1,
+                        'segments': manifest['segments'] + [segment],
+                        'next_segment': manifest['next_segment'] + 1}
+
+        for name, keys in AGGREGATES.items():
+            aggregate = update_aggregate(load_aggregate(name, store_dir, manifest), keys, previous, delta,
+                                         lambda groups: read_groups(groups, keys, new_manifest, store_dir))
+            write_parquet(aggregate, aggregate_path(name, new_manifest['version'], store_dir))
+
+        # a nova versão só passa a valer quando o manifesto é gravado
+        write_manifest(new_manifest, store_dir)
+
+        remove_old_aggregates(new_manifest['version'], store_dir)
+
+    updated = previous['restaurant_id'].nunique()
+    return {'inserted': len(delta) - updated, 'updated': updated}
+
+
+def remove_old_segments(keep, store_dir=STORE_DIR):
+    """
+    Apaga os segmentos da pasta da base que não estão em <keep>.
+
+    Arquivos em uso no Windows ficam para a próxima vez.
+    """
+    for path in glob.glob(os.path.join(store_dir, 'part-*.parquet')):
+        if os.path.basename(path) not in keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def compact_store(store_dir=STORE_DIR):
+    """
+    Junta todos os segmentos da base em um só (as linhas substituídas são descartadas).
+
+    Não altera os dados nem os agregados, somente reduz a quantidade de arquivos lidos
+    por <load_store>.
+
+    Os segmentos substituídos são mantidos até a próxima compactação: uma sessão que leu o
+    manifesto antigo logo antes da compactação ainda pode lê-los (como em <remove_old_aggregates>).
+    """
+    with file_lock(os.path.join(store_dir, 'store.lock')):
+        manifest = read_manifest(store_dir)
+        frames = [pd.read_parquet(segment_path(name, store_dir)) for name in manifest['segments']]
+
+        segment = f"part-{manifest['next_segment']:05d}.parquet"
+        write_parquet(latest_rows(frames), segment_path(segment, store_dir))
+        write_manifest({**manifest, 'segments': [segment], 'next_segment': manifest['next_segment'] + 1},
+                       store_dir)
+
+        # somente os segmentos substituídos na compactação anterior são apagados
+        remove_old_segments([segment, *manifest['segments']], store_dir)